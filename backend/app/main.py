@@ -1,5 +1,6 @@
 """Main FastAPI application."""
 
+import asyncio
 import logging
 import sys
 from contextlib import asynccontextmanager
@@ -15,15 +16,23 @@ if sys.platform == "win32":
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from pathlib import Path
 
 from config import settings
+from config.logging_config import configure_logging, shutdown_logging
 from models import HealthResponse
 from services.cache_service import cache_service
-from app.routes import auth, pinterest_auth, providers
+from services.cache_warmer import cache_warmer
+from services.download_tracker import download_tracker
+from services.image_provider import close_http_client
+from services.job_service import job_service
+from services.metrics_service import PrometheusMiddleware, metrics_service
+from services.pinterest_oauth_service import pinterest_oauth
+from app.routes import auth, metrics, pinterest_auth, providers
 from app.routes.waitlist import router as waitlist_router
-from database import create_tables
+from database import async_engine, create_tables, pool_status
 
 # Optional routes that require ML dependencies
 try:
@@ -44,8 +53,8 @@ except ImportError:
     ML_AVAILABLE = False
 
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging (queue-based, see config/logging_config.py)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 
@@ -66,10 +75,6 @@ async def lifespan(app: FastAPI):
     try:
         await cache_service.initialize()
         logger.info("Cache service initialized")
-        # Clear stale classification cache on startup to ensure fresh results after model changes
-        cleared = await cache_service.clear_cache("classification:*")
-        if cleared:
-            logger.info(f"Cleared {cleared} stale classification cache entries")
     except Exception as e:
         logger.warning(f"Cache service initialization failed: {e}")
     
@@ -91,10 +96,33 @@ async def lifespan(app: FastAPI):
     
     logger.info("Services initialized successfully")
     
+    # Pinterest tokens: load shared state now, then refresh ahead of expiry in the background
+    token_refresher = None
+    if pinterest_oauth is not None:
+        await pinterest_oauth.load_tokens()
+        token_refresher = asyncio.create_task(pinterest_oauth.run_refresher())
+    
+    # Cancel jobs that outlive their deadline or that no client polls any more
+    reaper = asyncio.create_task(job_service.run_reaper())
+    warmer = asyncio.create_task(cache_warmer.run()) if settings.cache_warmer_enabled else None
+    # Unsplash download events queued by delivered moodboards
+    download_dispatcher = asyncio.create_task(download_tracker.run())
+    
     yield
     
     logger.info("Shutting down...")
-    # Cleanup code here if needed
+    reaper.cancel()
+    if token_refresher:
+        token_refresher.cancel()
+    if warmer:
+        warmer.cancel()
+    await download_tracker.drain()
+    download_dispatcher.cancel()
+    await asyncio.gather(download_dispatcher, return_exceptions=True)  # Re-queues an in-flight batch
+    await close_http_client()
+    await cache_service.close()
+    await async_engine.dispose()
+    shutdown_logging()
 
 
 # Create FastAPI app
@@ -105,6 +133,10 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Scrape-time gauges read state owned by other modules
+metrics_service.jobs.callback = job_service.count_by_status
+metrics_service.db_pool.callback = pool_status
+
 # CORS middleware
 import os
 allowed_origins_str = os.getenv("ALLOWED_ORIGINS", "")
@@ -140,6 +172,9 @@ app.add_middleware(
     max_age=3600,  # Cache preflight requests for 1 hour
 )
 
+# Request latency per route template (added last = outermost, so it also times CORS handling)
+app.add_middleware(PrometheusMiddleware)
+
 # Include routers
 if MOODBOARD_ROUTES_AVAILABLE:
     app.include_router(moodboard.router, prefix="/api/v1", tags=["moodboard"])
@@ -153,6 +188,7 @@ app.include_router(auth.router, tags=["authentication"])
 app.include_router(waitlist_router, tags=["waitlist"])
 app.include_router(pinterest_auth.router, tags=["pinterest-oauth"])
 app.include_router(providers.router, prefix="/api/v1", tags=["providers"])
+app.include_router(metrics.router, prefix="/api/v1", tags=["metrics"])
 
 # Serve static files (local image testing)
 try:
@@ -195,6 +231,12 @@ async def ml_status():
     return result
 
 
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus scrape endpoint (text exposition format 0.0.4)."""
+    return PlainTextResponse(metrics_service.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
     """Health check endpoint with database connectivity check."""
@@ -2,4 +2,4 @@
 
 # Don't import here to avoid circular imports
 # Modules are imported directly in app/main.py
-__all__ = ["moodboard", "aesthetics", "auth", "moodboard_save", "waitlist"]
\ No newline at end of file
+__all__ = ["moodboard", "aesthetics", "auth", "moodboard_save", "waitlist", "metrics"]
\ No newline at end of file
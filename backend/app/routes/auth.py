@@ -2,18 +2,21 @@
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
+from fastapi.responses import StreamingResponse
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta, datetime
+import json
 from pydantic import BaseModel, EmailStr
 from typing import Optional, List, Dict, Any
 
 from database import get_db, User, Moodboard
 from services.auth_service import (
     authenticate_user, create_user, create_access_token, 
-    verify_token, get_user_by_username, get_user_by_email,
+    client_ip, get_principal, forget_user, get_user_by_username, get_user_by_email, login_slot,
     ACCESS_TOKEN_EXPIRE_MINUTES
 )
+from services.moodboard_store import count_moodboards, delete_images, iter_moodboards
 from services.recaptcha_service import recaptcha_service
 from fastapi import Request
 
@@ -50,7 +53,7 @@ class TokenData(BaseModel):
     username: Optional[str] = None
 
 # Dependency to get current user
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
     """Get current authenticated user."""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -58,22 +61,17 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    username = verify_token(token)
-    if username is None:
-        raise credentials_exception
-    
-    user = get_user_by_username(db, username=username)
+    user = await get_principal(db, token)
     if user is None:
         raise credentials_exception
     return user
 
 @router.post("/register", response_model=UserResponse)
-async def register(user_data: UserCreate, request: Request, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, request: Request, db: AsyncSession = Depends(get_db)):
     """Register a new user."""
     # Verify reCAPTCHA token
     if user_data.recaptcha_token:
-        client_ip = request.client.host if request.client else None
-        is_valid = await recaptcha_service.verify_token(user_data.recaptcha_token, client_ip)
+        is_valid = await recaptcha_service.verify_token(user_data.recaptcha_token, client_ip(request))
         if not is_valid:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -89,28 +87,28 @@ async def register(user_data: UserCreate, request: Request, db: Session = Depend
             )
     
     # Check if username already exists
-    if get_user_by_username(db, user_data.username):
+    if await get_user_by_username(db, user_data.username):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already registered"
         )
     
     # Check if email already exists
-    if get_user_by_email(db, user_data.email):
+    if await get_user_by_email(db, user_data.email):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
     # Create user
-    user = create_user(db, user_data.username, user_data.email, user_data.password)
+    user = await create_user(db, user_data.username, user_data.email, user_data.password)
     return user
 
 @router.post("/login", response_model=Token)
 async def login(
     form_data: OAuth2PasswordRequestForm = Depends(), 
     request: Request = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Login user and return access token."""
     # Get reCAPTCHA token from request form data
@@ -124,8 +122,7 @@ async def login(
     
     # Verify reCAPTCHA token if provided
     if recaptcha_token:
-        client_ip = request.client.host if request and request.client else None
-        is_valid = await recaptcha_service.verify_token(recaptcha_token, client_ip)
+        is_valid = await recaptcha_service.verify_token(recaptcha_token, client_ip(request))
         if not is_valid:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -140,7 +137,13 @@ async def login(
                 detail="reCAPTCHA verification required"
             )
     
-    user = authenticate_user(db, form_data.username, form_data.password)
+    async with login_slot(client_ip(request)) as acquired:
+        if not acquired:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many login attempts in progress. Please try again."
+            )
+        user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -163,8 +166,8 @@ async def read_users_me(current_user: User = Depends(get_current_user)):
 @router.get("/export-data")
 async def export_user_data(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-) -> JSONResponse:
+    db: AsyncSession = Depends(get_db)
+) -> StreamingResponse:
     """Export all user data for GDPR compliance.
     
     Returns a complete JSON export of all user data including:
@@ -174,25 +177,13 @@ async def export_user_data(
     
     This endpoint satisfies GDPR Article 20 (Right to Data Portability)
     and CCPA Section 1798.110 (Right to Know).
-    """
-    # Get all user moodboards
-    moodboards = db.query(Moodboard).filter(Moodboard.user_id == current_user.id).all()
     
-    # Prepare moodboard data
-    moodboards_data = []
-    for mb in moodboards:
-        moodboards_data.append({
-            "id": mb.id,
-            "title": mb.title,
-            "description": mb.description,
-            "aesthetic": mb.aesthetic,
-            "images": mb.images,  # JSON field with full image metadata
-            "created_at": mb.created_at.isoformat() if mb.created_at else None,
-            "updated_at": mb.updated_at.isoformat() if mb.updated_at else None
-        })
+    The JSON is streamed: moodboards are read and written one page at a time.
+    """
+    total_moodboards = await count_moodboards(db, current_user.id)
     
-    # Prepare complete export
-    export_data = {
+    # Prepare complete export (moodboards are streamed between "user_account" and "data_usage_summary")
+    export_head = {
         "export_metadata": {
             "export_date": datetime.utcnow().isoformat(),
             "export_version": "1.0",
@@ -207,10 +198,11 @@ async def export_user_data(
             "is_active": current_user.is_active,
             "account_created": current_user.created_at.isoformat() if current_user.created_at else None,
             "last_updated": current_user.updated_at.isoformat() if current_user.updated_at else None
-        },
-        "moodboards": moodboards_data,
+        }
+    }
+    export_tail = {
         "data_usage_summary": {
-            "total_moodboards": len(moodboards_data),
+            "total_moodboards": total_moodboards,
             "data_stored": [
                 "Account credentials (username, email, hashed password)",
                 "Saved moodboards (titles, descriptions, image references)",
@@ -239,9 +231,26 @@ async def export_user_data(
         }
     }
     
+    async def export_chunks():
+        yield json.dumps(export_head)[:-1] + ', "moodboards": ['
+        first = True
+        async for mb, images in iter_moodboards(current_user.id):
+            yield ("" if first else ", ") + json.dumps({
+                "id": mb.id,
+                "title": mb.title,
+                "description": mb.description,
+                "aesthetic": mb.aesthetic,
+                "images": images,  # Full image metadata as saved
+                "created_at": mb.created_at.isoformat() if mb.created_at else None,
+                "updated_at": mb.updated_at.isoformat() if mb.updated_at else None
+            })
+            first = False
+        yield "], " + json.dumps(export_tail)[1:]
+    
     # Return as downloadable JSON
-    return JSONResponse(
-        content=export_data,
+    return StreamingResponse(
+        export_chunks(),
+        media_type="application/json",
         headers={
             "Content-Disposition": f"attachment; filename=moorea_data_export_{current_user.username}_{datetime.utcnow().strftime('%Y%m%d')}.json",
             "Content-Type": "application/json"
@@ -251,7 +260,7 @@ async def export_user_data(
 @router.delete("/delete-account")
 async def delete_user_account(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Delete user account and all associated data (GDPR Right to Erasure).
     
@@ -263,11 +272,13 @@ async def delete_user_account(
     This action cannot be undone.
     """
     # Delete all user's moodboards first (cascade should handle this, but being explicit)
-    db.query(Moodboard).filter(Moodboard.user_id == current_user.id).delete()
+    await delete_images(db, select(Moodboard.id).where(Moodboard.user_id == current_user.id))
+    await db.execute(delete(Moodboard).where(Moodboard.user_id == current_user.id))
     
-    # Delete user account
-    db.delete(current_user)
-    db.commit()
+    # Delete user account (bulk delete: the ORM would lazy-load the moodboards relationship)
+    await db.execute(delete(User).where(User.id == current_user.id))
+    await db.commit()
+    await forget_user(current_user.username)
     
     return {
         "message": "Account deleted successfully",
@@ -0,0 +1,30 @@
+"""Performance metrics endpoints."""
+
+import logging
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.routes.auth import get_current_user
+from database import User, get_db
+from services.moodboard_store import most_saved_images
+from services.trace_service import trace_service
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+
+@router.get("/metrics/pipeline")
+async def pipeline_metrics():
+    """Latency histograms for every pipeline stage, aggregated over all jobs in this process."""
+    return {"stages": trace_service.snapshot()}
+
+
+@router.get("/metrics/most-saved-images")
+async def most_saved(
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Provider images saved in the most moodboards, across all users (signed-in users only)."""
+    return {"images": await most_saved_images(db, limit)}
@@ -7,7 +7,7 @@ import sys
 from typing import Optional
 from uuid import UUID, uuid4
 
-from fastapi import APIRouter, File, HTTPException, UploadFile, status, Form
+from fastapi import APIRouter, File, HTTPException, Query, UploadFile, status, Form
 from PIL import Image
 
 from models import (
@@ -15,8 +15,12 @@ from models import (
     MoodboardRequest,
     MoodboardResponse,
     JobStatusResponse,
-    MoodboardResult
+    MoodboardResult,
+    MoreImagesResponse
 )
+from services.cache_service import cache_service
+from services.candidate_pool import candidate_pool
+from services.download_tracker import download_tracker
 from services.job_service import job_service
 from services.moodboard_service import moodboard_service
 
@@ -53,7 +57,7 @@ async def generate_moodboard(
     pinterest_consent: bool = Form(False)
 ):
     """Generate moodboard from uploaded clothing image."""
-    print(f"[MOODBOARD] POST /moodboard/generate received - file: {file.filename}, type: {file.content_type}", flush=True)
+    logger.debug("POST /moodboard/generate received - file: %s, type: %s", file.filename, file.content_type)
     try:
         # Validate file
         _validate_image_file(file)
@@ -61,16 +65,35 @@ async def generate_moodboard(
         # Read file content
         file_content = await file.read()
         file_hash = _calculate_file_hash(file_content)
-        print(f"[MOODBOARD] File read OK - {len(file_content)} bytes, hash: {file_hash[:12]}", flush=True)
+        logger.debug("File read OK - %s bytes, hash: %s", len(file_content), file_hash[:12])
         
-        # Check if we already have an in-progress job for this image (avoid duplicate processing)
+        # Serve a previously generated moodboard for the same image immediately
+        cached = await cache_service.get_moodboard_cache(file_hash)
+        if cached:
+            job_id = uuid4()
+            await job_service.create_job(job_id=job_id, image_hash=file_hash, image_content=file_content)
+            result = MoodboardResult(**cached)
+            await job_service.store_cached_result(job_id, result)
+            download_tracker.enqueue_in_background(result.images)
+            logger.info("Moodboard cache hit for image hash: %s", file_hash)
+            return MoodboardResponse(
+                job_id=job_id,
+                status=JobStatus.COMPLETED,
+                message="Moodboard ready (served from cache)",
+                client_id=job_service.attach_client(job_id)
+            )
+
+        # Coalesce onto a queued or running job for this image (avoid duplicate processing).
+        # No awaits may suspend between this check and create_job below.
         existing_job = await job_service.get_job_by_image_hash(file_hash)
-        if existing_job and existing_job.status == JobStatus.PROCESSING:
-            logger.info(f"Found in-progress job for image hash: {file_hash}")
+        if existing_job and job_service.is_in_flight(existing_job):
+            job_service.touch(existing_job.id)
+            logger.info("Found in-progress job for image hash: %s", file_hash)
             return MoodboardResponse(
                 job_id=existing_job.id,
                 status=existing_job.status,
-                message="Image is already being processed"
+                message="Image is already being processed",
+                client_id=job_service.attach_client(existing_job.id)
             )
 
         # Validate image can be opened
@@ -90,22 +113,24 @@ async def generate_moodboard(
             image_hash=file_hash,
             image_content=file_content
         )
+        client_id = job_service.attach_client(job_id)
         
         # Queue moodboard generation
-        await moodboard_service.queue_generation(job_id, file_content, pinterest_consent)
+        await moodboard_service.queue_generation(job_id, file_content, pinterest_consent, image_hash=file_hash)
         
-        logger.info(f"Queued moodboard generation job: {job_id}")
+        logger.info("Queued moodboard generation job: %s", job_id)
         
         return MoodboardResponse(
             job_id=job_id,
             status=JobStatus.PENDING,
-            message="Moodboard generation started. Use job_id to check status."
+            message="Moodboard generation started. Use job_id to check status.",
+            client_id=client_id
         )
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error generating moodboard: {str(e)}")
+        logger.error("Error generating moodboard: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal server error during moodboard generation"
@@ -122,6 +147,7 @@ async def get_job_status(job_id: UUID):
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Job not found"
             )
+        job_service.touch(job_id)
         
         return JobStatusResponse(
             job_id=job.id,
@@ -129,13 +155,14 @@ async def get_job_status(job_id: UUID):
             progress=job.progress,
             created_at=job.created_at,
             completed_at=job.completed_at,
-            error_message=job.error_message
+            error_message=job.error_message,
+            stage_timings=job.stage_timings
         )
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error getting job status: {str(e)}")
+        logger.error("Error getting job status: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal server error getting job status"
@@ -164,8 +191,79 @@ async def get_moodboard_result(job_id: UUID):
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error getting moodboard result: {str(e)}")
+        logger.error("Error getting moodboard result: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal server error getting moodboard result"
-        )
\ No newline at end of file
+        )
+
+
+@router.get("/moodboard/{job_id}/more", response_model=MoreImagesResponse)
+async def get_more_images(
+    job_id: UUID,
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(12, ge=1, le=50)
+):
+    """Further images for a completed moodboard, served from its keywords' candidate pools."""
+    result = await job_service.get_job_result(job_id)
+    if not result or result.status != JobStatus.COMPLETED:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job result not found"
+        )
+    
+    keywords = result.search_keywords
+    if not keywords or not result.top_aesthetics:
+        return MoreImagesResponse(job_id=job_id, images=[], next_cursor=None, total_images_available=len(result.images))
+    
+    try:
+        positions = [int(part) for part in cursor.split(".")] if cursor else [0] * len(keywords)
+    except ValueError:
+        positions = []
+    if len(positions) != len(keywords) or any(position < 0 for position in positions):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    
+    images, positions, total, has_more = await candidate_pool.page(
+        result.top_aesthetics[0].name, keywords, result.search_providers, positions, limit,
+        exclude={image.url for image in result.images}
+    )
+    download_tracker.enqueue_in_background(images)
+    return MoreImagesResponse(
+        job_id=job_id,
+        images=images,
+        next_cursor=".".join(str(position) for position in positions) if has_more else None,
+        total_images_available=total
+    )
+
+
+@router.delete("/moodboard/{job_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def cancel_moodboard(
+    job_id: UUID,
+    client_id: str = Query(..., description="client_id returned by the upload")
+):
+    """Detach an upload from a queued or running moodboard job.
+
+    Uploads of the same image share one job, so the job is only cancelled once
+    every upload attached to it has detached.
+    """
+    job = await job_service.get_job_status(job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    
+    if not job_service.is_in_flight(job):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Job already finished. Current status: {job.status.value}"
+        )
+    
+    if not await job_service.detach_client(job_id, client_id):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not attached to this job"
+        )
@@ -1,13 +1,15 @@
 """Moodboard routes for saving and managing user moodboards."""
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from pydantic import BaseModel
 from datetime import datetime
 
 from database import get_db, User, Moodboard
 from app.routes.auth import get_current_user
+from services.moodboard_store import MAX_PAGE_SIZE, delete_images, images_for, list_summaries, save_images
 
 router = APIRouter(prefix="/api/v1/moodboards", tags=["moodboards"])
 
@@ -30,49 +32,85 @@ class MoodboardResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class MoodboardSummary(BaseModel):
+    """A saved moodboard without its images, for listings."""
+    id: int
+    title: str
+    description: Optional[str]
+    aesthetic: str
+    cover_image_url: Optional[str]
+    cover_source: Optional[str]
+    cover_link_url: Optional[str]
+    image_count: int
+    created_at: datetime
+    updated_at: datetime
+
+class MoodboardPage(BaseModel):
+    items: List[MoodboardSummary]
+    next_cursor: Optional[str]  # Pass as ?cursor= for the next page; None on the last page
+
 class MoodboardUpdate(BaseModel):
     title: Optional[str] = None
     description: Optional[str] = None
 
+async def _with_images(db: AsyncSession, moodboard: Moodboard) -> MoodboardResponse:
+    images = await images_for(db, [moodboard])
+    return MoodboardResponse(
+        id=moodboard.id,
+        title=moodboard.title,
+        description=moodboard.description,
+        aesthetic=moodboard.aesthetic,
+        images=images[moodboard.id],
+        created_at=moodboard.created_at,
+        updated_at=moodboard.updated_at
+    )
+
 @router.post("/", response_model=MoodboardResponse)
 async def create_moodboard(
     moodboard_data: MoodboardCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Create a new moodboard for the current user."""
     db_moodboard = Moodboard(
         title=moodboard_data.title,
         description=moodboard_data.description,
         aesthetic=moodboard_data.aesthetic,
-        images=moodboard_data.images,
+        images=[],
         user_id=current_user.id
     )
     db.add(db_moodboard)
-    db.commit()
-    db.refresh(db_moodboard)
-    return db_moodboard
+    await db.flush()
+    await save_images(db, db_moodboard.id, moodboard_data.images)
+    await db.commit()
+    await db.refresh(db_moodboard)
+    return await _with_images(db, db_moodboard)
 
-@router.get("/", response_model=List[MoodboardResponse])
+@router.get("/", response_model=MoodboardPage)
 async def get_user_moodboards(
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get all moodboards for the current user."""
-    moodboards = db.query(Moodboard).filter(Moodboard.user_id == current_user.id).all()
-    return moodboards
+    """List the current user's moodboards, newest first (summaries; GET /{id} for images)."""
+    try:
+        items, next_cursor = await list_summaries(db, current_user.id, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return MoodboardPage(items=items, next_cursor=next_cursor)
 
 @router.get("/{moodboard_id}", response_model=MoodboardResponse)
 async def get_moodboard(
     moodboard_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get a specific moodboard by ID."""
-    moodboard = db.query(Moodboard).filter(
+    moodboard = await db.scalar(select(Moodboard).where(
         Moodboard.id == moodboard_id,
         Moodboard.user_id == current_user.id
-    ).first()
+    ).limit(1))
     
     if not moodboard:
         raise HTTPException(
@@ -80,20 +118,20 @@ async def get_moodboard(
             detail="Moodboard not found"
         )
     
-    return moodboard
+    return await _with_images(db, moodboard)
 
 @router.put("/{moodboard_id}", response_model=MoodboardResponse)
 async def update_moodboard(
     moodboard_id: int,
     moodboard_update: MoodboardUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Update a moodboard."""
-    moodboard = db.query(Moodboard).filter(
+    moodboard = await db.scalar(select(Moodboard).where(
         Moodboard.id == moodboard_id,
         Moodboard.user_id == current_user.id
-    ).first()
+    ).limit(1))
     
     if not moodboard:
         raise HTTPException(
@@ -108,21 +146,21 @@ async def update_moodboard(
         moodboard.description = moodboard_update.description
     
     moodboard.updated_at = datetime.utcnow()
-    db.commit()
-    db.refresh(moodboard)
-    return moodboard
+    await db.commit()
+    await db.refresh(moodboard)
+    return await _with_images(db, moodboard)
 
 @router.delete("/{moodboard_id}")
 async def delete_moodboard(
     moodboard_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Delete a moodboard."""
-    moodboard = db.query(Moodboard).filter(
+    moodboard = await db.scalar(select(Moodboard).where(
         Moodboard.id == moodboard_id,
         Moodboard.user_id == current_user.id
-    ).first()
+    ).limit(1))
     
     if not moodboard:
         raise HTTPException(
@@ -130,6 +168,7 @@ async def delete_moodboard(
             detail="Moodboard not found"
         )
     
-    db.delete(moodboard)
-    db.commit()
+    await delete_images(db, [moodboard.id])
+    await db.delete(moodboard)
+    await db.commit()
     return {"message": "Moodboard deleted successfully"}
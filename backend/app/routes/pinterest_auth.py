@@ -21,7 +21,7 @@ async def authorize_pinterest():
         if not pinterest_oauth:
             logger.error("Pinterest OAuth service is not initialized")
             raise HTTPException(status_code=500, detail="Pinterest OAuth service not initialized")
-        auth_url = pinterest_oauth.get_authorization_url()
+        auth_url = await pinterest_oauth.get_authorization_url()
         logger.info(f"Generated auth URL: {auth_url}")
         
         # Return a redirect response (not JSON)
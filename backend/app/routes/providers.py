@@ -29,4 +29,14 @@ async def providers_status():
         status["pinterest_authenticated"] = False
         logger.warning(f"Pinterest client unavailable: {e}")
 
+    # Remaining hourly budget and backoff per provider (see services/rate_limiter.py)
+    try:
+        from services.rate_limiter import rate_limiter
+        status["rate_limits"] = {
+            name: await rate_limiter.status(name)
+            for name in ("unsplash", "pexels", "flickr", "pinterest")
+        }
+    except Exception as e:
+        logger.warning(f"Rate limiter status unavailable: {e}")
+
     return status
@@ -1,12 +1,12 @@
 """Waitlist routes for pre-launch email collection."""
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel, EmailStr
 from typing import Optional
 from datetime import datetime
 
-from database import get_db, WaitlistUser
+from database import dialect_insert, get_db, WaitlistUser
 
 router = APIRouter(prefix="/api/v1/waitlist", tags=["waitlist"])
 
@@ -27,45 +27,36 @@ class WaitlistSubscribeResponse(BaseModel):
 @router.post("/subscribe", response_model=WaitlistSubscribeResponse)
 async def subscribe_to_waitlist(
     request: WaitlistSubscribeRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Subscribe an email to the waitlist.
     
-    Validates the email format and prevents duplicate signups.
+    Validates the email format and prevents duplicate signups. The insert skips
+    existing emails (ON CONFLICT DO NOTHING), so this is a single round trip.
     """
-    # Check if email already exists
-    existing = db.query(WaitlistUser).filter(WaitlistUser.email == request.email).first()
-    
-    if existing:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="This email is already on the waitlist!"
-        )
-    
-    # Create new waitlist entry
-    waitlist_user = WaitlistUser(
-        email=request.email,
-        name=request.name,
-        notified=False
-    )
-    
     try:
-        db.add(waitlist_user)
-        db.commit()
-        db.refresh(waitlist_user)
-        
-        return WaitlistSubscribeResponse(
-            success=True,
-            message="Successfully added to waitlist! We'll notify you when we launch.",
-            email=request.email
+        inserted = await db.scalar(
+            dialect_insert(db)(WaitlistUser)
+            .values(email=request.email, name=request.name, notified=False, created_at=datetime.utcnow())
+            .on_conflict_do_nothing(index_elements=["email"])
+            .returning(WaitlistUser.id)
         )
+        await db.commit()
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to add email to waitlist: {str(e)}"
         )
-
-
-
-
+    
+    if inserted is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="This email is already on the waitlist!"
+        )
+    
+    return WaitlistSubscribeResponse(
+        success=True,
+        message="Successfully added to waitlist! We'll notify you when we launch.",
+        email=request.email
+    )
@@ -0,0 +1,92 @@
+"""Logging setup: queue-based handler, structured output and per-job correlation IDs.
+
+Records are handed to a QueueHandler on the calling thread and written to stdout
+by a QueueListener thread, so slow or blocked stdout never stalls the event loop.
+Every record carries the ID of the moodboard job it was emitted for (or "-"),
+taken from a context variable that asyncio propagates into each job's task.
+
+Log calls on hot paths use %-style arguments (logger.info("x=%s", x)) so messages
+are only formatted when the level is enabled.
+"""
+
+import contextvars
+import json
+import logging
+import queue
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+from .settings import settings
+
+job_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("job_id", default=None)
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s [job=%(job_id)s] %(message)s"
+
+_listener: Optional[QueueListener] = None
+
+
+def bind_job_id(job_id) -> contextvars.Token:
+    """Tag every log record emitted in the current context with a job ID."""
+    return job_id_var.set(str(job_id))
+
+
+class CorrelationFilter(logging.Filter):
+    """Attach the current job ID; runs on the emitting thread, where the context is live."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "job_id"):
+            record.job_id = job_id_var.get() or "-"
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line for log aggregation."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "job_id": getattr(record, "job_id", "-"),
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def configure_logging(level: Optional[str] = None, fmt: Optional[str] = None) -> None:
+    """Route all logging through a background queue listener. Safe to call more than once."""
+    global _listener
+
+    level_name = (level or settings.log_level).upper()
+    handler = logging.StreamHandler(sys.stdout)
+    if (fmt or settings.log_format) == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(CorrelationFilter())
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(queue_handler)
+    root.setLevel(getattr(logging, level_name, logging.INFO))
+
+    if _listener is not None:
+        _listener.stop()
+    _listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
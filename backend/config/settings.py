@@ -14,6 +14,8 @@ class Settings(BaseSettings):
     app_name: str = "Moodboard Generator"
     app_version: str = "1.0.0"
     debug: bool = False
+    log_level: str = "INFO"  # DEBUG enables per-job classification score dumps
+    log_format: str = "text"  # "text" or "json"
     
     # API settings
     api_host: str = "0.0.0.0"
@@ -24,6 +26,12 @@ class Settings(BaseSettings):
     
     # Security
     secret_key: str = "your-secret-key-change-in-production"
+    bcrypt_rounds: int = 12  # Cost factor for new hashes; older hashes are upgraded on the next login
+    password_hash_workers: int = 4  # Threads for bcrypt (it releases the GIL), off the event loop
+    login_max_concurrent_per_ip: int = 2  # Further simultaneous logins from one address get 429
+    trusted_proxy_hops: int = 0  # Reverse proxies in front of the app that append to X-Forwarded-For (Railway: 1)
+    auth_principal_cache_ttl: float = 30.0  # Seconds a token's user is served without a DB query
+    auth_token_cache_size: int = 10000  # Decoded JWTs memoized in process
     
     # Redis
     redis_url: str = "redis://localhost:6379"
@@ -39,6 +47,37 @@ class Settings(BaseSettings):
     # Feature toggles
     enable_pexels: bool = True
     
+    # Unsplash download tracking, sent in the background (services/download_tracker.py)
+    unsplash_download_batch_size: int = 20
+    unsplash_download_flush_interval: float = 2.0  # Seconds between batches; also the retry backoff base
+    unsplash_download_max_attempts: int = 5
+    unsplash_download_dedupe_window: int = 3600  # A photo is tracked at most once per window
+    unsplash_download_worker_ttl: int = 60  # A stopped worker's in-flight batch is re-queued after this long
+    
+    # Outbound HTTP pool shared by all image providers (see services/image_provider.py)
+    http2_enabled: bool = True  # Needs the optional h2 package (httpx[http2])
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry: float = 30.0
+    
+    # Provider rate budgets (requests per hour, shared across workers via Redis). Unset: no
+    # local cap until the provider reports its limit (X-Ratelimit-Limit), then that limit
+    unsplash_hourly_quota: Optional[int] = None  # Demo apps get 50/h, production apps 5000/h; Unsplash reports which
+    pexels_hourly_quota: Optional[int] = 200
+    flickr_hourly_quota: Optional[int] = 3600
+    pinterest_hourly_quota: Optional[int] = 1000
+    provider_backoff_base: float = 30.0  # First backoff after a 429; doubles per repeat
+    provider_backoff_max: float = 3600.0
+    
+    # Provider search timeouts and hedging, adapted from each provider's recent latencies
+    provider_search_timeout: float = 15.0  # Ceiling per search, and the whole fetch stage
+    provider_search_timeout_floor: float = 2.0
+    provider_timeout_multiplier: float = 2.0  # Search timeout = multiplier x recent p99
+    provider_hedge_quantile: float = 0.95  # Send a duplicate search once this latency quantile has passed
+    provider_latency_window: int = 200  # Recent searches kept per provider
+    provider_latency_min_samples: int = 20  # Fixed timeouts and no hedging until this many
+    fetch_enough_candidates: int = 30  # Fetch stage stops early once every provider delivered its share (2:1:1, Pinterest-weighted) of this many
+    
     # Pinterest API
     pinterest_access_token: Optional[str] = None
     pinterest_refresh_token: Optional[str] = None
@@ -49,6 +88,23 @@ class Settings(BaseSettings):
     backend_url: str = "http://localhost:8002"  # Backend API URL for OAuth redirects
     frontend_url: str = "http://localhost:3000"  # Frontend URL for post-OAuth redirect
     use_mock_pinterest: bool = False  # Toggle between mock and real API
+    pinterest_token_refresh_margin: float = 3600.0  # Refresh the access token this long before it expires
+    pinterest_token_sync_interval: float = 300.0  # Re-read token state from Redis (other workers may have refreshed)
+    pinterest_board_cache_ttl: int = 600  # Board list and per-board pins, per connected account
+    pinterest_boards_per_search: int = 5  # Boards whose pins are fetched (concurrently) per board search
+    pinterest_prefetch_boards: int = 10  # Largest boards whose pins are fetched right after listing boards
+    pinterest_max_board_pages: int = 4  # Bookmark pages followed when listing boards
+    
+    # Waitlist launch email (services/waitlist_service.py, scripts/notify_waitlist.py)
+    waitlist_mailer: str = "log"  # "log" (writes emails to the log, for local runs) or "smtp"
+    waitlist_notify_batch_size: int = 200  # Rows per keyset page, marked notified in one UPDATE
+    waitlist_notify_concurrency: int = 10  # Emails in flight at once
+    smtp_host: Optional[str] = None
+    smtp_port: int = 587
+    smtp_username: Optional[str] = None
+    smtp_password: Optional[str] = None
+    smtp_from: str = "Moorea <hello@moorea.app>"
+    smtp_starttls: bool = True
     
     # reCAPTCHA
     recaptcha_secret_key: Optional[str] = None
@@ -108,8 +164,51 @@ class Settings(BaseSettings):
     # Cache settings
     classification_cache_ttl: int = 86400 * 7  # 7 days
     api_cache_ttl: int = 86400  # 24 hours
+    api_cache_stale_ttl: int = 86400 * 6  # Served stale (and refreshed in the background) for this long after
+    api_negative_cache_ttl: int = 300  # Empty provider results
+    pinterest_api_cache_ttl: int = 3600  # Pinterest results: 1 hour, never served stale (Pinterest terms: do not store API data)
+    l1_cache_max_bytes: int = 64 * 1024 * 1024  # In-process tier in front of Redis; entries over 1/8 of this skip it
+    l1_cache_ttl: int = 300  # Max seconds an entry lives in process (other workers' writes show up by then)
+    l1_cache_pubsub_invalidation: bool = True  # Drop other workers' overwritten entries immediately
+    cache_version_refresh: float = 30.0  # Seconds between re-reads of namespace versions from Redis
+    cache_scan_batch: int = 500  # SCAN COUNT hint and UNLINK chunk size
+    cache_compress_min_bytes: int = 1024  # zstd-compress cache values at least this large (needs zstandard)
+    cache_compress_level: int = 3
+    cache_stats_scan_limit: int = 100000  # Keys examined per /cache stats call before counts are reported as sampled
+
+    # Near-duplicate removal before rerank (services/dedupe_service.py)
+    near_duplicate_filter_enabled: bool = True
+    near_duplicate_max_distance: int = 6  # Max differing bits between 64-bit thumbnail hashes (<= 7)
+    near_duplicate_fetch_timeout: float = 2.0  # Per thumbnail download
+    image_hash_cache_ttl: int = 86400 * 30  # Hashes per URL, like embeddings
+    image_hash_local_size: int = 10000  # Hashes kept in process in front of Redis
+
+    # Candidate pools for "load more" (services/candidate_pool.py)
+    candidate_pool_ttl: int = 86400  # 24 hours, like the API cache
+    candidate_pool_max_size: int = 300  # Candidates kept per (aesthetic, keyword)
+    candidate_pool_lock_ttl: int = 30  # Single-flight lock while fetching the next page
+    candidate_pool_local_size: int = 256  # Pools kept in process without Redis
+
+    # API cache warmer (services/cache_warmer.py)
+    cache_warmer_enabled: bool = False
+    cache_warm_interval: float = 1800.0  # Seconds between passes
+    cache_warm_max_requests: int = 100  # Provider requests per pass
+    cache_warm_budget_reserve: float = 0.5  # Fraction of each hourly quota kept for live jobs
+    cache_warm_history_days: int = 7  # Window for "popular in recent jobs"
     embedding_cache_ttl: int = 86400 * 30  # 30 days
-    
+    moodboard_cache_ttl: int = 3600  # 1 hour
+
+    # Moodboard result cache - bump pipeline_version whenever the pipeline output changes
+    pipeline_version: str = "1"
+    boost_rules_version: str = "1"  # Bump when the aesthetic boost rules in moodboard_service change
+    moodboard_lock_ttl: int = 120  # Single-flight lock TTL for one image; the leader renews it every TTL/3 while it runs
+    moodboard_coalesce_timeout: float = 60.0  # Max seconds a follower waits for the leader's result
+
+    # Job lifetime - every job gets a deadline; jobs nobody polls any more are cancelled
+    job_deadline: float = 300.0  # Seconds from upload until a job is abandoned as too slow; matches the frontend's polling budget (Home.tsx: 60 polls x 5s)
+    job_abandon_timeout: float = 30.0  # Seconds without a status poll before a job is cancelled
+    job_reaper_interval: float = 5.0
+
     class Config:
         # Absolute path so settings always finds backend/.env regardless of CWD
         env_file = str(Path(__file__).parent.parent / ".env")
@@ -1,9 +1,24 @@
-"""Database configuration and models."""
+"""Database configuration and models.
 
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, Boolean, ForeignKey, JSON
+Request handlers use the async engine (asyncpg for Postgres, aiosqlite for the
+local SQLite file) through the get_db dependency, so queries never block the
+event loop that also runs moodboard pipelines. The sync engine is kept for
+create_tables() and scripts. Behind a transaction-mode pooler (pgbouncer, the
+Supabase pooler on port 6543) the async engine leaves pooling to the pooler and
+does not cache prepared statements, which do not survive a server connection
+being handed to another client.
+"""
+
+from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, Boolean, ForeignKey, Index, JSON, UniqueConstraint
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.engine import make_url
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.pool import NullPool
 from datetime import datetime
+from uuid import uuid4
 import os
 from dotenv import load_dotenv
 
@@ -61,6 +76,64 @@ else:
     )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+# libpq connection parameters asyncpg does not accept; sslmode is translated to ssl
+_LIBPQ_ONLY_PARAMS = ("sslmode", "sslrootcert", "sslcert", "sslkey", "sslcrl", "connect_timeout",
+                      "options", "application_name", "target_session_attrs", "gssencmode", "channel_binding")
+
+
+def _async_url(url: str) -> str:
+    """The same database through an async driver."""
+    if url.startswith("sqlite:"):
+        return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    for scheme in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(scheme):
+            async_url = make_url("postgresql+asyncpg://" + url[len(scheme):])
+            query = dict(async_url.query)
+            if "sslmode" in query and "ssl" not in query:
+                query["ssl"] = query["sslmode"]  # asyncpg takes the same mode names
+            query = {k: v for k, v in query.items() if k not in _LIBPQ_ONLY_PARAMS}
+            return async_url.set(query=query).render_as_string(hide_password=False)
+    return url
+
+
+def _behind_pgbouncer(url: str) -> bool:
+    """Transaction-mode poolers (the Supabase pooler on port 6543) reuse server connections across clients."""
+    parsed = make_url(url)
+    return parsed.port == 6543 or "pooler." in (parsed.host or "")
+
+
+if DATABASE_URL.startswith("sqlite"):
+    async_engine = create_async_engine(_async_url(DATABASE_URL), echo=False)
+elif _behind_pgbouncer(DATABASE_URL):
+    # The pooler already pools; prepared statements must not outlive a transaction
+    # or collide by name across clients sharing a server connection
+    async_engine = create_async_engine(
+        _async_url(DATABASE_URL),
+        poolclass=NullPool,
+        connect_args={
+            "timeout": 10,
+            "statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+            "server_settings": {"statement_timeout": "30000"}
+        }
+    )
+else:
+    # Same pool sizing and timeouts as the sync engine, in asyncpg's terms
+    async_engine = create_async_engine(
+        _async_url(DATABASE_URL),
+        pool_size=5,
+        max_overflow=10,
+        pool_pre_ping=True,
+        pool_recycle=3600,
+        connect_args={
+            "timeout": 10,
+            "server_settings": {"statement_timeout": "30000"}
+        }
+    )
+# expire_on_commit=False: handlers return ORM objects after commit without lazy reloads
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+
 Base = declarative_base()
 
 class User(Base):
@@ -86,13 +159,44 @@ class Moodboard(Base):
     title = Column(String, nullable=False)
     description = Column(Text, nullable=True)
     aesthetic = Column(String, nullable=False)  # The detected aesthetic
-    images = Column(JSON, nullable=False)  # List of image URLs and metadata
+    # Legacy inline image list. Images now live in moodboard_images/images; new moodboards
+    # store [] here and scripts/migrate_moodboard_images.py moves existing lists over.
+    images = Column(JSON, nullable=False, default=list)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationship to user
     owner = relationship("User", back_populates="moodboards")
+    
+    __table_args__ = (
+        # Keyset pagination of a user's moodboards, newest first (services/moodboard_store.py)
+        Index("ix_moodboards_user_created_id", "user_id", "created_at", "id"),
+    )
+
+class SavedImage(Base):
+    """One image saved in any moodboard, stored once however many boards use it."""
+    __tablename__ = "images"
+    
+    id = Column(Integer, primary_key=True)
+    source = Column(String, nullable=False)  # source_api (unsplash, pexels, ..., original_upload)
+    provider_image_id = Column(String, nullable=False)  # Provider's id, or "url:<sha256>" when none was given
+    url = Column(Text, nullable=False)
+    details = Column(JSON, nullable=True)  # Remaining fields as saved (photographer, source_url, ...)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        UniqueConstraint("source", "provider_image_id", name="uq_images_source_provider_image_id"),
+    )
+
+class MoodboardImage(Base):
+    """An image's position in a moodboard."""
+    __tablename__ = "moodboard_images"
+    
+    moodboard_id = Column(Integer, ForeignKey("moodboards.id", ondelete="CASCADE"), primary_key=True)
+    position = Column(Integer, primary_key=True)
+    image_id = Column(Integer, ForeignKey("images.id"), nullable=False, index=True)  # "Most saved" aggregates
+    details = Column(JSON, nullable=True)  # Fields specific to this board (e.g. similarity_score)
 
 class WaitlistUser(Base):
     """Waitlist signup model for pre-launch email collection."""
@@ -103,15 +207,35 @@ class WaitlistUser(Base):
     name = Column(String, nullable=True)  # Optional
     created_at = Column(DateTime, default=datetime.utcnow)
     notified = Column(Boolean, default=False)  # Track if we've sent launch email
+    
+    __table_args__ = (
+        # Notifier walks un-notified rows by id (services/waitlist_service.py)
+        Index("ix_waitlist_users_notified_id", "notified", "id"),
+    )
 
 def create_tables():
-    """Create all database tables."""
+    """Create all database tables, and indexes added to existing tables since."""
     Base.metadata.create_all(bind=engine)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+def pool_status():
+    """Connection pool usage by state (scraped by the moorea_db_pool_connections gauge)."""
+    pool = async_engine.pool
+    status = {}
+    for state, attr in (("size", "size"), ("checked_out", "checkedout"),
+                        ("checked_in", "checkedin"), ("overflow", "overflow")):
+        reader = getattr(pool, attr, None)
+        if callable(reader):
+            status[(state,)] = reader()
+    return status
+
+def dialect_insert(db: AsyncSession):
+    """insert() of the session's dialect, for ON CONFLICT DO NOTHING (Postgres and SQLite)."""
+    return postgresql_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
 
-def get_db():
-    """Get database session."""
-    db = SessionLocal()
-    try:
+async def get_db():
+    """Get an async database session."""
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
@@ -2,11 +2,21 @@
 
 from datetime import datetime
 from enum import Enum
-from typing import List, Optional
+from typing import Dict, Iterable, List, Optional, Type, TypeVar
 from uuid import UUID
 
 from pydantic import BaseModel, Field
 
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+def from_cache(model: Type[ModelT], items: Iterable[Dict]) -> List[ModelT]:
+    """Build models from cache entries this app wrote itself, skipping validation.
+    
+    Fields left out of an entry (cached with exclude_none) get their defaults.
+    """
+    return [model.model_construct(**item) for item in items]
+
 
 class JobStatus(str, Enum):
     """Job processing status."""
@@ -14,6 +24,7 @@ class JobStatus(str, Enum):
     PROCESSING = "processing"
     COMPLETED = "completed"
     FAILED = "failed"
+    CANCELLED = "cancelled"
 
 
 class AestheticScore(BaseModel):
@@ -46,6 +57,7 @@ class MoodboardResponse(BaseModel):
     job_id: UUID = Field(..., description="Job identifier for tracking")
     status: JobStatus = Field(..., description="Current job status")
     message: str = Field(..., description="Human-readable status message")
+    client_id: Optional[str] = Field(None, description="Pass to DELETE /moodboard/{job_id} to detach this upload")
 
 
 class JobStatusResponse(BaseModel):
@@ -55,7 +67,8 @@ class JobStatusResponse(BaseModel):
     progress: Optional[int] = Field(None, ge=0, le=100, description="Processing progress percentage")
     created_at: datetime = Field(..., description="Job creation timestamp")
     completed_at: Optional[datetime] = Field(None, description="Job completion timestamp")
-    error_message: Optional[str] = Field(None, description="Error message if status is FAILED")
+    error_message: Optional[str] = Field(None, description="Error message if status is FAILED or CANCELLED")
+    stage_timings: Dict[str, float] = Field(default_factory=dict, description="Seconds spent per pipeline stage")
 
 
 class MoodboardResult(BaseModel):
@@ -66,6 +79,16 @@ class MoodboardResult(BaseModel):
     images: List[ImageCandidate] = Field(..., description="Curated moodboard images")
     created_at: datetime = Field(..., description="Result creation timestamp")
     processing_time: Optional[float] = Field(None, description="Total processing time in seconds")
+    search_keywords: List[str] = Field(default_factory=list, description="Keywords the candidates were fetched for")
+    search_providers: List[str] = Field(default_factory=list, description="Providers the candidates were fetched from")
+
+
+class MoreImagesResponse(BaseModel):
+    """A further page of images for a completed moodboard (endless scroll)."""
+    job_id: UUID = Field(..., description="Job identifier")
+    images: List[ImageCandidate] = Field(..., description="Images not yet shown")
+    next_cursor: Optional[str] = Field(None, description="Pass as ?cursor= for the next page; None when exhausted")
+    total_images_available: int = Field(..., description="Images known so far for this moodboard's keywords")
 
 
 class MoodboardRequest(BaseModel):
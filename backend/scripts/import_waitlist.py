@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""Import waitlist signups from a CSV file.
+
+The file needs an ``email`` column; a ``name`` column is used when present.
+Emails already on the waitlist and invalid addresses are skipped, so re-running
+an import is safe.
+Usage: python scripts/import_waitlist.py signups.csv
+"""
+
+import asyncio
+import csv
+import sys
+from pathlib import Path
+
+# Ensure backend package is on sys.path when running from anywhere
+backend_dir = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(backend_dir))
+
+from database import async_engine, create_tables
+from services.waitlist_service import bulk_import
+
+
+async def main(path: str):
+    create_tables()
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        rows = [(row.get("email"), row.get("name")) for row in csv.DictReader(f)]
+    result = await bulk_import(rows)
+    await async_engine.dispose()
+    print(f"Added {result['added']}, already listed {result['already_listed']}, invalid {result['invalid']}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit(__doc__)
+    asyncio.run(main(sys.argv[1]))
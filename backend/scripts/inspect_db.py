@@ -9,7 +9,7 @@ tables = [r[0] for r in cur.execute("SELECT name FROM sqlite_master WHERE type='
 print("Tables:")
 for t in tables:
     print(" -", t)
-for t in ("users","moodboards","waitlist_users"):
+for t in ("users","moodboards","images","moodboard_images","waitlist_users"):
     try:
         cnt = cur.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0]
         print(f"{t} count: {cnt}")
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""Move moodboards' inline image lists into the images/moodboard_images tables.
+
+Safe to re-run: a moodboard is migrated by writing its image rows and emptying
+its inline list in one transaction, and moodboards with an empty list are skipped.
+Usage: python scripts/migrate_moodboard_images.py [batch_size]
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+# Ensure backend package is on sys.path when running from anywhere
+backend_dir = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(backend_dir))
+
+from sqlalchemy import delete, func, select
+
+from database import AsyncSessionLocal, Moodboard, MoodboardImage, async_engine, create_tables
+from services.moodboard_store import save_images
+
+
+async def main(batch_size: int):
+    create_tables()
+    migrated = 0
+    last_id = 0
+    async with AsyncSessionLocal() as db:
+        while True:
+            batch = (await db.scalars(
+                select(Moodboard)
+                .where(Moodboard.id > last_id, func.json_array_length(Moodboard.images) > 0)
+                .order_by(Moodboard.id)
+                .limit(batch_size)
+            )).all()
+            if not batch:
+                break
+            for moodboard in batch:
+                # Replace rather than append, in case an earlier run wrote rows but did not commit
+                await db.execute(delete(MoodboardImage).where(MoodboardImage.moodboard_id == moodboard.id))
+                await save_images(db, moodboard.id, list(moodboard.images))
+                moodboard.images = []
+            await db.commit()
+            migrated += len(batch)
+            last_id = batch[-1].id
+            db.expunge_all()
+            print(f"Migrated {migrated} moodboards")
+    await async_engine.dispose()
+    print(f"Done: {migrated} moodboards migrated")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 200))
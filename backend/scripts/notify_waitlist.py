@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""Send the launch email to everyone on the waitlist not yet notified.
+
+Uses the mailer from settings.waitlist_mailer unless --mailer is given; with
+``--mailer log`` nothing is sent and rows are still marked notified, so use it
+against a local database only. Safe to re-run: notified rows are skipped.
+Usage: python scripts/notify_waitlist.py [--mailer log|smtp]
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# Ensure backend package is on sys.path when running from anywhere
+backend_dir = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(backend_dir))
+
+from database import async_engine, create_tables
+from services.waitlist_service import WaitlistNotifier, get_mailer
+
+
+async def main(mailer_name: str):
+    create_tables()
+    notifier = WaitlistNotifier(get_mailer(mailer_name))
+    print(f"{await notifier.pending()} waitlist signups to notify")
+    result = await notifier.run()
+    await async_engine.dispose()
+    print(f"Done: {result['sent']} sent, {result['failed']} failed")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Send the waitlist launch email")
+    parser.add_argument("--mailer", choices=["log", "smtp"], default=None)
+    args = parser.parse_args()
+    asyncio.run(main(args.mailer))
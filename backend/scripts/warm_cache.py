@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""Run one cache-warming pass over the aesthetic keyword space (see services/cache_warmer.py)."""
+
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+# Ensure backend package is on sys.path when running from anywhere
+backend_dir = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(backend_dir))
+
+from config.logging_config import configure_logging, shutdown_logging
+from services.aesthetic_service import aesthetic_service
+from services.cache_service import cache_service
+from services.cache_warmer import cache_warmer
+from services.image_provider import close_http_client
+
+
+async def main():
+    await cache_service.initialize()
+    await aesthetic_service.initialize()
+    try:
+        stats = await cache_warmer.warm_once()
+        print(json.dumps(stats, indent=2))
+    finally:
+        await close_http_client()
+        await cache_service.close()
+
+
+if __name__ == "__main__":
+    configure_logging()
+    try:
+        asyncio.run(main())
+    finally:
+        shutdown_logging()
@@ -1,10 +1,35 @@
-"""Authentication service for user management."""
+"""Authentication service for user management.
 
+bcrypt costs 100-300 ms of CPU per hash or check, so the async helpers
+(hash_password, check_password) run it on a small dedicated thread pool instead of
+the event loop. Hashes use settings.bcrypt_rounds; a successful login with a hash
+of a different cost re-hashes the password transparently.
+
+get_principal() resolves a JWT to its user without a DB round trip in the common
+case: decoded tokens are memoized until they expire, and users are kept in the
+cache service's in-process tier for settings.auth_principal_cache_ttl seconds.
+forget_user() drops a user in every worker; call it when an account is deleted
+or deactivated.
+
+Login limits are per client address (client_ip). Behind a reverse proxy every
+request comes from the proxy, so settings.trusted_proxy_hops must be set to the
+number of proxies that append to X-Forwarded-For (1 on Railway); otherwise all
+users share one address and one set of login slots.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import AsyncIterator, Dict, Optional, Tuple
 from jose import JWTError, jwt
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from config import settings
 from database import User
+from services.cache_service import cache_service
 import os
 import bcrypt
 
@@ -13,6 +38,11 @@ SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+_password_pool = ThreadPoolExecutor(max_workers=settings.password_hash_workers, thread_name_prefix="bcrypt")
+_logins_in_flight: Dict[str, int] = {}
+_decoded_tokens: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()  # token -> (subject, exp)
+_PRINCIPAL_FIELDS = ("id", "email", "username", "is_active")
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its bcrypt hash."""
     try:
@@ -25,10 +55,57 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 def get_password_hash(password: str) -> str:
     """Hash a password using bcrypt."""
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=settings.bcrypt_rounds)
     hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
     return hashed.decode('utf-8')
 
+async def hash_password(password: str) -> str:
+    """get_password_hash() on the bcrypt pool."""
+    return await asyncio.get_running_loop().run_in_executor(_password_pool, get_password_hash, password)
+
+async def check_password(plain_password: str, hashed_password: str) -> bool:
+    """verify_password() on the bcrypt pool."""
+    return await asyncio.get_running_loop().run_in_executor(
+        _password_pool, verify_password, plain_password, hashed_password
+    )
+
+def needs_rehash(hashed_password: str) -> bool:
+    """Whether a bcrypt hash ($2b$<rounds>$...) was made with a different cost factor."""
+    try:
+        return int(hashed_password.split("$")[2]) != settings.bcrypt_rounds
+    except (IndexError, ValueError):
+        return False
+
+def client_ip(request) -> Optional[str]:
+    """The caller's address, from X-Forwarded-For behind settings.trusted_proxy_hops proxies.
+
+    Only the entry appended by the outermost trusted proxy is used; entries to its
+    left come from the client and can be forged.
+    """
+    if request is None:
+        return None
+    hops = settings.trusted_proxy_hops
+    if hops > 0:
+        forwarded = [part.strip() for part in request.headers.get("x-forwarded-for", "").split(",") if part.strip()]
+        if len(forwarded) >= hops:
+            return forwarded[-hops]
+    return request.client.host if request.client else None
+
+@asynccontextmanager
+async def login_slot(client_ip: Optional[str]) -> AsyncIterator[bool]:
+    """Hold one of the client's concurrent login slots; yields False when none is free."""
+    key = client_ip or "unknown"
+    if _logins_in_flight.get(key, 0) >= settings.login_max_concurrent_per_ip:
+        yield False
+        return
+    _logins_in_flight[key] = _logins_in_flight.get(key, 0) + 1
+    try:
+        yield True
+    finally:
+        _logins_in_flight[key] -= 1
+        if not _logins_in_flight[key]:
+            del _logins_in_flight[key]
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create a JWT access token."""
     to_encode = data.copy()
@@ -41,37 +118,84 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 def verify_token(token: str) -> Optional[str]:
-    """Verify a JWT token and return the username."""
+    """Verify a JWT token and return the username (memoized until the token expires)."""
+    cached = _decoded_tokens.get(token)
+    if cached is not None:
+        if time.time() < cached[1]:
+            _decoded_tokens.move_to_end(token)
+            return cached[0]
+        del _decoded_tokens[token]
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
         if username is None:
             return None
+        if "exp" in payload:
+            _decoded_tokens[token] = (username, float(payload["exp"]))
+            while len(_decoded_tokens) > settings.auth_token_cache_size:
+                _decoded_tokens.popitem(last=False)
         return username
     except JWTError:
         return None
 
-def authenticate_user(db: Session, username: str, password: str) -> Optional[User]:
+def _principal_key(username: str) -> str:
+    return f"principal:{username}"
+
+async def get_principal(db: AsyncSession, token: str) -> Optional[User]:
+    """The user a token belongs to, from the principal cache when possible.
+    
+    Cached users are detached copies without the password hash; use
+    get_user_by_username() when the row itself is needed.
+    """
+    username = verify_token(token)
+    if username is None:
+        return None
+    
+    cached = cache_service.get_local(_principal_key(username))
+    if cached is not None:
+        return User(
+            **cached["fields"],
+            created_at=datetime.fromisoformat(cached["created_at"]) if cached["created_at"] else None,
+            updated_at=datetime.fromisoformat(cached["updated_at"]) if cached["updated_at"] else None,
+        )
+    
+    user = await get_user_by_username(db, username)
+    if user is not None:
+        cache_service.set_local(_principal_key(username), {
+            "fields": {name: getattr(user, name) for name in _PRINCIPAL_FIELDS},
+            "created_at": user.created_at.isoformat() if user.created_at else None,
+            "updated_at": user.updated_at.isoformat() if user.updated_at else None,
+        }, settings.auth_principal_cache_ttl)
+    return user
+
+async def forget_user(username: str) -> None:
+    """Drop a user from the principal cache in every worker (account deleted or deactivated)."""
+    await cache_service.evict(_principal_key(username))
+
+async def authenticate_user(db: AsyncSession, username: str, password: str) -> Optional[User]:
     """Authenticate a user with username and password."""
-    user = db.query(User).filter(User.username == username).first()
+    user = await get_user_by_username(db, username)
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    if not await check_password(password, user.hashed_password):
         return None
+    if needs_rehash(user.hashed_password):
+        user.hashed_password = await hash_password(password)
+        await db.commit()
     return user
 
-def get_user_by_username(db: Session, username: str) -> Optional[User]:
+async def get_user_by_username(db: AsyncSession, username: str) -> Optional[User]:
     """Get user by username."""
-    return db.query(User).filter(User.username == username).first()
+    return await db.scalar(select(User).where(User.username == username).limit(1))
 
-def get_user_by_email(db: Session, email: str) -> Optional[User]:
+async def get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
     """Get user by email."""
-    return db.query(User).filter(User.email == email).first()
+    return await db.scalar(select(User).where(User.email == email).limit(1))
 
-def create_user(db: Session, username: str, email: str, password: str) -> User:
+async def create_user(db: AsyncSession, username: str, email: str, password: str) -> User:
     """Create a new user."""
     from datetime import datetime
-    hashed_password = get_password_hash(password)
+    hashed_password = await hash_password(password)
     db_user = User(
         username=username,
         email=email,
@@ -80,6 +204,6 @@ def create_user(db: Session, username: str, email: str, password: str) -> User:
         updated_at=datetime.utcnow()
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
@@ -0,0 +1,50 @@
+"""Byte encoding for cache values (see services/cache_service.py).
+
+Values are JSON, written with orjson when it is installed (several times faster
+than the json module, and it writes numpy arrays directly) and compressed with
+zstd when the optional ``zstandard`` package is installed and the payload is at
+least settings.cache_compress_min_bytes. Compressed values are recognised by the
+zstd frame magic number, so plain and compressed values (and values written
+before compression was enabled) can be read side by side.
+"""
+
+import json
+from typing import Any
+
+from config import settings
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+    _compressor = zstandard.ZstdCompressor(level=settings.cache_compress_level)
+    _decompressor = zstandard.ZstdDecompressor()
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+def encode(value: Any) -> bytes:
+    """Serialize a JSON-compatible value, compressing large payloads."""
+    if ORJSON_AVAILABLE:
+        data = orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY)
+    else:
+        data = json.dumps(value, separators=(",", ":")).encode()
+    if ZSTD_AVAILABLE and len(data) >= settings.cache_compress_min_bytes:
+        return _compressor.compress(data)
+    return data
+
+
+def decode(data: bytes) -> Any:
+    """Inverse of encode()."""
+    if data[:4] == _ZSTD_MAGIC:
+        if not ZSTD_AVAILABLE:
+            raise ValueError("Compressed cache value but zstandard is not installed")
+        data = _decompressor.decompress(data)
+    return orjson.loads(data) if ORJSON_AVAILABLE else json.loads(data)
@@ -12,12 +12,23 @@ Cache Types and TTLs:
   - Why: Classification is deterministic; same image = same result
   - Data Stored: Only aesthetic names and scores (no API data, no raw images)
   
-- API Response Cache: 1 hour (search results from Unsplash, Pexels, Flickr, Pinterest)
+- API Response Cache: 24 hours fresh + stale window (search results from Unsplash, Pexels, Flickr);
+  Pinterest: 1 hour, no stale window
   - Stores: Image URLs and metadata (NOT raw API responses)
   - Why: Performance optimization to reduce API calls within rate limits
+  - Keyed by provider, normalized query and page size for every provider; stale
+    entries are served instantly and refreshed in the background, empty results
+    are cached for a few minutes only
+  - Pinterest exception: because of Pinterest's "do not store" terms its results
+    keep the short settings.pinterest_api_cache_ttl and are never served stale
   - Data Stored: Only URLs, photographer names, source links (publicly accessible info)
   - Compliance: Does NOT store proprietary API data structures or private information
   
+- Pinterest Board Cache: 10 minutes (the connected account's boards and their pins)
+  - Stores: Board ids, names and descriptions per account; processed image references per board
+  - Why: The board fallback search otherwise lists boards and fetches each board's pins per query
+  - Compliance: Short TTL; like the API cache, only processed image references are kept
+  
 - Embedding Cache: 2 hours (CLIP embeddings for similarity scoring)
   - Stores: Vector embeddings for candidate images
   - Why: Embedding computation is expensive; same image URL = same embedding
@@ -27,30 +38,151 @@ Cache Types and TTLs:
   - Stores: Final moodboard with selected images
   - Why: Short TTL ensures fresh results while reducing duplicate computation
   - Data Stored: References to images (URLs), not the images themselves
+  - Keyed by image SHA-256 plus settings.pipeline_version; concurrent uploads of the
+    same image are coalesced with a single-flight lock (lock:moodboard:*) that the
+    leader renews while it runs
+
+- Candidate Pools: 24 hours (settings.candidate_pool_ttl; "load more", services/candidate_pool.py)
+  - Stores: Image candidates and provider cursors per (aesthetic, keyword)
+  - Read-modify-written under a lock by any worker, so always read from Redis
+
+NAMESPACES:
+===========
+Keys are ``<namespace>:v<version>:...``. The version of each namespace lives in
+Redis (``cache:version:<namespace>``), so invalidate_namespace() is a single INCR:
+old keys are never read again and age out by TTL. Workers re-read versions every
+settings.cache_version_refresh seconds, or at once via the invalidation channel.
+Stats and pattern clears walk the keyspace with SCAN (never KEYS) and delete
+in chunks with UNLINK, so they do not block Redis.
+
+Values are stored as bytes: orjson-encoded and, above a size threshold,
+zstd-compressed (services/cache_codec.py); embeddings as raw float32. Image
+candidates are cached without their None fields.
+
+Classification, embedding and moodboard keys also carry the model fingerprint
+(``<namespace>:v<version>:<fingerprint>:...``) set by the CLIP service: a hash of
+model name, prompt templates, aesthetics vocabulary and boost-rules version. A
+model or prompt change therefore starts fresh keys by itself, entries written by
+the old model simply expire, and restarts keep every valid entry.
+
+TIERS:
+======
+Every entry above except candidate pools is read through an in-process LocalCache
+(L1) in front of Redis (L2). L1 is bounded by settings.l1_cache_max_bytes with LRU
+eviction and holds an entry for at most settings.l1_cache_ttl (never longer than
+its Redis TTL). Writes
+go to both tiers and are announced on the ``cache:invalidate`` pub/sub channel so
+other workers drop their L1 copy. When Redis is down, L1 keeps working on its own.
 
 IMPORTANT: We cache search queries and results (which are public data), NOT raw API responses
 or user-specific information. All cached data expires automatically per TTL settings.
 """
 
+import asyncio
+import fnmatch
 import json
 import logging
 import hashlib
-from typing import Optional, Any, Dict, List
+import secrets
+import time
+from collections import OrderedDict
+from typing import Optional, Any, Dict, List, Tuple
 import numpy as np
 import redis.asyncio as redis
 from datetime import datetime, timedelta
 
 from config import settings
+from services import cache_codec
+from services.metrics_service import metrics_service
 
 logger = logging.getLogger(__name__)
 
+# Compare-and-delete so a worker whose lock expired cannot release a newer owner's lock
+_RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+# Compare-and-extend: a lock holder's heartbeat must not revive a lock that passed to someone else
+_EXTEND_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("pexpire", KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+INVALIDATION_CHANNEL = "cache:invalidate"
+NAMESPACES = ("classification", "api", "pinterest", "embedding", "moodboard", "pool")
+MODEL_NAMESPACES = ("classification", "embedding", "moodboard")  # Keyed by model fingerprint too
+
+
+class LocalCache:
+    """Size-bounded in-process LRU of encoded cache values with per-entry TTL."""
+    
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: "OrderedDict[str, Tuple[bytes, float]]" = OrderedDict()
+    
+    @staticmethod
+    def _cost(key: str, value: bytes) -> int:
+        return len(key) + len(value)
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if time.monotonic() >= expires_at:
+            self.delete(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+    
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        self.delete(key)
+        cost = self._cost(key, value)
+        if ttl <= 0 or cost > self.max_bytes // 8:  # Huge entries would flush everything else
+            return
+        self._entries[key] = (value, time.monotonic() + ttl)
+        self.size += cost
+        while self.size > self.max_bytes:
+            old_key, (old_value, _) = self._entries.popitem(last=False)
+            self.size -= self._cost(old_key, old_value)
+    
+    def delete(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= self._cost(key, entry[0])
+    
+    def invalidate(self, pattern: str) -> None:
+        """Drop one key, or every key matching a glob pattern."""
+        if not any(ch in pattern for ch in "*?["):
+            self.delete(pattern)
+            return
+        for key in [key for key in self._entries if fnmatch.fnmatchcase(key, pattern)]:
+            self.delete(key)
+
 
 class CacheService:
     """Service for Redis-based caching with explicit TTL policy."""
     
     def __init__(self):
         self.redis_client: Optional[redis.Redis] = None
+        self._binary_client: Optional[redis.Redis] = None  # Cache values are bytes (cache_codec)
         self._connected = False
+        self.local = LocalCache(settings.l1_cache_max_bytes)
+        self._instance_id = secrets.token_hex(8)  # Skips our own invalidation messages
+        self._invalidation_listener: Optional[asyncio.Task] = None
+        self._versions: Dict[str, int] = {}
+        self._versions_checked = 0.0
+        self.model_fingerprint = "nomodel"
     
     async def initialize(self):
         """Initialize Redis connection."""
@@ -63,15 +195,136 @@ class CacheService:
                 socket_timeout=5
             )
             
+            self._binary_client = redis.from_url(
+                settings.redis_url,
+                socket_connect_timeout=5,
+                socket_timeout=5
+            )
+            
             # Test connection
             await self.redis_client.ping()
             self._connected = True
+            await self._load_versions()
             logger.info("Redis cache initialized successfully")
+            if settings.l1_cache_pubsub_invalidation:
+                self._invalidation_listener = asyncio.create_task(self._listen_for_invalidations())
             
         except Exception as e:
-            logger.warning(f"Failed to connect to Redis: {str(e)}. Caching disabled.")
+            logger.warning(f"Failed to connect to Redis: {str(e)}. Using the in-process cache only.")
             self._connected = False
     
+    async def _listen_for_invalidations(self) -> None:
+        """Drop L1 entries that another worker overwrote or deleted."""
+        pubsub = self.redis_client.pubsub()
+        try:
+            await pubsub.subscribe(INVALIDATION_CHANNEL)
+            async for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                sender, _, pattern = message["data"].partition("|")
+                if sender != self._instance_id:
+                    self.local.invalidate(pattern)
+                    if pattern.endswith(":*") and pattern[:-2] in NAMESPACES:
+                        self._versions_checked = 0.0  # Namespace bumped elsewhere: re-read versions
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("Cache invalidation listener stopped: %s", e)
+        finally:
+            await pubsub.reset()
+    
+    async def _publish_invalidation(self, pattern: str) -> None:
+        if self._invalidation_listener is None:
+            return
+        try:
+            await self.redis_client.publish(INVALIDATION_CHANNEL, f"{self._instance_id}|{pattern}")
+        except Exception as e:
+            logger.warning("Cache invalidation publish failed: %s", e)
+    
+    async def _load_versions(self) -> None:
+        try:
+            values = await self.redis_client.mget([f"cache:version:{name}" for name in NAMESPACES])
+            self._versions = {name: int(value) for name, value in zip(NAMESPACES, values) if value}
+        except Exception as e:
+            logger.warning("Cache namespace versions could not be read: %s", e)
+        self._versions_checked = time.monotonic()
+    
+    async def _namespace(self, name: str) -> str:
+        """Current key prefix of a namespace, e.g. ``api:v3`` or ``embedding:v3:<fingerprint>``."""
+        if self._connected and time.monotonic() - self._versions_checked >= settings.cache_version_refresh:
+            await self._load_versions()
+        prefix = f"{name}:v{self._versions.get(name, 0)}"
+        if name in MODEL_NAMESPACES:
+            prefix = f"{prefix}:{self.model_fingerprint}"
+        return prefix
+    
+    def set_model_fingerprint(self, fingerprint: str) -> None:
+        """Key model-dependent namespaces by this fingerprint (see module docstring)."""
+        if fingerprint != self.model_fingerprint:
+            logger.info("Cache model fingerprint: %s", fingerprint)
+        self.model_fingerprint = fingerprint
+    
+    async def invalidate_namespace(self, name: str) -> int:
+        """Invalidate a whole namespace by bumping its version; returns the new version."""
+        version = self._versions.get(name, 0) + 1
+        if self._connected:
+            try:
+                version = await self.redis_client.incr(f"cache:version:{name}")
+            except Exception as e:
+                logger.warning("Cache namespace bump failed for %s: %s", name, e)
+        self._versions[name] = version
+        self.local.invalidate(f"{name}:*")
+        if self._connected:
+            await self._publish_invalidation(f"{name}:*")
+        logger.info("Cache namespace %s now at v%s", name, version)
+        return version
+    
+    async def _get_bytes(self, key: str) -> Optional[bytes]:
+        """Read through L1 into Redis; a Redis hit is kept in L1, never past its Redis TTL."""
+        value = self.local.get(key)
+        if value is not None or not self._connected:
+            return value
+        value, ttl_ms = await self._binary_client.pipeline(transaction=False).get(key).pttl(key).execute()
+        if value is not None:
+            ttl = settings.l1_cache_ttl if ttl_ms < 0 else min(settings.l1_cache_ttl, ttl_ms / 1000.0)
+            self.local.set(key, value, ttl)
+        return value
+    
+    async def _set_bytes(self, key: str, value: bytes, ttl: int) -> None:
+        """Write through to L1 and Redis, and tell other workers to drop their L1 copy."""
+        self.local.set(key, value, min(ttl, settings.l1_cache_ttl))
+        if not self._connected:
+            return
+        await self._binary_client.setex(key, ttl, value)
+        await self._publish_invalidation(key)
+    
+    def get_local(self, key: str) -> Any:
+        """Read a process-local entry (see set_local)."""
+        data = self.local.get(key)
+        return cache_codec.decode(data) if data is not None else None
+    
+    def set_local(self, key: str, value: Any, ttl: float) -> None:
+        """Keep a value in L1 only, e.g. per-request lookups too hot for Redis (auth principals)."""
+        self.local.set(key, cache_codec.encode(value), ttl)
+    
+    async def evict(self, key: str) -> None:
+        """Drop a key from L1 here and, via the invalidation channel, in every other worker."""
+        self.local.invalidate(key)
+        if self._connected:
+            await self._publish_invalidation(key)
+    
+    async def _get(self, key: str) -> Any:
+        data = await self._get_bytes(key)
+        return cache_codec.decode(data) if data is not None else None
+    
+    async def _set(self, key: str, value: Any, ttl: int) -> None:
+        await self._set_bytes(key, cache_codec.encode(value), ttl)
+    
+    @property
+    def client(self) -> Optional[redis.Redis]:
+        """The Redis client when connected, for services that keep their own keys (rate limiter)."""
+        return self.redis_client if self._connected else None
+    
     def _generate_cache_key(self, prefix: str, data: Any) -> str:
         """Generate consistent cache key."""
         if isinstance(data, bytes):
@@ -88,16 +341,14 @@ class CacheService:
     
     async def get_classification_cache(self, image_content: bytes) -> Optional[List[Dict]]:
         """Get cached aesthetic classification."""
-        if not self._connected:
-            return None
-        
         try:
-            key = self._generate_cache_key("classification", image_content)
-            cached_data = await self.redis_client.get(key)
+            key = self._generate_cache_key(await self._namespace("classification"), image_content)
+            cached_data = await self._get(key)
+            metrics_service.record_cache("classification", bool(cached_data))
             
             if cached_data:
                 logger.debug(f"Cache hit for classification: {key}")
-                return json.loads(cached_data)
+                return cached_data
             
             return None
             
@@ -112,16 +363,13 @@ class CacheService:
         Data: Only aesthetic names and confidence scores (no raw image data)
         Compliance: Classification results are AI-generated, not API data
         """
-        if not self._connected:
-            return
-        
         try:
-            key = self._generate_cache_key("classification", image_content)
+            key = self._generate_cache_key(await self._namespace("classification"), image_content)
             
-            await self.redis_client.setex(
+            await self._set(
                 key,
-                settings.classification_cache_ttl,
-                json.dumps(classification_result)
+                classification_result,
+                settings.classification_cache_ttl
             )
             
             logger.debug(f"Cached classification: {key} (TTL: {settings.classification_cache_ttl}s)")
@@ -129,63 +377,143 @@ class CacheService:
         except Exception as e:
             logger.warning(f"Cache set error: {str(e)}")
     
-    async def get_api_cache(self, api_name: str, query: str) -> Optional[List[Dict]]:
-        """Get cached API response."""
-        if not self._connected:
-            return None
+    async def _api_cache_key(self, api_name: str, query: str, per_page: int) -> str:
+        """Shared key schema for every provider: api:v<n>:<provider>:<normalized query>:<page size>."""
+        normalized = " ".join(query.lower().split())
+        return f"{await self._namespace('api')}:{api_name}:{normalized}:{per_page}"
+    
+    async def get_api_cache(self, api_name: str, query: str, per_page: int) -> Optional[Tuple[List[Dict], bool]]:
+        """Get cached provider results as (results, is_stale).
         
+        Stale entries are still returned so callers can answer immediately and
+        refresh in the background (stale-while-revalidate).
+        """
         try:
-            key = self._generate_cache_key(f"api:{api_name}", query)
-            cached_data = await self.redis_client.get(key)
+            key = await self._api_cache_key(api_name, query, per_page)
+            cached_data = await self._get(key)
+            metrics_service.record_cache("api", bool(cached_data))
             
             if cached_data:
-                logger.debug(f"API cache hit: {api_name}:{query}")
-                return json.loads(cached_data)
+                entry = cached_data
+                stale = time.time() >= entry["fresh_until"]
+                logger.debug("API cache hit%s: %s", " (stale)" if stale else "", key)
+                return entry["results"], stale
             
             return None
             
         except Exception as e:
-            logger.warning(f"API cache get error: {str(e)}")
+            logger.warning("API cache get error: %s", e)
             return None
     
-    async def set_api_cache(self, api_name: str, query: str, api_result: List[Dict]) -> None:
-        """Cache API response.
+    async def is_api_cache_fresh(self, api_name: str, query: str, per_page: int) -> bool:
+        """Whether a fresh entry exists; used by the cache warmer, so not counted as a lookup."""
+        try:
+            cached_data = await self._get(await self._api_cache_key(api_name, query, per_page))
+            return bool(cached_data) and time.time() < cached_data["fresh_until"]
+        except Exception as e:
+            logger.warning("API cache check error: %s", e)
+            return False
+    
+    async def get_api_cursor(self, api_name: str, query: str, per_page: int) -> Optional[str]:
+        """Provider cursor for the page after a cached first page (None if none or not cached)."""
+        try:
+            cached_data = await self._get(await self._api_cache_key(api_name, query, per_page))
+            return cached_data.get("cursor") if cached_data else None
+        except Exception as e:
+            logger.warning("API cache cursor error: %s", e)
+            return None
+    
+    async def set_api_cache(self, api_name: str, query: str, per_page: int, api_result: List[Dict],
+                            cursor: Optional[str] = None) -> None:
+        """Cache provider results.
         
-        TTL: 1 hour (settings.api_cache_ttl)
+        TTL: fresh for settings.api_cache_ttl, then served stale for up to
+        settings.api_cache_stale_ttl while being refreshed. Pinterest results are
+        kept for settings.pinterest_api_cache_ttl only and never served stale.
+        Empty results are cached for settings.api_negative_cache_ttl only and
+        never served stale.
+        ``cursor`` is the provider's cursor for the next page (candidate pools).
         Data: Only image URLs, photographer names, and public metadata (NOT raw API responses)
         Compliance: Stores publicly accessible information, not proprietary API data structures
         Pinterest Compliance: Does NOT store raw Pinterest API responses, only processed image references
         """
-        if not self._connected:
-            return
-        
         try:
-            key = self._generate_cache_key(f"api:{api_name}", query)
+            key = await self._api_cache_key(api_name, query, per_page)
+            if api_result and api_name == "pinterest":
+                fresh_ttl = ttl = settings.pinterest_api_cache_ttl
+            elif api_result:
+                fresh_ttl, ttl = settings.api_cache_ttl, settings.api_cache_ttl + settings.api_cache_stale_ttl
+            else:
+                fresh_ttl = ttl = settings.api_negative_cache_ttl
             
-            await self.redis_client.setex(
-                key,
-                settings.api_cache_ttl,
-                json.dumps(api_result)
-            )
+            entry = {"results": api_result, "fresh_until": time.time() + fresh_ttl, "cursor": cursor}
+            await self._set(key, entry, ttl)
             
-            logger.debug(f"Cached API response: {api_name}:{query} (TTL: {settings.api_cache_ttl}s)")
+            logger.debug("Cached API response: %s (fresh %ss, TTL %ss)", key, fresh_ttl, ttl)
             
         except Exception as e:
-            logger.warning(f"API cache set error: {str(e)}")
+            logger.warning("API cache set error: %s", e)
     
-    async def get_embedding_cache(self, image_url: str) -> Optional[np.ndarray]:
-        """Get cached image embedding."""
-        if not self._connected:
+    async def get_pinterest_boards(self, account: str) -> Optional[List[Dict]]:
+        """Cached board list for a Pinterest account."""
+        return await self._get_pinterest(f"boards:{account}")
+    
+    async def set_pinterest_boards(self, account: str, boards: List[Dict]) -> None:
+        """Cache a Pinterest account's board list (TTL: settings.pinterest_board_cache_ttl)."""
+        await self._set_pinterest(f"boards:{account}", boards)
+    
+    async def get_pinterest_board_pins(self, board_id: str) -> Optional[List[Dict]]:
+        """Cached image candidates extracted from one board's pins."""
+        return await self._get_pinterest(f"board_pins:{board_id}")
+    
+    async def set_pinterest_board_pins(self, board_id: str, candidates: List[Dict]) -> None:
+        """Cache the image candidates of one board (TTL: settings.pinterest_board_cache_ttl)."""
+        await self._set_pinterest(f"board_pins:{board_id}", candidates)
+    
+    async def _get_pinterest(self, name: str) -> Optional[List[Dict]]:
+        try:
+            cached_data = await self._get(f"{await self._namespace('pinterest')}:{name}")
+            metrics_service.record_cache("pinterest", bool(cached_data))
+            return cached_data
+        except Exception as e:
+            logger.warning("Pinterest cache get error: %s", e)
             return None
+    
+    async def _set_pinterest(self, name: str, value: List[Dict]) -> None:
+        try:
+            key = f"{await self._namespace('pinterest')}:{name}"
+            await self._set(key, value, settings.pinterest_board_cache_ttl)
+        except Exception as e:
+            logger.warning("Pinterest cache set error: %s", e)
+    
+    async def get_candidate_pool(self, name: str) -> Optional[Dict]:
+        """A "load more" candidate pool (services/candidate_pool.py), read from Redis.
         
+        Pools are read-modify-written under a lock by any worker, so L1 is bypassed:
+        a copy another worker has since extended must never be written back.
+        """
+        if not self._connected:
+            return None
+        data = await self._binary_client.get(f"{await self._namespace('pool')}:{name}")
+        return cache_codec.decode(data) if data is not None else None
+    
+    async def set_candidate_pool(self, name: str, entry: Dict) -> None:
+        """Store a candidate pool in Redis (TTL: settings.candidate_pool_ttl)."""
+        if not self._connected:
+            return
+        key = f"{await self._namespace('pool')}:{name}"
+        await self._binary_client.setex(key, settings.candidate_pool_ttl, cache_codec.encode(entry))
+    
+    async def get_embedding_cache(self, image_url: str) -> Optional[np.ndarray]:
+        """Get cached image embedding."""
         try:
-            key = self._generate_cache_key("embedding", image_url)
-            cached_data = await self.redis_client.get(key)
+            key = self._generate_cache_key(await self._namespace("embedding"), image_url)
+            cached_data = await self._get_bytes(key)
+            metrics_service.record_cache("embedding", bool(cached_data))
             
             if cached_data:
-                # Embeddings are stored as JSON arrays
-                embedding_list = json.loads(cached_data)
-                return np.array(embedding_list, dtype=np.float32)
+                # Embeddings are stored as raw float32 bytes
+                return np.frombuffer(cached_data, dtype=np.float32).copy()
             
             return None
             
@@ -195,19 +523,13 @@ class CacheService:
     
     async def set_embedding_cache(self, image_url: str, embedding: np.ndarray) -> None:
         """Cache image embedding."""
-        if not self._connected:
-            return
-        
         try:
-            key = self._generate_cache_key("embedding", image_url)
+            key = self._generate_cache_key(await self._namespace("embedding"), image_url)
             
-            # Convert numpy array to list for JSON serialization
-            embedding_list = embedding.tolist()
-            
-            await self.redis_client.setex(
+            await self._set_bytes(
                 key,
-                settings.embedding_cache_ttl,
-                json.dumps(embedding_list)
+                np.asarray(embedding, dtype=np.float32).tobytes(),
+                settings.embedding_cache_ttl
             )
             
             logger.debug(f"Cached embedding: {image_url}")
@@ -215,18 +537,20 @@ class CacheService:
         except Exception as e:
             logger.warning(f"Embedding cache set error: {str(e)}")
     
+    async def _moodboard_cache_key(self, image_hash: str) -> str:
+        """Moodboard keys embed the pipeline version so output changes never serve stale boards."""
+        return f"{await self._namespace('moodboard')}:{settings.pipeline_version}:{image_hash}"
+    
     async def get_moodboard_cache(self, image_hash: str) -> Optional[Dict]:
-        """Get cached complete moodboard."""
-        if not self._connected:
-            return None
-        
+        """Get cached complete moodboard for an image SHA-256."""
         try:
-            key = self._generate_cache_key("moodboard", image_hash)
-            cached_data = await self.redis_client.get(key)
+            key = await self._moodboard_cache_key(image_hash)
+            cached_data = await self._get(key)
+            metrics_service.record_cache("moodboard", bool(cached_data))
             
             if cached_data:
                 logger.debug(f"Moodboard cache hit: {image_hash}")
-                return json.loads(cached_data)
+                return cached_data
             
             return None
             
@@ -235,20 +559,17 @@ class CacheService:
             return None
     
     async def set_moodboard_cache(self, image_hash: str, moodboard_result: Dict) -> None:
-        """Cache complete moodboard result."""
-        if not self._connected:
-            return
+        """Cache complete moodboard result.
         
+        TTL: 1 hour (settings.moodboard_cache_ttl) - short so moodboards still feel fresh
+        """
         try:
-            key = self._generate_cache_key("moodboard", image_hash)
-            
-            # Cache for shorter time since moodboards should feel fresh
-            ttl = 3600  # 1 hour
+            key = await self._moodboard_cache_key(image_hash)
             
-            await self.redis_client.setex(
+            await self._set(
                 key,
-                ttl,
-                json.dumps(moodboard_result)
+                moodboard_result,
+                settings.moodboard_cache_ttl
             )
             
             logger.debug(f"Cached moodboard: {image_hash}")
@@ -256,29 +577,94 @@ class CacheService:
         except Exception as e:
             logger.warning(f"Moodboard cache set error: {str(e)}")
     
+    async def acquire_lock(self, name: str, owner: str, ttl: int) -> bool:
+        """Try to take a cross-worker single-flight lock.
+        
+        Returns True when the caller owns the lock. Without Redis there is only one
+        worker to coordinate, so the lock is always granted.
+        """
+        if not self._connected:
+            return True
+        
+        try:
+            return bool(await self.redis_client.set(f"lock:{name}", owner, nx=True, ex=ttl))
+        except Exception as e:
+            logger.warning(f"Lock acquire error for {name}: {str(e)}")
+            return True
+    
+    async def extend_lock(self, name: str, owner: str, ttl: int) -> bool:
+        """Reset a held single-flight lock's TTL; False if the caller no longer owns it."""
+        if not self._connected:
+            return True
+        
+        try:
+            return bool(await self.redis_client.eval(_EXTEND_LOCK_SCRIPT, 1, f"lock:{name}", owner, ttl * 1000))
+        except Exception as e:
+            logger.warning(f"Lock extend error for {name}: {str(e)}")
+            return True
+    
+    async def is_locked(self, name: str) -> bool:
+        """Check whether another worker still holds a single-flight lock."""
+        if not self._connected:
+            return False
+        
+        try:
+            return bool(await self.redis_client.exists(f"lock:{name}"))
+        except Exception as e:
+            logger.warning(f"Lock check error for {name}: {str(e)}")
+            return False
+    
+    async def release_lock(self, name: str, owner: str) -> None:
+        """Release a single-flight lock, but only if the caller still owns it."""
+        if not self._connected:
+            return
+        
+        try:
+            await self.redis_client.eval(_RELEASE_LOCK_SCRIPT, 1, f"lock:{name}", owner)
+        except Exception as e:
+            logger.warning(f"Lock release error for {name}: {str(e)}")
+    
     async def get_cache_stats(self) -> Dict[str, Any]:
-        """Get cache statistics."""
+        """Get cache statistics.
+        
+        Per-namespace counts come from one SCAN pass over at most
+        settings.cache_stats_scan_limit keys; ``sampled`` is set when it stopped early.
+        """
+        local = {"entries": len(self.local), "bytes": self.local.size, "max_bytes": self.local.max_bytes}
         if not self._connected:
-            return {"status": "disconnected"}
+            return {"status": "disconnected", "local": local}
         
         try:
-            info = await self.redis_client.info()
-            
-            # Get key counts for different prefixes
-            classification_keys = len(await self.redis_client.keys("classification:*"))
-            api_keys = len(await self.redis_client.keys("api:*"))
-            embedding_keys = len(await self.redis_client.keys("embedding:*"))
-            moodboard_keys = len(await self.redis_client.keys("moodboard:*"))
+            info = await self.redis_client.info("memory")
+            prefixes = {name: f"{await self._namespace(name)}:" for name in NAMESPACES}
+            counts = dict.fromkeys(NAMESPACES, 0)
+            scanned = 0
+            cursor = 0
+            while True:
+                cursor, keys = await self.redis_client.scan(cursor, count=settings.cache_scan_batch)
+                scanned += len(keys)
+                for key in keys:
+                    name = key.split(":", 1)[0]
+                    if name in counts and key.startswith(prefixes[name]):
+                        counts[name] += 1
+                if cursor == 0 or scanned >= settings.cache_stats_scan_limit:
+                    break
             
             return {
                 "status": "connected",
                 "memory_used": info.get("used_memory_human", "unknown"),
-                "total_keys": info.get("db0", {}).get("keys", 0),
+                "total_keys": await self.redis_client.dbsize(),
+                "local": local,
+                "versions": {name: self._versions.get(name, 0) for name in NAMESPACES},
+                "model_fingerprint": self.model_fingerprint,
+                "sampled": cursor != 0,
                 "cache_breakdown": {
-                    "classifications": classification_keys,
-                    "api_responses": api_keys,
-                    "embeddings": embedding_keys,
-                    "moodboards": moodboard_keys
+                    "classifications": counts["classification"],
+                    "api_responses": counts["api"],
+                    "pinterest_boards": counts["pinterest"],
+                    "embeddings": counts["embedding"],
+                    "moodboards": counts["moodboard"],
+                    "candidate_pools": counts["pool"]
                 }
             }
             
@@ -287,29 +673,43 @@ class CacheService:
             return {"status": "error", "error": str(e)}
     
     async def clear_cache(self, pattern: Optional[str] = None) -> int:
-        """Clear cache entries matching pattern."""
+        """Clear cache entries matching pattern (in every worker's L1 as well).
+        
+        Keys are found with SCAN and removed with UNLINK in chunks of
+        settings.cache_scan_batch. To drop a whole namespace, prefer
+        invalidate_namespace(), which touches no keys at all.
+        """
+        self.local.invalidate(pattern or "*")
         if not self._connected:
             return 0
         
         try:
-            if pattern:
-                keys = await self.redis_client.keys(pattern)
-            else:
-                keys = await self.redis_client.keys("*")
-            
-            if keys:
-                deleted = await self.redis_client.delete(*keys)
+            await self._publish_invalidation(pattern or "*")
+            deleted = 0
+            chunk = []
+            async for key in self.redis_client.scan_iter(match=pattern or "*", count=settings.cache_scan_batch):
+                chunk.append(key)
+                if len(chunk) >= settings.cache_scan_batch:
+                    deleted += await self.redis_client.unlink(*chunk)
+                    chunk = []
+            if chunk:
+                deleted += await self.redis_client.unlink(*chunk)
+            if deleted:
                 logger.info(f"Cleared {deleted} cache entries")
-                return deleted
-            
-            return 0
+            return deleted
             
         except Exception as e:
             logger.error(f"Error clearing cache: {str(e)}")
             return 0
     
     async def close(self):
-        """Close Redis connection."""
+        """Stop the invalidation listener and close the Redis connection."""
+        if self._invalidation_listener is not None:
+            self._invalidation_listener.cancel()
+            await asyncio.gather(self._invalidation_listener, return_exceptions=True)
+            self._invalidation_listener = None
+        if self._binary_client:
+            await self._binary_client.close()
         if self.redis_client:
             await self.redis_client.close()
             self._connected = False
@@ -0,0 +1,147 @@
+"""Background warmer for the provider API cache.
+
+Search terms come from a closed vocabulary: each aesthetic in aesthetics.yaml
+expands to a fixed keyword list, and a moodboard only searches the top three. The
+warmer walks every aesthetic x top-3 keyword x active provider and fetches
+whatever is missing or stale, so the first job for a rarely seen aesthetic is as
+fast as one for a popular aesthetic.
+
+Aesthetics are warmed in order of how often they appeared in recent jobs (daily
+counters kept in Redis for settings.cache_warm_history_days), then in vocabulary
+order. The warmer never spends a provider's rate budget below
+settings.cache_warm_budget_reserve of its hourly quota, so live jobs keep
+priority, and it issues at most settings.cache_warm_max_requests per cycle.
+
+Run in-process (CACHE_WARMER_ENABLED=true) or once from scripts/warm_cache.py.
+"""
+
+import asyncio
+import logging
+from collections import Counter
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Tuple
+
+from config import settings
+from models import AestheticScore
+from services.cache_service import cache_service
+from services.rate_limiter import rate_limiter
+
+logger = logging.getLogger(__name__)
+
+
+class CacheWarmer:
+    """Keeps API cache entries for the aesthetic keyword space fresh."""
+
+    def __init__(self):
+        self._local_popularity: Counter = Counter()  # Fallback without Redis
+
+    def _popularity_key(self, day: date) -> str:
+        return f"warmer:popularity:{day.isoformat()}"
+
+    async def record_aesthetics(self, aesthetic_names: Iterable[str]) -> None:
+        """Count the aesthetics a job was classified as (called once per job)."""
+        names = list(aesthetic_names)
+        client = cache_service.client
+        if client is None:
+            self._local_popularity.update(names)
+            return
+
+        try:
+            key = self._popularity_key(date.today())
+            pipe = client.pipeline()
+            for name in names:
+                pipe.zincrby(key, 1, name)
+            pipe.expire(key, 86400 * (settings.cache_warm_history_days + 1))
+            await pipe.execute()
+        except Exception as e:
+            logger.warning("Cache warmer popularity update failed: %s", e)
+
+    async def popularity(self) -> Counter:
+        """Job counts per aesthetic over the recent history window."""
+        client = cache_service.client
+        if client is None:
+            return Counter(self._local_popularity)
+
+        counts: Counter = Counter()
+        try:
+            for offset in range(settings.cache_warm_history_days):
+                day = date.today() - timedelta(days=offset)
+                for name, score in await client.zrange(self._popularity_key(day), 0, -1, withscores=True):
+                    counts[name] += score
+        except Exception as e:
+            logger.warning("Cache warmer popularity read failed: %s", e)
+        return counts
+
+    async def plan(self) -> List[Tuple[str, List[str], int]]:
+        """(aesthetic, keywords, images per keyword) in warming order.
+
+        Keywords and page size come from the same code the pipeline uses, so the
+        warmed cache keys are exactly the ones a job looks up.
+        """
+        from services.aesthetic_service import aesthetic_service
+        from services.moodboard_service import moodboard_service
+
+        vocabulary = await aesthetic_service.get_vocabulary()
+        counts = await self.popularity()
+        ordered = sorted(vocabulary, key=lambda name: -counts.get(name, 0))  # Stable: ties keep vocabulary order
+
+        plan = []
+        for name in ordered:
+            keywords, _ = await moodboard_service._expand_keywords([AestheticScore(name=name, score=1.0)])
+            top_keywords, images_per_keyword = moodboard_service._keyword_plan(keywords)
+            plan.append((name, top_keywords, images_per_keyword))
+        return plan
+
+    async def _spendable(self, provider_name: str) -> bool:
+        reserve = (rate_limiter.quota(provider_name) or 0) * settings.cache_warm_budget_reserve
+        return await rate_limiter.remaining(provider_name) > reserve
+
+    async def warm_once(self) -> Dict[str, int]:
+        """One pass over the plan. Returns counts of fresh, warmed and skipped entries."""
+        from services.moodboard_service import moodboard_service
+
+        stats = {"fresh": 0, "warmed": 0, "skipped_budget": 0}
+        if cache_service.client is None:
+            logger.info("Cache warmer: Redis unavailable, nothing to warm")
+            return stats
+        providers = await moodboard_service._active_providers()
+        if not providers:
+            logger.info("Cache warmer: no providers configured")
+            return stats
+
+        requests = 0
+        exhausted = set()
+        for aesthetic, keywords, images_per_keyword in await self.plan():
+            sizes = await moodboard_service._request_sizes(providers, images_per_keyword)
+            for keyword in keywords:
+                for provider in providers:
+                    n = sizes[provider.name]
+                    if await cache_service.is_api_cache_fresh(provider.name, keyword, n):
+                        stats["fresh"] += 1
+                        continue
+                    if provider.name in exhausted or not await self._spendable(provider.name):
+                        exhausted.add(provider.name)
+                        stats["skipped_budget"] += 1
+                        continue
+                    if requests >= settings.cache_warm_max_requests:
+                        logger.info("Cache warmer: request cap reached at '%s' %s", aesthetic, stats)
+                        return stats
+                    await provider.refresh(keyword, n)
+                    requests += 1
+                    stats["warmed"] += 1
+
+        logger.info("Cache warmer pass complete: %s", stats)
+        return stats
+
+    async def run(self) -> None:
+        """Background loop started from the app lifespan when enabled."""
+        while True:
+            try:
+                await self.warm_once()
+            except Exception as e:
+                logger.warning("Cache warmer error: %s", e)
+            await asyncio.sleep(settings.cache_warm_interval)
+
+
+# Global service instance
+cache_warmer = CacheWarmer()
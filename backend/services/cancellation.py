@@ -0,0 +1,87 @@
+"""Per-job deadlines and cancellation tokens.
+
+Every moodboard job owns a CancellationToken with an absolute deadline. The token
+is bound to the job's task context (like the log correlation ID), so provider
+clients and model helpers pick it up with current_token() instead of threading it
+through every signature; executor threads see it too when started with a copied
+context (see clip_service._run_in_executor).
+
+    timeout = call_timeout(5.0)   # min(5s, time left on the job), raises once cancelled
+    check_cancelled()             # cheap checkpoint between units of work
+"""
+
+import asyncio
+import contextvars
+import threading
+import time
+from typing import Optional
+
+
+class JobCancelledError(asyncio.CancelledError):
+    """Raised at a checkpoint once a job is cancelled or past its deadline.
+
+    Subclasses CancelledError so the pipeline's broad ``except Exception`` fallbacks
+    let it through, exactly as they do for task cancellation.
+    """
+
+
+class CancellationToken:
+    """Deadline plus cancel flag shared between a job's task and its worker threads."""
+
+    def __init__(self, timeout: float):
+        self.deadline = time.monotonic() + timeout
+        self.reason: Optional[str] = None
+        self._event = threading.Event()
+
+    def cancel(self, reason: str = "cancelled") -> None:
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.deadline
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set() or self.expired
+
+    def remaining(self) -> float:
+        """Seconds left before the deadline (never negative)."""
+        return max(0.0, self.deadline - time.monotonic())
+
+    def check(self) -> None:
+        if self._event.is_set():
+            raise JobCancelledError(self.reason)
+        if self.expired:
+            raise JobCancelledError("deadline exceeded")
+
+
+_token_var: contextvars.ContextVar[Optional[CancellationToken]] = contextvars.ContextVar(
+    "cancellation_token", default=None
+)
+
+
+def bind_token(token: Optional[CancellationToken]) -> contextvars.Token:
+    """Make a job's token visible to everything running in the current context."""
+    return _token_var.set(token)
+
+
+def current_token() -> Optional[CancellationToken]:
+    return _token_var.get()
+
+
+def check_cancelled() -> None:
+    """Raise JobCancelledError if the current job was cancelled; no-op outside a job."""
+    token = _token_var.get()
+    if token is not None:
+        token.check()
+
+
+def call_timeout(default: float) -> float:
+    """Timeout for one outbound call: the default, capped by the time left on the job."""
+    token = _token_var.get()
+    if token is None:
+        return default
+    token.check()
+    return min(default, token.remaining())
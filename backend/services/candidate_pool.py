@@ -0,0 +1,229 @@
+"""Deep candidate pools per (aesthetic, keyword) for "load more".
+
+A moodboard job only consumes the first page each provider returns for its top
+keywords. Everything those calls fetched, plus each provider's cursor for the next
+page, is kept in a pool per (aesthetic, keyword):
+
+    pool:v<version>:<aesthetic>:<keyword> -> {"candidates": [...], "cursors": {provider: cursor}, "sizes": {provider: n}}
+
+Candidates are deduplicated by URL and appended in arrival order (page by page).
+GET /moodboard/{job_id}/more serves further images from the pools of the job's
+keywords, resuming from a per-pool position cursor it hands back to the client,
+and only when the pools run short does it fetch the next page from each provider
+that still has a cursor. Extending a pool holds a short single-flight
+lock, so concurrent "load more" requests do not fetch the same page twice;
+seeding waits for the same lock, so neither overwrites the other's additions.
+
+Pools live in Redis for settings.candidate_pool_ttl, in cache_service's versioned
+``pool`` namespace and codec; without Redis a bounded number of pools is kept in
+process.
+"""
+
+import asyncio
+import logging
+import secrets
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Set, Tuple
+
+from config import settings
+from models import ImageCandidate, from_cache
+from services.cache_service import cache_service
+from services.cancellation import bind_token
+from services.flickr_client import flickr_client
+from services.image_provider import ImageProvider
+from services.pexels_client import pexels_client
+from services.pinterest_client import pinterest_client
+from services.unsplash_client import unsplash_client
+
+logger = logging.getLogger(__name__)
+
+# (provider name, keyword, page size, results) for one provider call of a job
+FetchedPage = Tuple[str, str, int, List[ImageCandidate]]
+
+
+class CandidatePoolService:
+    """Per-(aesthetic, keyword) candidate pools with provider cursors."""
+
+    def __init__(self):
+        self._providers: Dict[str, ImageProvider] = {
+            provider.name: provider for provider in (unsplash_client, pexels_client, flickr_client, pinterest_client)
+        }
+        self._local: "OrderedDict[str, Dict]" = OrderedDict()  # Fallback without Redis
+        self._background: Set[asyncio.Task] = set()
+
+    def _key(self, aesthetic: str, keyword: str) -> str:
+        """Pool name within the ``pool`` namespace; also names its lock."""
+        return f"{aesthetic}:{' '.join(keyword.lower().split())}"
+
+    async def _load(self, key: str) -> Dict:
+        if cache_service.client is None:
+            entry = self._local.get(key)
+            if entry is not None:
+                self._local.move_to_end(key)
+        else:
+            try:
+                entry = await cache_service.get_candidate_pool(key)
+            except Exception as e:
+                logger.warning("Candidate pool read failed for %s: %s", key, e)
+                entry = None
+        return entry or {"candidates": [], "cursors": {}, "sizes": {}}
+
+    async def _save(self, key: str, entry: Dict) -> None:
+        if cache_service.client is None:
+            self._local[key] = entry
+            self._local.move_to_end(key)
+            while len(self._local) > settings.candidate_pool_local_size:
+                self._local.popitem(last=False)
+            return
+        try:
+            await cache_service.set_candidate_pool(key, entry)
+        except Exception as e:
+            logger.warning("Candidate pool write failed for %s: %s", key, e)
+
+    @staticmethod
+    def _lock_name(key: str) -> str:
+        return f"pool:{key}"
+
+    @staticmethod
+    def _full(entry: Dict) -> bool:
+        """Whether a pool reached settings.candidate_pool_max_size (its cursors are then dead ends)."""
+        return len(entry["candidates"]) >= settings.candidate_pool_max_size
+
+    def _append(self, entry: Dict, candidates: Iterable[ImageCandidate]) -> int:
+        """Add unseen candidates (by URL) up to the pool size limit; returns how many were added."""
+        seen = {item["url"] for item in entry["candidates"]}
+        added = 0
+        for candidate in candidates:
+            if self._full(entry):
+                break
+            if candidate.url not in seen:
+                seen.add(candidate.url)
+                entry["candidates"].append(candidate.model_dump(exclude_none=True))
+                added += 1
+        return added
+
+    async def seed(self, aesthetic: str, pages: List[FetchedPage]) -> None:
+        """Fold a job's first-page results into the pools, with each provider's next cursor."""
+        by_keyword: Dict[str, List[FetchedPage]] = {}
+        for page in pages:
+            by_keyword.setdefault(page[1], []).append(page)
+
+        for keyword, keyword_pages in by_keyword.items():
+            key = self._key(aesthetic, keyword)
+            owner = secrets.token_hex(8)
+            while not await cache_service.acquire_lock(self._lock_name(key), owner, settings.candidate_pool_lock_ttl):
+                await asyncio.sleep(0.05)  # An extend() holds it at most candidate_pool_lock_ttl
+            try:
+                entry = await self._load(key)
+                for provider, _, n, results in keyword_pages:
+                    self._append(entry, results)
+                    if provider not in entry["cursors"]:  # A deeper cursor from earlier load-mores wins
+                        entry["cursors"][provider] = await cache_service.get_api_cursor(provider, keyword, n)
+                        entry["sizes"][provider] = n
+                await self._save(key, entry)
+            finally:
+                await cache_service.release_lock(self._lock_name(key), owner)
+
+    def seed_in_background(self, aesthetic: str, pages: List[FetchedPage]) -> None:
+        """seed() off the job's critical path."""
+        if not pages:
+            return
+
+        async def run():
+            bind_token(None)
+            try:
+                await self.seed(aesthetic, pages)
+            except Exception as e:
+                logger.warning("Candidate pool seed failed for '%s': %s", aesthetic, e)
+
+        task = asyncio.create_task(run())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def extend(self, aesthetic: str, keyword: str, providers: Iterable[str]) -> int:
+        """Fetch the next page from every listed provider that still has a cursor.
+
+        Returns the number of new candidates (0 if another request is already extending).
+        """
+        key = self._key(aesthetic, keyword)
+        owner = secrets.token_hex(8)
+        if not await cache_service.acquire_lock(self._lock_name(key), owner, settings.candidate_pool_lock_ttl):
+            return 0
+        try:
+            entry = await self._load(key)
+            if self._full(entry):
+                return 0
+            calls = [
+                (name, self._providers[name], entry["cursors"][name])
+                for name in providers
+                if entry["cursors"].get(name) and name in self._providers
+            ]
+            if not calls:
+                return 0
+
+            results = await asyncio.gather(*(
+                provider.search_page(keyword, entry["sizes"].get(name, settings.max_candidates), cursor)
+                for name, provider, cursor in calls
+            ))
+            added = 0
+            for (name, _, _), (candidates, next_cursor) in zip(calls, results):
+                added += self._append(entry, candidates)
+                entry["cursors"][name] = next_cursor
+            await self._save(key, entry)
+            logger.info("Candidate pool '%s' +%s (now %s)", key, added, len(entry["candidates"]))
+            return added
+        finally:
+            await cache_service.release_lock(self._lock_name(key), owner)
+
+    async def page(self, aesthetic: str, keywords: List[str], providers: List[str], positions: List[int],
+                   limit: int, exclude: Set[str]) -> Tuple[List[ImageCandidate], List[int], int, bool]:
+        """Up to ``limit`` images from the job's pools, starting at ``positions``.
+
+        Pools are read round-robin across keywords, restricted to the job's providers
+        and skipping the URLs in ``exclude`` (the moodboard already shown). Positions
+        index each append-only pool, so they stay valid while pools grow.
+        Returns (images, next positions, images known so far, whether more may follow).
+        """
+        entries = [await self._load(self._key(aesthetic, keyword)) for keyword in keywords]
+        images, positions = self._take(entries, providers, positions, limit, exclude)
+        if len(images) < limit:
+            await asyncio.gather(*(self.extend(aesthetic, keyword, providers) for keyword in keywords))
+            entries = [await self._load(self._key(aesthetic, keyword)) for keyword in keywords]
+            more, positions = self._take(entries, providers, positions, limit - len(images),
+                                         exclude | {item["url"] for item in images})
+            images += more
+
+        allowed = set(providers)
+        total = sum(1 for entry in entries for item in entry["candidates"] if item["source_api"] in allowed)
+        has_more = any(position < len(entry["candidates"]) for entry, position in zip(entries, positions)) or any(
+            entry["cursors"].get(name) and not self._full(entry) for entry in entries for name in providers
+        )
+        return from_cache(ImageCandidate, images), positions, total, has_more
+
+    @staticmethod
+    def _take(entries: List[Dict], providers: List[str], positions: List[int], limit: int,
+              exclude: Set[str]) -> Tuple[List[Dict], List[int]]:
+        allowed = set(providers)
+        positions = list(positions)
+        taken, seen = [], set(exclude)
+        while len(taken) < limit:
+            progressed = False
+            for index, entry in enumerate(entries):
+                items = entry["candidates"]
+                while positions[index] < len(items):
+                    item = items[positions[index]]
+                    positions[index] += 1
+                    if item["source_api"] in allowed and item["url"] not in seen:
+                        seen.add(item["url"])
+                        taken.append(item)
+                        progressed = True
+                        break
+                if len(taken) >= limit:
+                    break
+            if not progressed:
+                break
+        return taken, positions
+
+
+# Global service instance
+candidate_pool = CandidatePoolService()
@@ -2,20 +2,29 @@
 
 import logging
 import hashlib
+import json
 from io import BytesIO
 from typing import Dict, List, Tuple, Optional
 import asyncio
+import contextvars
 import numpy as np
 from PIL import Image
 import torch
 from transformers import AutoModel, AutoImageProcessor, SiglipTokenizer
 
 from config import settings
-from models import AestheticScore
+from models import AestheticScore, from_cache
 from services.cache_service import cache_service
+from services.cancellation import call_timeout, check_cancelled
+from services.metrics_service import metrics_service
+from services.trace_service import PipelineTrace
 
 logger = logging.getLogger(__name__)
 
+# Text prompts per aesthetic term; both are part of the model fingerprint
+PROMPT_TEMPLATE = "a {term} style fashion photo"  # Pre-computed text embeddings
+FALLBACK_PROMPT_TEMPLATE = "a {term} style outfit"  # On-demand text embeddings
+
 
 class CLIPService:
     """Service for vision-language model-based aesthetic classification and similarity.
@@ -33,18 +42,23 @@ class CLIPService:
         self._text_embeddings_cache = {}  # Cache for pre-computed text embeddings
         self.model_name = "google/siglip-so400m-patch14-384"  # SigLIP-SO400M for balanced performance/size
 
+    def _run_in_executor(self, fn, *args):
+        """Run blocking model work in the default pool, keeping the job ID for its log records."""
+        ctx = contextvars.copy_context()
+        return asyncio.get_event_loop().run_in_executor(None, ctx.run, fn, *args)
+
     async def initialize(self):
         """Initialize SigLIP model."""
         try:
-            logger.info(f"Loading vision-language model: {self.model_name}")
+            logger.info("Loading vision-language model: %s", self.model_name)
 
             # Determine device
             self.device = "cuda" if torch.cuda.is_available() else "cpu"
-            logger.info(f"Using device: {self.device}")
+            logger.info("Using device: %s", self.device)
 
             # Load model asynchronously in thread pool to avoid blocking
-            await asyncio.get_event_loop().run_in_executor(
-                None, self._load_model
+            await self._run_in_executor(
+                self._load_model
             )
 
             logger.info("Vision-language model loaded successfully")
@@ -53,10 +67,29 @@ class CLIPService:
             # Pre-compute text embeddings for performance
             await self._precompute_text_embeddings()
 
+            cache_service.set_model_fingerprint(await self.model_fingerprint())
+
         except Exception as e:
-            logger.error(f"Failed to load vision-language model: {str(e)}")
+            logger.error("Failed to load vision-language model: %s", e)
             raise
     
+    async def model_fingerprint(self) -> str:
+        """Hash of everything classification output depends on besides the image.
+
+        Covers the model name, the prompt templates, the aesthetics vocabulary (terms
+        and their data) and settings.boost_rules_version; cache keys for
+        classifications, embeddings and moodboards include it.
+        """
+        from services.aesthetic_service import aesthetic_service
+
+        inputs = {
+            "model": self.model_name,
+            "prompts": [PROMPT_TEMPLATE, FALLBACK_PROMPT_TEMPLATE],
+            "aesthetics": await aesthetic_service.get_all_aesthetics(),
+            "boost_rules": settings.boost_rules_version,
+        }
+        return hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode()).hexdigest()[:12]
+
     async def _precompute_text_embeddings(self):
         """Pre-compute and cache text embeddings for all aesthetics."""
         try:
@@ -64,10 +97,10 @@ class CLIPService:
 
             # Get aesthetic vocabulary
             vocabulary = await aesthetic_service.get_vocabulary()
-            logger.info(f"Pre-computing text embeddings for {len(vocabulary)} aesthetics...")
+            logger.info("Pre-computing text embeddings for %s aesthetics...", len(vocabulary))
 
             # Create text prompts - use simple format optimized for SigLIP
-            text_prompts = [f"a {term.replace('_', ' ')} style fashion photo" for term in vocabulary]
+            text_prompts = [PROMPT_TEMPLATE.format(term=term.replace('_', ' ')) for term in vocabulary]
 
             # Encode text using tokenizer and model (batch in chunks to avoid memory issues)
             inputs = self.tokenizer(text_prompts, padding="max_length", max_length=64, truncation=True, return_tensors="pt")
@@ -83,10 +116,10 @@ class CLIPService:
             for i, aesthetic in enumerate(vocabulary):
                 self._text_embeddings_cache[aesthetic] = text_features[i:i+1]
 
-            logger.info(f"Pre-computed {len(vocabulary)} text embeddings for faster classification")
+            logger.info("Pre-computed %s text embeddings for faster classification", len(vocabulary))
 
         except Exception as e:
-            logger.warning(f"Failed to pre-compute text embeddings: {str(e)}")
+            logger.warning("Failed to pre-compute text embeddings: %s", e)
             # Continue without pre-computed embeddings (fallback to on-demand)
     
     def _load_model(self):
@@ -114,7 +147,7 @@ class CLIPService:
             return image
 
         except Exception as e:
-            logger.error(f"Error preprocessing image: {str(e)}")
+            logger.error("Error preprocessing image: %s", e)
             raise
     
     async def _create_text_prompts(self, aesthetic_terms: List[str]) -> List[str]:
@@ -133,15 +166,15 @@ class CLIPService:
 
                 # Debug logging for gorpcore
                 if term == "gorpcore":
-                    logger.info(f"GORPCORE PROMPT: '{prompt}'")
-                    logger.info(f"GORPCORE KEYWORDS: {keywords}")
+                    logger.info("GORPCORE PROMPT: '%s'", prompt)
+                    logger.info("GORPCORE KEYWORDS: %s", keywords)
             else:
                 # Fallback to simple template if no keywords
                 prompt = f"a {term.replace('_', ' ')} style outfit"
 
                 # Debug logging for gorpcore
                 if term == "gorpcore":
-                    logger.warning(f"GORPCORE NO KEYWORDS: '{prompt}'")
+                    logger.warning("GORPCORE NO KEYWORDS: '%s'", prompt)
 
             prompts.append(prompt)
 
@@ -151,7 +184,7 @@ class CLIPService:
         """Create text prompts synchronously (simpler version without keywords)."""
         prompts = []
         for term in aesthetic_terms:
-            prompt = f"a {term.replace('_', ' ')} style outfit"
+            prompt = FALLBACK_PROMPT_TEMPLATE.format(term=term.replace('_', ' '))
             prompts.append(prompt)
         return prompts
     
@@ -169,31 +202,33 @@ class CLIPService:
             List of aesthetic scores sorted by confidence
         """
         if not self._model_loaded:
-            print("[CLIP] ERROR: Model not loaded!", flush=True)
+            logger.error("Vision-language model not loaded")
             raise RuntimeError("CLIP model not initialized")
 
         # Check cache first
         cached_result = await cache_service.get_classification_cache(image_content)
         if cached_result:
-            print(f"[CLIP] Returning CACHED result (top: {cached_result[0]['name'] if cached_result else 'none'})", flush=True)
-            return [AestheticScore(**score) for score in cached_result]
+            logger.debug("Returning CACHED result (top: %s)", cached_result[0]['name'] if cached_result else 'none')
+            return from_cache(AestheticScore, cached_result)
 
-        print(f"[CLIP] No cache hit, running fresh classification...", flush=True)
+        logger.debug("No cache hit, running fresh classification...")
         try:
             # Run classification in thread pool to avoid blocking
-            scores = await asyncio.get_event_loop().run_in_executor(
-                None, self._classify_sync, image_content, aesthetic_vocabulary
-            )
-            print(f"[CLIP] Fresh classification done, top: {scores[0].name if scores else 'none'}", flush=True)
+            metrics_service.model_batch_size.labels("classify").observe(1)
+            with metrics_service.model_inference_duration.labels("classify").time():
+                scores = await self._run_in_executor(
+                    self._classify_sync, image_content, aesthetic_vocabulary
+                )
+            logger.debug("Fresh classification done, top: %s", scores[0].name if scores else 'none')
             
             # Cache the result
-            score_dicts = [score.dict() for score in scores]
+            score_dicts = [score.model_dump(exclude_none=True) for score in scores]
             await cache_service.set_classification_cache(image_content, score_dicts)
             
             return scores
             
         except Exception as e:
-            logger.error(f"Error in aesthetic classification: {str(e)}")
+            logger.error("Error in aesthetic classification: %s", e)
             raise
     
     def _classify_sync(self, image_content: bytes, aesthetic_vocabulary: List[str]) -> List[AestheticScore]:
@@ -245,7 +280,8 @@ class CLIPService:
         else:
             similarity_normalized = torch.zeros_like(similarity)
 
-        print(f"[CLIP] Raw similarity range: [{float(sim_min):.3f}, {float(sim_max):.3f}]", flush=True)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Raw similarity range: [%.3f, %.3f]", float(sim_min), float(sim_max))
 
         # Convert to AestheticScore objects
         scores = []
@@ -259,7 +295,8 @@ class CLIPService:
         # Sort by score descending
         scores.sort(key=lambda x: x.score, reverse=True)
 
-        logger.info(f"Classification top 3: {[(s.name, f'{s.score:.3f}') for s in scores[:3]]}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Classification top 3: %s", [(s.name, f'{s.score:.3f}') for s in scores[:3]])
         return scores
     
     def _compute_text_features_on_demand(self, aesthetic_vocabulary: List[str]) -> torch.Tensor:
@@ -294,12 +331,12 @@ class CLIPService:
             raise RuntimeError("CLIP model not initialized")
         
         try:
-            return await asyncio.get_event_loop().run_in_executor(
-                None, self._similarity_sync, image1_content, image2_url
+            return await self._run_in_executor(
+                self._similarity_sync, image1_content, image2_url
             )
             
         except Exception as e:
-            logger.error(f"Error calculating similarity: {str(e)}")
+            logger.error("Error calculating similarity: %s", e)
             return 0.0
     
     def _similarity_sync(self, image1_content: bytes, image2_url: str) -> float:
@@ -308,7 +345,7 @@ class CLIPService:
             import requests
 
             # Get second image
-            response = requests.get(image2_url, timeout=10)
+            response = requests.get(image2_url, timeout=call_timeout(10))
             response.raise_for_status()
             image2_content = response.content
 
@@ -340,7 +377,7 @@ class CLIPService:
             return float(similarity.item())
 
         except Exception as e:
-            logger.error(f"Error in similarity calculation: {str(e)}")
+            logger.error("Error in similarity calculation: %s", e)
             return 0.0
     
     async def get_image_embedding(self, image_content: bytes) -> np.ndarray:
@@ -349,12 +386,14 @@ class CLIPService:
             raise RuntimeError("CLIP model not initialized")
         
         try:
-            return await asyncio.get_event_loop().run_in_executor(
-                None, self._embedding_sync, image_content
-            )
+            metrics_service.model_batch_size.labels("embed").observe(1)
+            with metrics_service.model_inference_duration.labels("embed").time():
+                return await self._run_in_executor(
+                    self._embedding_sync, image_content
+                )
             
         except Exception as e:
-            logger.error(f"Error getting image embedding: {str(e)}")
+            logger.error("Error getting image embedding: %s", e)
             raise
     
     def _embedding_sync(self, image_content: bytes) -> np.ndarray:
@@ -374,13 +413,15 @@ class CLIPService:
     
     async def batch_similarity(self, 
                              original_embedding: np.ndarray,
-                             candidate_urls: List[str]) -> List[float]:
+                             candidate_urls: List[str],
+                             trace: Optional[PipelineTrace] = None) -> List[float]:
         """
         Calculate similarity scores for multiple candidates efficiently.
         
         Args:
             original_embedding: Pre-computed embedding of original image
             candidate_urls: List of candidate image URLs
+            trace: Optional pipeline trace receiving per-candidate download/embed spans
             
         Returns:
             List of similarity scores in same order as input URLs
@@ -389,17 +430,20 @@ class CLIPService:
             raise RuntimeError("CLIP model not initialized")
         
         try:
-            return await asyncio.get_event_loop().run_in_executor(
-                None, self._batch_similarity_sync, original_embedding, candidate_urls
-            )
+            metrics_service.model_batch_size.labels("batch_similarity").observe(len(candidate_urls))
+            with metrics_service.model_inference_duration.labels("batch_similarity").time():
+                return await self._run_in_executor(
+                    self._batch_similarity_sync, original_embedding, candidate_urls, trace or PipelineTrace()
+                )
             
         except Exception as e:
-            logger.error(f"Error in batch similarity: {str(e)}")
+            logger.error("Error in batch similarity: %s", e)
             return [0.0] * len(candidate_urls)
     
     def _batch_similarity_sync(self,
                               original_embedding: np.ndarray,
-                              candidate_urls: List[str]) -> List[float]:
+                              candidate_urls: List[str],
+                              trace: PipelineTrace) -> List[float]:
         """Synchronous batch similarity calculation."""
         import requests
 
@@ -407,10 +451,12 @@ class CLIPService:
         original_tensor = torch.from_numpy(original_embedding).unsqueeze(0).to(self.device)
 
         for url in candidate_urls:
+            check_cancelled()  # Runs in a worker thread: task.cancel() cannot stop this loop
             try:
-                # Fetch image with timeout
-                response = requests.get(url, timeout=5)
-                response.raise_for_status()
+                # Fetch image with timeout (capped by the job deadline)
+                with trace.span("rerank.download"):
+                    response = requests.get(url, timeout=call_timeout(5))
+                    response.raise_for_status()
 
                 # Process image
                 candidate_image = self._preprocess_image(response.content)
@@ -418,7 +464,7 @@ class CLIPService:
                 inputs = self.image_processor(images=[candidate_image], return_tensors="pt")
                 inputs = {k: v.to(self.device) for k, v in inputs.items()}
 
-                with torch.no_grad():
+                with trace.span("rerank.embed"), torch.no_grad():
                     output = self.model.get_image_features(**inputs)
                     # SigLIP returns BaseModelOutputWithPooling, extract pooler_output
                     candidate_features = output.pooler_output if hasattr(output, 'pooler_output') else output
@@ -429,7 +475,7 @@ class CLIPService:
                     similarities.append(float(similarity.item()))
 
             except Exception as e:
-                logger.warning(f"Failed to process candidate {url}: {str(e)}")
+                logger.warning("Failed to process candidate %s: %s", url, e)
                 similarities.append(0.0)
 
         return similarities
@@ -0,0 +1,164 @@
+"""Near-duplicate removal for image candidates.
+
+Providers often return the same photo twice: Unsplash and Pexels mirror each
+other's contributors, and Pinterest serves one pin at several sizes. Exact URL
+dedupe misses these, and every duplicate costs a rerank download and embedding
+and can take two of the final slots.
+
+Each candidate gets a 64-bit difference hash (dHash) of its thumbnail: the
+thumbnail is shrunk to 9x8 greyscale and each bit records whether a pixel is
+brighter than its right-hand neighbour. Visually identical images differ in a
+few bits at most, whatever their size or compression. Hashes are cached per URL
+(in process and in Redis for settings.image_hash_cache_ttl), so a URL is
+downloaded and hashed once.
+
+HashIndex splits every hash into 8 one-byte bands. Two hashes within Hamming
+distance 7 must share at least one band exactly (pigeonhole), so a lookup only
+compares against the few hashes in matching buckets.
+"""
+
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from io import BytesIO
+from typing import Dict, List, Optional, Set
+
+from PIL import Image
+
+from config import settings
+from models import ImageCandidate
+from services.cache_service import cache_service
+from services.cancellation import call_timeout
+from services.image_provider import get_http_client
+from services.metrics_service import metrics_service
+
+logger = logging.getLogger(__name__)
+
+_BANDS = 8  # One byte each; guarantees recall up to distance 7
+
+
+def dhash(image_content: bytes) -> int:
+    """64-bit difference hash of an image."""
+    with Image.open(BytesIO(image_content)) as image:
+        pixels = list(image.convert("L").resize((9, 8), Image.BILINEAR).getdata())
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            value = (value << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return value
+
+
+class HashIndex:
+    """Banded index of image hashes for near-duplicate lookups."""
+
+    def __init__(self, max_distance: int):
+        self.max_distance = min(max_distance, _BANDS - 1)
+        self._buckets: Dict[tuple, List[int]] = {}
+
+    @staticmethod
+    def _bands(value: int):
+        return [(band, (value >> (8 * band)) & 0xFF) for band in range(_BANDS)]
+
+    def near(self, value: int) -> bool:
+        """Whether a hash within max_distance has been added."""
+        checked: Set[int] = set()
+        for band in self._bands(value):
+            for other in self._buckets.get(band, ()):
+                if other not in checked:
+                    checked.add(other)
+                    if bin(value ^ other).count("1") <= self.max_distance:
+                        return True
+        return False
+
+    def add(self, value: int) -> None:
+        for band in self._bands(value):
+            self._buckets.setdefault(band, []).append(value)
+
+
+class DedupeService:
+    """Hashes candidate thumbnails and drops near-duplicates."""
+
+    def __init__(self):
+        self._hashes: "OrderedDict[str, int]" = OrderedDict()  # In-process LRU in front of Redis
+
+    def _key(self, url: str) -> str:
+        return f"imghash:{hashlib.sha256(url.encode()).hexdigest()[:16]}"
+
+    async def _cached_hashes(self, urls: List[str]) -> Dict[str, int]:
+        found = {url: self._hashes[url] for url in urls if url in self._hashes}
+        missing = [url for url in urls if url not in found]
+        client = cache_service.client
+        if missing and client is not None:
+            try:
+                values = await client.mget([self._key(url) for url in missing])
+                for url, value in zip(missing, values):
+                    if value is not None:
+                        found[url] = int(value, 16)
+                        self._remember(url, found[url])
+            except Exception as e:
+                logger.warning("Image hash cache read failed: %s", e)
+        return found
+
+    def _remember(self, url: str, value: int) -> None:
+        self._hashes[url] = value
+        self._hashes.move_to_end(url)
+        while len(self._hashes) > settings.image_hash_local_size:
+            self._hashes.popitem(last=False)
+
+    async def _compute(self, url: str) -> Optional[int]:
+        try:
+            response = await get_http_client().get(url, timeout=call_timeout(settings.near_duplicate_fetch_timeout))
+            response.raise_for_status()
+            return await asyncio.get_running_loop().run_in_executor(None, dhash, response.content)
+        except Exception as e:
+            logger.debug("Could not hash %s: %s", url, e)
+            return None
+
+    async def hashes(self, candidates: List[ImageCandidate]) -> Dict[str, int]:
+        """Hash per candidate URL (thumbnail preferred); candidates that fail are left out."""
+        sources = {c.url: c.thumbnail_url or c.url for c in candidates}
+        found = await self._cached_hashes(list(sources))
+        missing = [url for url in sources if url not in found]
+        if not missing:
+            return found
+
+        computed = await asyncio.gather(*(self._compute(sources[url]) for url in missing))
+        new = {url: value for url, value in zip(missing, computed) if value is not None}
+        for url, value in new.items():
+            self._remember(url, value)
+        found.update(new)
+
+        client = cache_service.client
+        if new and client is not None:
+            try:
+                pipe = client.pipeline()
+                for url, value in new.items():
+                    pipe.setex(self._key(url), settings.image_hash_cache_ttl, format(value, "016x"))
+                await pipe.execute()
+            except Exception as e:
+                logger.warning("Image hash cache write failed: %s", e)
+        return found
+
+    async def drop_near_duplicates(self, candidates: List[ImageCandidate], index: HashIndex) -> List[ImageCandidate]:
+        """Keep candidates (in order) that are not near-duplicates of one already in ``index``.
+
+        Kept hashes are added to the index, so one index can screen several batches.
+        Candidates that could not be hashed are kept.
+        """
+        hashes = await self.hashes(candidates)
+        kept = []
+        for candidate in candidates:
+            value = hashes.get(candidate.url)
+            if value is not None:
+                if index.near(value):
+                    logger.debug("Near-duplicate dropped: %s (%s)", candidate.url, candidate.source_api)
+                    metrics_service.near_duplicates.labels(candidate.source_api).inc()
+                    continue
+                index.add(value)
+            kept.append(candidate)
+        return kept
+
+
+# Global service instance
+dedupe_service = DedupeService()
@@ -0,0 +1,245 @@
+"""Background dispatcher for Unsplash download events.
+
+Unsplash's API guidelines require a GET to a photo's ``download_location``
+whenever the photo is used. Sending those inline would add one round trip per
+image to moodboard delivery, so they are queued instead:
+
+- enqueue_in_background() is called when images are delivered (new moodboard,
+  cached moodboard, load-more page), so the response never waits on Redis.
+  enqueue() claims every location in one pipelined round trip (SET NX), skips
+  those already tracked within settings.unsplash_download_dedupe_window and
+  appends the rest to a Redis list (``unsplash:download_queue``), so unsent
+  events survive restarts.
+- run() (started from the app lifespan) moves batches onto this worker's
+  processing list (LMOVE), sends them concurrently, then in one transaction
+  clears the processing list and re-queues failures with exponential backoff,
+  up to settings.unsplash_download_max_attempts. A worker that dies mid-batch
+  stops renewing its liveness key; after settings.unsplash_download_worker_ttl
+  any other worker moves its processing list back onto the queue. Events are
+  sent outside the search rate budget; while Unsplash is rate limiting us they
+  wait out the backoff without using up attempts.
+
+Without Redis the queue and dedupe window are kept in process.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import secrets
+import time
+from collections import deque
+from typing import Dict, Iterable, List, Set
+
+from config import settings
+from models import ImageCandidate
+from services.cache_service import cache_service
+from services.cancellation import bind_token
+from services.rate_limiter import rate_limiter
+from services.unsplash_client import unsplash_client
+
+logger = logging.getLogger(__name__)
+
+QUEUE_KEY = "unsplash:download_queue"
+PROCESSING_KEY = "unsplash:download_processing:"  # + worker id: the batch a worker is sending
+WORKER_KEY = "unsplash:download_worker:"  # + worker id: liveness, renewed by run()
+
+
+class DownloadTracker:
+    """Queues Unsplash download events and sends them off the request path."""
+
+    def __init__(self):
+        # In-process fallback state when Redis is unavailable
+        self._queue: deque = deque()
+        self._recent: Dict[str, float] = {}
+        self._background: Set[asyncio.Task] = set()
+        self._worker_id = secrets.token_hex(8)
+        self._processing_key = f"{PROCESSING_KEY}{self._worker_id}"
+
+    def _dedupe_key(self, location: str) -> str:
+        return f"unsplash:downloaded:{hashlib.sha256(location.encode()).hexdigest()[:16]}"
+
+    async def _first_use(self, locations: List[str]) -> List[bool]:
+        """Claim locations for this dedupe window; False for those tracked recently."""
+        client = cache_service.client
+        if client is not None:
+            try:
+                pipe = client.pipeline(transaction=False)
+                for location in locations:
+                    pipe.set(self._dedupe_key(location), "1", nx=True, ex=settings.unsplash_download_dedupe_window)
+                return [bool(claimed) for claimed in await pipe.execute()]
+            except Exception as e:
+                logger.warning("Download tracker dedupe check failed: %s", e)
+        now = time.time()
+        self._recent = {loc: until for loc, until in self._recent.items() if until > now}
+        claimed = []
+        for location in locations:
+            claimed.append(location not in self._recent)
+            self._recent.setdefault(location, now + settings.unsplash_download_dedupe_window)
+        return claimed
+
+    async def _push(self, items: List[Dict]) -> None:
+        client = cache_service.client
+        if client is not None:
+            try:
+                await client.rpush(QUEUE_KEY, *(json.dumps(item) for item in items))
+                return
+            except Exception as e:
+                logger.warning("Download tracker queue write failed, keeping events in process: %s", e)
+        self._queue.extend(items)
+
+    async def _pop(self, count: int) -> List[Dict]:
+        """Take up to ``count`` events; those from Redis stay on this worker's processing list until _settle()."""
+        items = [self._queue.popleft() for _ in range(min(count, len(self._queue)))]
+        client = cache_service.client
+        if client is not None and len(items) < count:
+            try:
+                pipe = client.pipeline(transaction=False)
+                for _ in range(count - len(items)):
+                    pipe.lmove(QUEUE_KEY, self._processing_key, "LEFT", "RIGHT")
+                items += [json.loads(raw) for raw in await pipe.execute() if raw is not None]
+            except Exception as e:
+                logger.warning("Download tracker queue read failed: %s", e)
+        return items
+
+    async def _settle(self, retry: List[Dict]) -> None:
+        """Finish a batch: clear the processing list and re-queue ``retry`` in one transaction."""
+        client = cache_service.client
+        if client is not None:
+            try:
+                pipe = client.pipeline(transaction=True)
+                pipe.delete(self._processing_key)
+                if retry:
+                    pipe.rpush(QUEUE_KEY, *(json.dumps(item) for item in retry))
+                await pipe.execute()
+                return
+            except Exception as e:
+                logger.warning("Download tracker queue write failed, keeping events in process: %s", e)
+        self._queue.extend(retry)
+
+    async def recover(self) -> int:
+        """Renew this worker's liveness and re-queue batches of workers that stopped renewing theirs.
+
+        Returns how many events were moved back onto the queue.
+        """
+        client = cache_service.client
+        if client is None:
+            return 0
+        moved = 0
+        try:
+            await client.set(f"{WORKER_KEY}{self._worker_id}", "1", ex=settings.unsplash_download_worker_ttl)
+            async for key in client.scan_iter(match=f"{PROCESSING_KEY}*"):
+                worker_id = key[len(PROCESSING_KEY):]
+                if worker_id == self._worker_id or await client.exists(f"{WORKER_KEY}{worker_id}"):
+                    continue
+                while await client.lmove(key, QUEUE_KEY, "LEFT", "RIGHT") is not None:
+                    moved += 1
+        except Exception as e:
+            logger.warning("Download tracker recovery failed: %s", e)
+        if moved:
+            logger.info("Re-queued %s Unsplash download events left by a stopped worker", moved)
+        return moved
+
+    async def enqueue(self, images: Iterable[ImageCandidate]) -> int:
+        """Queue download events for the delivered Unsplash images; returns how many were queued."""
+        try:
+            locations = list(dict.fromkeys(
+                image.download_location for image in images
+                if image.source_api == "unsplash" and image.download_location
+            ))
+            if not locations:
+                return 0
+            claimed = await self._first_use(locations)
+            items = [{"location": location, "attempts": 0, "not_before": 0.0}
+                     for location, first in zip(locations, claimed) if first]
+            if items:
+                await self._push(items)
+            return len(items)
+        except Exception as e:
+            logger.warning("Could not queue Unsplash download events: %s", e)
+            return 0
+
+    def enqueue_in_background(self, images: Iterable[ImageCandidate]) -> None:
+        """enqueue() off the request path."""
+        images = [image for image in images if image.source_api == "unsplash" and image.download_location]
+        if not images:
+            return
+
+        async def run():
+            bind_token(None)
+            await self.enqueue(images)
+
+        task = asyncio.create_task(run())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def drain(self) -> None:
+        """Wait for events still being handed off by enqueue_in_background() (shutdown, tests)."""
+        await asyncio.gather(*self._background, return_exceptions=True)
+
+    async def flush_once(self) -> int:
+        """Send one batch of due events; returns how many were sent successfully."""
+        batch = await self._pop(settings.unsplash_download_batch_size)
+        if not batch:
+            return 0
+
+        now = time.time()
+        backoff = await rate_limiter.backoff_remaining(unsplash_client.name)
+        if backoff > 0:
+            # Unsplash is rate limiting us: wait it out rather than spend attempts
+            for item in batch:
+                item["not_before"] = max(item["not_before"], now + backoff)
+            await self._settle(batch)
+            return 0
+
+        due = [item for item in batch if item["not_before"] <= now]
+        retry = [item for item in batch if item["not_before"] > now]
+        sent = 0
+        try:
+            results = await asyncio.gather(
+                *(unsplash_client.trigger_download_event(item["location"]) for item in due),
+                return_exceptions=True,
+            )
+            backoff = await rate_limiter.backoff_remaining(unsplash_client.name)
+            for item, ok in zip(due, results):
+                if ok is True:
+                    sent += 1
+                    continue
+                if backoff > 0:
+                    item["not_before"] = now + backoff  # Rate limited (429): not the event's fault
+                    retry.append(item)
+                    continue
+                item["attempts"] += 1
+                if item["attempts"] >= settings.unsplash_download_max_attempts:
+                    logger.error("Dropping Unsplash download event after %s attempts: %s",
+                                 item["attempts"], item["location"])
+                    continue
+                item["not_before"] = now + settings.unsplash_download_flush_interval * 2 ** item["attempts"]
+                retry.append(item)
+        except asyncio.CancelledError:
+            retry = batch  # Shutting down mid-batch: keep everything for the next start
+            raise
+        finally:
+            await self._settle(retry)
+        if sent:
+            logger.info("Sent %s Unsplash download events", sent)
+        return sent
+
+    async def run(self) -> None:
+        """Background loop started from the app lifespan."""
+        loop = asyncio.get_running_loop()
+        next_recovery = 0.0
+        while True:
+            try:
+                if loop.time() >= next_recovery:
+                    await self.recover()
+                    next_recovery = loop.time() + settings.unsplash_download_worker_ttl / 3
+                if await self.flush_once():
+                    continue  # Drain backlog without waiting
+            except Exception as e:
+                logger.warning("Download tracker error: %s", e)
+            await asyncio.sleep(settings.unsplash_download_flush_interval)
+
+
+# Global service instance
+download_tracker = DownloadTracker()
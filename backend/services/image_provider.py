@@ -0,0 +1,312 @@
+"""Shared HTTP pool and base class for image providers (Unsplash, Pexels, Flickr, Pinterest).
+
+All provider traffic goes through one pooled httpx.AsyncClient (keep-alive, HTTP/2
+when the optional ``h2`` package is installed), so repeated searches reuse warm
+TCP/TLS connections instead of handshaking per call. Each provider declares a
+ProviderPolicy: its default request timeout (always capped by the job deadline)
+and how many requests it may have in flight at once.
+
+Providers implement ``_search_page(query, n, cursor)``, returning one page and the
+cursor of the next (None when there is none); callers use ``search(query, n)``
+for the first page, which never raises for provider failures and returns []
+instead, and ``search_page`` for deeper pages (services/candidate_pool.py).
+
+search() is cached uniformly for every provider (cache_service.get_api_cache):
+fresh hits return immediately, stale hits return immediately and trigger one
+background refresh per key, and empty results are cached briefly so dead
+queries do not hit the network on every job (Pinterest results are never served
+stale; see cache_service). Every request spends from the provider's rate budget
+(services/rate_limiter.py); once it is exhausted, search() answers from the
+cache only.
+
+The moodboard pipeline calls ``hedged_search(query, n)``: a search with a timeout
+derived from the provider's recent latencies (LatencyWindow), which sends one
+duplicate attempt once the first has outlived the provider's recent p95 and takes
+whichever answers first.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Dict, List, Optional, Set, Tuple
+
+import httpx
+
+from config import settings
+from models import ImageCandidate, from_cache
+from services.cache_service import cache_service
+from services.cancellation import bind_token, call_timeout
+from services.metrics_service import metrics_service
+from services.rate_limiter import RateLimitedError, rate_limiter
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401  (httpx needs it for HTTP/2)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """The process-wide pooled client for outbound provider calls."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            http2=settings.http2_enabled and HTTP2_AVAILABLE,
+            limits=httpx.Limits(
+                max_connections=settings.http_max_connections,
+                max_keepalive_connections=settings.http_max_keepalive_connections,
+                keepalive_expiry=settings.http_keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(10.0, connect=3.0),
+        )
+    return _http_client
+
+
+async def close_http_client() -> None:
+    """Close the shared pool (called on application shutdown)."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+class ProviderPolicy:
+    """Per-provider request timeout and concurrency limit."""
+
+    def __init__(self, timeout: float = 5.0, max_concurrency: int = 8):
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+
+
+class LatencyWindow:
+    """Durations of a provider's most recent searches."""
+
+    def __init__(self, size: int):
+        self._samples: deque = deque(maxlen=size)
+
+    def observe(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """The q-quantile of recent durations, or None until there are enough samples."""
+        if len(self._samples) < settings.provider_latency_min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class ImageProvider:
+    """Base class for image search providers."""
+
+    name = "provider"
+    policy = ProviderPolicy()
+
+    def __init__(self):
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._revalidating: Set[Tuple[str, int]] = set()
+        self._background: Set[asyncio.Task] = set()
+        self.latency = LatencyWindow(settings.provider_latency_window)
+
+    def default_headers(self) -> Dict[str, str]:
+        """Headers sent with every request (e.g. authorization)."""
+        return {}
+
+    async def is_available(self) -> bool:
+        """Whether the provider is configured and can be queried."""
+        return True
+
+    def slot(self) -> asyncio.Semaphore:
+        """Concurrency slot; hold it for the duration of one outbound request."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.policy.max_concurrency)
+        return self._semaphore
+
+    async def spend_budget(self) -> None:
+        """Take one request from the rate budget or raise RateLimitedError."""
+        if not await rate_limiter.acquire(self.name):
+            metrics_service.provider_errors.labels(self.name, "rate_limited").inc()
+            raise RateLimitedError(self.name)
+
+    async def search(self, query: str, n: int = 20) -> List[ImageCandidate]:
+        """Search for up to ``n`` images; provider failures are logged and yield []."""
+        if not await self.is_available():
+            logger.warning("%s not configured, skipping search for '%s'", self.name, query)
+            return []
+
+        cached = await cache_service.get_api_cache(self.name, query, n)
+        if cached is not None:
+            results, stale = cached
+            if stale:
+                self._revalidate(query, n)
+            return from_cache(ImageCandidate, results)
+
+        return await self.refresh(query, n)
+
+    async def refresh(self, query: str, n: int) -> List[ImageCandidate]:
+        """Call the provider and cache what it returns; failures yield [] and are not cached."""
+        start = time.perf_counter()
+        try:
+            candidates, cursor = await self._search_page(query, n, None)
+        except asyncio.CancelledError:
+            self.latency.observe(time.perf_counter() - start)  # At least this slow; keeps the window honest
+            raise
+        except RateLimitedError:
+            logger.warning("%s out of rate budget and '%s' not cached, skipping", self.name, query)
+            return []
+        except httpx.TimeoutException:
+            logger.error("%s API timeout for query: %s", self.name, query)
+            candidates = None
+        except httpx.HTTPStatusError as e:
+            logger.error("%s API HTTP error for query '%s': %s", self.name, query, e)
+            candidates = None
+        except Exception as e:
+            logger.error("%s API error for query '%s': %s", self.name, query, e)
+            candidates = None
+
+        self.latency.observe(time.perf_counter() - start)
+        if candidates is None:
+            return []
+        await cache_service.set_api_cache(self.name, query, n, [c.model_dump(exclude_none=True) for c in candidates], cursor)
+        return candidates
+
+    async def search_page(self, query: str, n: int, cursor: Optional[str]) -> Tuple[List[ImageCandidate], Optional[str]]:
+        """One page after the first (uncached). On failure returns ([], cursor) so it can be retried."""
+        if not await self.is_available():
+            return [], None
+        try:
+            return await self._search_page(query, n, cursor)
+        except RateLimitedError:
+            return [], cursor
+        except Exception as e:
+            logger.warning("%s page %s for '%s' failed: %s", self.name, cursor, query, e)
+            return [], cursor
+
+    def search_timeout(self) -> float:
+        """Time allowed for one search: a multiple of recent p99, within the configured bounds."""
+        p99 = self.latency.quantile(0.99)
+        if p99 is None:
+            return call_timeout(settings.provider_search_timeout)
+        timeout = max(settings.provider_search_timeout_floor, p99 * settings.provider_timeout_multiplier)
+        return call_timeout(min(settings.provider_search_timeout, timeout))
+
+    async def hedged_search(self, query: str, n: int = 20) -> List[ImageCandidate]:
+        """search() under an adaptive timeout, hedged with one duplicate attempt.
+
+        If the first attempt has not answered by the provider's recent p95 latency, a
+        second one is started (when the rate budget allows) and the first non-empty
+        answer wins; the other attempt is cancelled. An attempt that fails counts as
+        an empty answer. Returns [] on timeout. Attempts still running on timeout (or
+        when the caller is cancelled) are left to finish in the background, so their
+        results are cached and their latency recorded.
+        """
+        timeout = self.search_timeout()
+        hedge_after = self.latency.quantile(settings.provider_hedge_quantile)
+        start = time.monotonic()
+        pending = {self._attempt(query, n)}
+        hedge = None
+        answered = False
+        try:
+            while pending:
+                elapsed = time.monotonic() - start
+                if elapsed >= timeout:
+                    logger.warning("%s search for '%s' timed out after %.1fs", self.name, query, timeout)
+                    return []
+                wait = timeout - elapsed
+                if hedge is None and hedge_after is not None:
+                    wait = min(wait, max(0.0, hedge_after - elapsed))
+
+                done, pending = await asyncio.wait(pending, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.cancelled() or task.exception() is not None:
+                        continue  # Logged by _attempt_done
+                    results = task.result()
+                    if results:
+                        if task is hedge:
+                            metrics_service.provider_hedges.labels(self.name, "won").inc()
+                        answered = True
+                        return results
+
+                if (pending and hedge is None and hedge_after is not None
+                        and time.monotonic() - start >= hedge_after):
+                    hedge_after = None  # At most one duplicate
+                    if await rate_limiter.has_budget(self.name):
+                        logger.info("%s slow for '%s' (>%.2fs), hedging", self.name, query, time.monotonic() - start)
+                        hedge = self._attempt(query, n)
+                        pending.add(hedge)
+                        metrics_service.provider_hedges.labels(self.name, "sent").inc()
+            return []
+        finally:
+            if answered:
+                for task in pending:
+                    task.cancel()
+
+    def _attempt(self, query: str, n: int) -> asyncio.Task:
+        """One search() attempt of hedged_search, owned by this provider until it finishes."""
+        task = asyncio.create_task(self.search(query, n))
+        self._background.add(task)
+        task.add_done_callback(self._attempt_done)
+        return task
+
+    def _attempt_done(self, task: asyncio.Task) -> None:
+        self._background.discard(task)
+        if not task.cancelled() and task.exception() is not None:  # Retrieved here, whoever was waiting
+            logger.warning("%s search attempt failed: %r", self.name, task.exception())
+
+    def _revalidate(self, query: str, n: int) -> None:
+        """Refresh a stale entry in the background, at most once per key at a time."""
+        key = (" ".join(query.lower().split()), n)
+        if key in self._revalidating:
+            return
+        self._revalidating.add(key)
+
+        async def revalidate():
+            bind_token(None)  # Not bound to the job that noticed the stale entry
+            try:
+                await self.refresh(query, n)
+            finally:
+                self._revalidating.discard(key)
+
+        task = asyncio.create_task(revalidate())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _search_page(self, query: str, n: int, cursor: Optional[str]) -> Tuple[List[ImageCandidate], Optional[str]]:
+        raise NotImplementedError
+
+    async def _request(self, method: str, url: str, budget: bool = True, **kwargs) -> httpx.Response:
+        """Send one request through the shared pool under this provider's policy.
+
+        Records latency and failure reason per provider; raises for HTTP errors and
+        RateLimitedError when the provider's budget cannot cover the request.
+        ``budget=False`` sends requests the provider does not count against the
+        search quota (e.g. Unsplash download events) without spending from it.
+        """
+        if budget:
+            await self.spend_budget()
+        kwargs.setdefault("timeout", call_timeout(self.policy.timeout))
+        kwargs["headers"] = {**self.default_headers(), **kwargs.get("headers", {})}
+
+        async with self.slot():
+            start = time.perf_counter()
+            error = None
+            try:
+                response = await get_http_client().request(method, url, **kwargs)
+                await rate_limiter.observe_response(self.name, response.status_code, response.headers)
+                response.raise_for_status()
+                return response
+            except httpx.TimeoutException:
+                error = "timeout"
+                raise
+            except httpx.HTTPStatusError as e:
+                error = f"http_{e.response.status_code}"
+                raise
+            except Exception:
+                error = "error"
+                raise
+            finally:
+                metrics_service.record_provider_call(self.name, time.perf_counter() - start, error)
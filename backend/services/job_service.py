@@ -1,11 +1,15 @@
 """Job management service for async processing."""
 
+import asyncio
 import logging
+import time
 from datetime import datetime
-from typing import Dict, Optional
-from uuid import UUID
+from typing import Dict, Optional, Set
+from uuid import UUID, uuid4
 
+from config import settings
 from models import JobStatus, MoodboardResult
+from services.cancellation import CancellationToken
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +26,11 @@ class Job:
         self.completed_at: Optional[datetime] = None
         self.error_message: Optional[str] = None
         self.result: Optional[MoodboardResult] = None
+        self.stage_timings: Dict[str, float] = {}  # Seconds per pipeline stage (see trace_service)
+        self.cancel_token = CancellationToken(settings.job_deadline)
+        self.task: Optional[asyncio.Task] = None
+        self.last_seen = time.monotonic()  # Last time a client asked about this job
+        self.clients: Set[str] = set()  # Uploads attached to this job (coalesced uploads share it)
 
 
 class JobService:
@@ -70,7 +79,7 @@ class JobService:
                 job.progress = progress
             if error_message:
                 job.error_message = error_message
-            if status in [JobStatus.COMPLETED, JobStatus.FAILED]:
+            if status in [JobStatus.COMPLETED, JobStatus.FAILED, JobStatus.CANCELLED]:
                 job.completed_at = datetime.now()
     
     async def store_job_result(self, job_id: UUID, result: MoodboardResult) -> None:
@@ -81,6 +90,105 @@ class JobService:
             job.status = JobStatus.COMPLETED
             job.completed_at = datetime.now()
 
+    async def store_stage_timings(self, job_id: UUID, stage_timings: Dict[str, float]) -> None:
+        """Record the per-stage timing breakdown of a job."""
+        job = self._jobs.get(job_id)
+        if job:
+            job.stage_timings = stage_timings
+
+    async def store_cached_result(self, job_id: UUID, cached_result: MoodboardResult) -> None:
+        """Complete a job with a moodboard produced earlier for the same image."""
+        result = cached_result.model_copy(update={"job_id": job_id, "status": JobStatus.COMPLETED})
+        await self.store_job_result(job_id, result)
+        job = self._jobs.get(job_id)
+        if job:
+            job.progress = 100
+
+    def count_by_status(self) -> Dict[tuple, int]:
+        """Number of tracked jobs per status (scraped by the moorea_jobs gauge)."""
+        counts = {(status.value,): 0 for status in JobStatus}
+        for job in list(self._jobs.values()):
+            counts[(job.status.value,)] += 1
+        return counts
+
+    def is_in_flight(self, job: Job) -> bool:
+        """Whether a job is still queued or running."""
+        return job.status in (JobStatus.PENDING, JobStatus.PROCESSING)
+
+    def attach_task(self, job_id: UUID, task: asyncio.Task) -> None:
+        """Remember the task running a job so it can be cancelled."""
+        job = self._jobs.get(job_id)
+        if job:
+            job.task = task
+
+    def touch(self, job_id: UUID) -> None:
+        """Record that a client is still interested in a job (status poll, re-upload)."""
+        job = self._jobs.get(job_id)
+        if job:
+            job.last_seen = time.monotonic()
+
+    def attach_client(self, job_id: UUID) -> Optional[str]:
+        """Attach an upload to a job; the returned client id is needed to detach it."""
+        job = self._jobs.get(job_id)
+        if not job:
+            return None
+        client_id = uuid4().hex
+        job.clients.add(client_id)
+        return client_id
+
+    async def detach_client(self, job_id: UUID, client_id: str) -> bool:
+        """Detach an upload from an in-flight job, cancelling the job once no upload is attached.
+
+        Returns False if the client is not attached to the job.
+        """
+        job = self._jobs.get(job_id)
+        if not job or client_id not in job.clients:
+            return False
+        job.clients.discard(client_id)
+        if not job.clients:
+            await self.cancel_job(job_id)
+        return True
+
+    async def cancel_job(self, job_id: UUID, reason: str = "cancelled by client") -> bool:
+        """Stop an in-flight job. Returns False if it is unknown or already finished."""
+        job = self._jobs.get(job_id)
+        if not job or not self.is_in_flight(job):
+            return False
+
+        # The token stops executor threads at their next checkpoint; task.cancel() interrupts awaits
+        job.cancel_token.cancel(reason)
+        if job.task and not job.task.done() and job.task is not asyncio.current_task():
+            job.task.cancel(reason)
+        await self.update_job_status(job_id, JobStatus.CANCELLED, error_message=reason)
+        logger.info("Cancelled job %s: %s", job_id, reason)
+        return True
+
+    async def reap_jobs(self) -> int:
+        """Cancel in-flight jobs that passed their deadline or that no client polls any more."""
+        now = time.monotonic()
+        reaped = 0
+        for job in list(self._jobs.values()):
+            if not self.is_in_flight(job):
+                continue
+            if job.cancel_token.expired:
+                reason = "deadline exceeded"
+            elif now - job.last_seen > settings.job_abandon_timeout:
+                reason = "abandoned by client"
+            else:
+                continue
+            if await self.cancel_job(job.id, reason):
+                reaped += 1
+        return reaped
+
+    async def run_reaper(self) -> None:
+        """Background loop started from the app lifespan."""
+        while True:
+            await asyncio.sleep(settings.job_reaper_interval)
+            try:
+                await self.reap_jobs()
+            except Exception as e:
+                logger.warning("Job reaper error: %s", e)
+
 
 # Global service instance
 job_service = JobService()
\ No newline at end of file
@@ -0,0 +1,347 @@
+"""Prometheus-style metrics for the whole backend.
+
+Metrics are plain in-process counters, gauges and histograms rendered in the
+Prometheus text exposition format (version 0.0.4) by GET /metrics. There is no
+client library dependency: recording a sample is a cached dict lookup plus an
+addition under a per-series lock, so instrumentation is safe on hot paths and in
+executor threads.
+
+Gauges whose value lives elsewhere (job queue depth, DB pool usage) are read
+through callbacks at scrape time instead of being updated on every change.
+"""
+
+import inspect
+import logging
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+LabelValues = Tuple[str, ...]
+
+# Seconds; covers ~1ms cache round trips up to the 30s worst-case pipeline
+LATENCY_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 15.0, 30.0)
+BATCH_SIZE_BUCKETS: Tuple[float, ...] = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    """Base class for a labelled metric family."""
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._children: Dict[LabelValues, object] = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        """Return the series for the given label values (created on first use)."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.label_names):
+                raise ValueError(f"{self.name} expects labels {self.label_names}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class _CounterChild:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    type_name = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def _samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.label_names, values)} {_format_value(child.value)}"
+            for values, child in list(self._children.items())
+        ]
+
+
+class _GaugeChild:
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, optionally read through a scrape-time callback.
+
+    The callback returns a mapping of label-value tuples to values.
+    """
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                 callback: Optional[Callable[[], Dict[LabelValues, float]]] = None):
+        super().__init__(name, documentation, label_names)
+        self.callback = callback
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def _samples(self) -> List[str]:
+        if self.callback is not None:
+            try:
+                values = self.callback()
+            except Exception as e:
+                logger.warning(f"Metrics callback for {self.name} failed: {e}")
+                values = {}
+        else:
+            values = {labels: child.value for labels, child in list(self._children.items())}
+        return [
+            f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}"
+            for labels, value in values.items()
+        ]
+
+
+class _HistogramChild:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.bucket_counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.bucket_counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def time(self) -> "_Timer":
+        """Context manager observing the elapsed seconds of its block."""
+        return _Timer(self)
+
+    def cumulative(self) -> List[Tuple[float, int]]:
+        with self._lock:
+            counts = list(self.bucket_counts)
+        running, result = 0, []
+        for bound, n in zip(self.buckets + (float("inf"),), counts):
+            running += n
+            result.append((bound, running))
+        return result
+
+
+class _Timer:
+    def __init__(self, child: _HistogramChild):
+        self._child = child
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._child.observe(time.perf_counter() - self._start)
+        return False
+
+
+class Histogram(_Metric):
+    """Bucketed distribution of observed values."""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def snapshot(self) -> Dict[LabelValues, Dict[str, object]]:
+        """JSON-friendly view of every series: count, sum, average and cumulative buckets."""
+        result = {}
+        for values, child in sorted(self._children.items()):
+            result[values] = {
+                "count": child.count,
+                "sum": round(child.sum, 6),
+                "avg": round(child.sum / child.count, 6) if child.count else 0.0,
+                "buckets": {_format_value(bound): count for bound, count in child.cumulative()},
+            }
+        return result
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for values, child in list(self._children.items()):
+            for bound, count in child.cumulative():
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, values, le)} {count}")
+            labels = _format_labels(self.label_names, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+            lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+
+class MetricsService:
+    """Registry of every backend metric."""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+        # HTTP
+        self.http_request_duration = self._register(Histogram(
+            "moorea_http_request_duration_seconds", "HTTP request latency by route template.",
+            ("method", "route", "status")))
+
+        # Jobs and pipeline
+        self.jobs = self._register(Gauge(
+            "moorea_jobs", "Moodboard jobs currently tracked, by status.", ("status",)))
+        self.pipeline_stage_duration = self._register(Histogram(
+            "moorea_pipeline_stage_duration_seconds", "Moodboard pipeline stage latency.", ("stage",)))
+
+        # Model inference
+        self.model_inference_duration = self._register(Histogram(
+            "moorea_model_inference_duration_seconds", "Vision-language model call latency.", ("operation",)))
+        self.model_batch_size = self._register(Histogram(
+            "moorea_model_batch_size", "Images per vision-language model call.", ("operation",),
+            buckets=BATCH_SIZE_BUCKETS))
+
+        # Caches
+        self.cache_requests = self._register(Counter(
+            "moorea_cache_requests_total", "Cache lookups by cache type and result (hit/miss).",
+            ("cache", "result")))
+
+        # Image providers
+        self.provider_request_duration = self._register(Histogram(
+            "moorea_provider_request_duration_seconds", "Image provider API call latency.", ("provider",)))
+        self.provider_errors = self._register(Counter(
+            "moorea_provider_errors_total", "Failed image provider API calls.", ("provider", "reason")))
+        self.provider_hedges = self._register(Counter(
+            "moorea_provider_hedged_searches_total", "Duplicate searches sent after a slow first attempt (sent/won).",
+            ("provider", "outcome")))
+
+        self.near_duplicates = self._register(Counter(
+            "moorea_near_duplicates_removed_total", "Candidates dropped as near-duplicates of another candidate.",
+            ("provider",)))
+
+        # Database
+        self.db_pool = self._register(Gauge(
+            "moorea_db_pool_connections", "SQLAlchemy connection pool usage.", ("state",)))
+
+    def _register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def record_cache(self, cache: str, hit: bool) -> None:
+        """Count one cache lookup."""
+        self.cache_requests.labels(cache, "hit" if hit else "miss").inc()
+
+    def record_provider_call(self, provider: str, seconds: float, error: Optional[str] = None) -> None:
+        """Record one provider API call and, if it failed, why."""
+        self.provider_request_duration.labels(provider).observe(seconds)
+        if error:
+            self.provider_errors.labels(provider, error).inc()
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text format."""
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+
+def _route_template(scope) -> str:
+    """Rebuild "/api/v1/moodboard/status/{job_id}" from the concrete path and its path params.
+
+    Works whether or not the router records the matched route in the scope, and
+    collapses every unmatched path into one label.
+    """
+    if "endpoint" not in scope and "route" not in scope:
+        return "unmatched"
+    endpoint = scope.get("endpoint")
+    if endpoint is not None and not inspect.isroutine(endpoint):
+        # Mounted sub-application (e.g. StaticFiles): one series per mount point
+        return f"{scope.get('root_path', '')}/*"
+    path = scope.get("path", "")
+    for name, value in scope.get("path_params", {}).items():
+        path = path.replace(f"/{str(value).lstrip('/')}", "/{" + name + "}", 1)
+    return path
+
+
+class PrometheusMiddleware:
+    """ASGI middleware recording request latency per route template.
+
+    Labels by route template rather than raw URL so label cardinality stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            metrics_service.http_request_duration.labels(
+                scope.get("method", ""), _route_template(scope), str(status_code)
+            ).observe(time.perf_counter() - start)
+
+
+# Global service instance
+metrics_service = MetricsService()
@@ -16,7 +16,7 @@ class MockPinterestOAuthService:
         self.redis_client = redis.from_url(settings.redis_url)
         self.mock_access_token = "mock_access_token_" + secrets.token_urlsafe(16)
 
-    def get_authorization_url(self, state: Optional[str] = None) -> str:
+    async def get_authorization_url(self, state: Optional[str] = None) -> str:
         """Generate mock Pinterest authorization URL"""
         if not state:
             state = secrets.token_urlsafe(32)
@@ -94,6 +94,16 @@ class MockPinterestOAuthService:
         token = self.redis_client.get("pinterest_access_token")
         return token.decode() if token else None
 
+    def has_credentials(self) -> bool:
+        """Whether a mock access or refresh token is stored"""
+        return self.get_access_token() is not None or self.redis_client.get("pinterest_refresh_token") is not None
+
+    async def load_tokens(self) -> None:
+        """Mock tokens live in Redis only; nothing to load"""
+
+    async def run_refresher(self) -> None:
+        """Mock tokens last 30 days; no background refresh"""
+
     async def make_authenticated_request(self, method: str, endpoint: str, **kwargs) -> dict:
         """Make mock authenticated API request"""
         token = self.get_access_token()
@@ -1,18 +1,29 @@
 """Moodboard generation service - orchestrates the full pipeline."""
 
 import asyncio
+import hashlib
 import logging
 from datetime import datetime
-from typing import List
+from typing import Dict, List, Optional, Tuple
 from uuid import UUID
 
 from config import settings
+from config.logging_config import bind_job_id
 from models import JobStatus, MoodboardResult, AestheticScore, ImageCandidate
+from services.cache_service import cache_service
+from services.cache_warmer import cache_warmer
+from services.candidate_pool import FetchedPage, candidate_pool
+from services.cancellation import bind_token, call_timeout, check_cancelled
+from services.dedupe_service import HashIndex, dedupe_service
+from services.download_tracker import download_tracker
 from services.job_service import job_service
 from services.unsplash_client import unsplash_client
 from services.pexels_client import pexels_client
 from services.flickr_client import flickr_client
+from services.image_provider import ImageProvider
 from services.pinterest_client import pinterest_client
+from services.rate_limiter import rate_limiter
+from services.trace_service import PipelineTrace, trace_service
 """
 NOTE: clip_service and aesthetic_service import heavy ML dependencies (torch/CLIP).
 To allow local runs without ML packages, these services are imported lazily inside
@@ -22,6 +33,9 @@ so that moodboard routes can be enabled without ML installed.
 
 logger = logging.getLogger(__name__)
 
+# Aesthetics whose rank is reported by the DEBUG classification dump
+DIAGNOSTIC_AESTHETICS = ("mob_wife", "dark_academia", "light_academia", "maximalist", "gorpcore")
+
 
 class MoodboardService:
     """Service for orchestrating moodboard generation pipeline."""
@@ -30,10 +44,13 @@ class MoodboardService:
         # Pinterest client is now OAuth-based and initialized globally
         pass
     
-    async def queue_generation(self, job_id: UUID, image_content: bytes, pinterest_consent: bool = False) -> None:
+    async def queue_generation(self, job_id: UUID, image_content: bytes, pinterest_consent: bool = False,
+                               image_hash: Optional[str] = None) -> None:
         """Queue moodboard generation job."""
+        image_hash = image_hash or hashlib.sha256(image_content).hexdigest()
         # For now, process immediately (add proper queue later)
-        task = asyncio.create_task(self._process_moodboard(job_id, image_content, pinterest_consent))
+        task = asyncio.create_task(self._run_single_flight(job_id, image_content, image_hash, pinterest_consent))
+        job_service.attach_task(job_id, task)
         # Ensure exceptions are logged instead of silently swallowed
         task.add_done_callback(self._task_done_callback)
 
@@ -42,43 +59,115 @@ class MoodboardService:
         try:
             exc = task.exception()
             if exc:
-                logger.error(f"Background moodboard task failed: {type(exc).__name__}: {exc}")
+                logger.error("Background moodboard task failed: %s: %s", type(exc).__name__, exc)
         except asyncio.CancelledError:
             pass
     
-    async def _process_moodboard(self, job_id: UUID, image_content: bytes, pinterest_consent: bool = False) -> None:
+    async def _run_single_flight(self, job_id: UUID, image_content: bytes, image_hash: str,
+                                 pinterest_consent: bool = False) -> None:
+        """Run the pipeline once per image across workers; followers reuse the leader's result."""
+        # The task runs in its own context copy, so these bind only this job's logs and calls
+        bind_job_id(job_id)
+        job = await job_service.get_job_status(job_id)
+        if job:
+            bind_token(job.cancel_token)
+        lock_name = f"moodboard:{settings.pipeline_version}:{image_hash}"
+        owner = str(job_id)
+
+        while not await cache_service.acquire_lock(lock_name, owner, settings.moodboard_lock_ttl):
+            logger.info("Job %s waiting on in-flight generation for image %s", job_id, image_hash[:12])
+            await job_service.update_job_status(job_id, JobStatus.PROCESSING, progress=0)
+            if await self._await_coalesced_result(job_id, lock_name, image_hash):
+                return
+            # No result yet: take over if the lock is free, otherwise another follower
+            # got there first (or the leader is still at it) - keep waiting for its result
+            logger.warning("No coalesced result for %s yet, job %s tries to take over", image_hash[:12], job_id)
+
+        # Keep the lock while the pipeline runs, however long that is (up to the job deadline)
+        heartbeat = asyncio.create_task(self._hold_lock(lock_name, owner))
+        try:
+            await self._process_moodboard(job_id, image_content, pinterest_consent, image_hash=image_hash)
+        finally:
+            heartbeat.cancel()
+            await cache_service.release_lock(lock_name, owner)
+
+    async def _hold_lock(self, lock_name: str, owner: str) -> None:
+        """Extend the single-flight lock every third of its TTL until cancelled."""
+        ttl = settings.moodboard_lock_ttl
+        while True:
+            await asyncio.sleep(ttl / 3)
+            if not await cache_service.extend_lock(lock_name, owner, ttl):
+                logger.warning("Lost single-flight lock %s; another worker may generate the same image", lock_name)
+                return
+
+    async def _await_coalesced_result(self, job_id: UUID, lock_name: str, image_hash: str) -> bool:
+        """Poll the moodboard cache until the lock holder publishes a result."""
+        loop = asyncio.get_running_loop()
+        give_up_at = loop.time() + settings.moodboard_coalesce_timeout
+
+        while loop.time() < give_up_at:
+            check_cancelled()
+            cached = await cache_service.get_moodboard_cache(image_hash)
+            if cached:
+                await job_service.store_cached_result(job_id, MoodboardResult(**cached))
+                logger.info("Job %s coalesced onto cached moodboard for %s", job_id, image_hash[:12])
+                return True
+            if not await cache_service.is_locked(lock_name):
+                # Lock released; re-check once in case the result landed just before release
+                cached = await cache_service.get_moodboard_cache(image_hash)
+                if cached:
+                    await job_service.store_cached_result(job_id, MoodboardResult(**cached))
+                    return True
+                return False
+            await asyncio.sleep(0.5)
+
+        return False
+
+    async def _process_moodboard(self, job_id: UUID, image_content: bytes, pinterest_consent: bool = False,
+                                 image_hash: Optional[str] = None) -> None:
         """Process moodboard generation pipeline."""
-        print(f"[PIPELINE] Starting moodboard pipeline for job {job_id}", flush=True)
+        logger.debug("Starting moodboard pipeline for job %s", job_id)
+        trace = PipelineTrace()
         try:
             await job_service.update_job_status(job_id, JobStatus.PROCESSING, progress=0)
 
             # Step 1: Classification
-            print(f"[PIPELINE] Step 1: Classifying aesthetics...", flush=True)
-            logger.info(f"Starting aesthetic classification for job {job_id}")
-            top_aesthetics = await self._classify_aesthetics(image_content)
-            print(f"[PIPELINE] Classification done: {[a.name for a in top_aesthetics]}", flush=True)
+            logger.info("Starting aesthetic classification for job %s", job_id)
+            top_aesthetics = await trace.timed("classify", self._classify_aesthetics(image_content))
+            logger.debug("Classification done: %s", [a.name for a in top_aesthetics])
             await job_service.update_job_status(job_id, JobStatus.PROCESSING, progress=25)
+            await cache_warmer.record_aesthetics(a.name for a in top_aesthetics)
             
+            check_cancelled()
+
             # Step 2: Keyword expansion with intelligent filtering
-            logger.info(f"Expanding keywords for job {job_id}")
-            search_keywords, negative_keywords = await self._expand_keywords(top_aesthetics)
-            logger.info(f"Generated {len(search_keywords)} search keywords, avoiding {len(negative_keywords)} negative terms")
+            logger.info("Expanding keywords for job %s", job_id)
+            search_keywords, negative_keywords = await trace.timed("keywords", self._expand_keywords(top_aesthetics))
+            logger.info("Generated %s search keywords, avoiding %s negative terms", len(search_keywords), len(negative_keywords))
             await job_service.update_job_status(job_id, JobStatus.PROCESSING, progress=50)
             
-            # Step 3: Fetch candidates (placeholder)
-            logger.info(f"Fetching image candidates for job {job_id}")
-            candidates = await self._fetch_candidates(search_keywords, pinterest_consent)
+            check_cancelled()
+
+            # Step 3: Fetch candidates
+            logger.info("Fetching image candidates for job %s", job_id)
+            fetched_pages: List[FetchedPage] = []
+            candidates = await trace.timed("fetch", self._fetch_candidates(search_keywords, pinterest_consent, trace=trace,
+                                                                           pages=fetched_pages))
             await job_service.update_job_status(job_id, JobStatus.PROCESSING, progress=75)
             
-            # Step 4: Re-rank and select (placeholder)
-            logger.info(f"Re-ranking candidates for job {job_id}")
-            final_images = await self._rerank_candidates(image_content, candidates)
+            check_cancelled()
+
+            # Step 4: Re-rank and select
+            logger.info("Re-ranking candidates for job %s", job_id)
+            final_images = await trace.timed("rerank", self._rerank_candidates(image_content, candidates, trace=trace))
             await job_service.update_job_status(job_id, JobStatus.PROCESSING, progress=100)
             
+            check_cancelled()
+
             # Store result
-            logger.info(f"📦 Storing moodboard result for job {job_id}")
-            logger.info(f"   Top aesthetics: {[a.name for a in top_aesthetics]}")
-            logger.info(f"   Final images count: {len(final_images)}")
+            logger.info("📦 Storing moodboard result for job %s", job_id)
+            logger.info("   Top aesthetics: %s", [a.name for a in top_aesthetics])
+            logger.info("   Final images count: %s", len(final_images))
             
             result = MoodboardResult(
                 job_id=job_id,
@@ -86,32 +175,49 @@ class MoodboardService:
                 top_aesthetics=top_aesthetics,
                 images=final_images,
                 created_at=datetime.now(),
-                processing_time=5.0  # placeholder
+                processing_time=round(trace.elapsed, 3),
+                search_keywords=list(dict.fromkeys(page[1] for page in fetched_pages)),
+                search_providers=sorted({page[0] for page in fetched_pages})
             )
             
             await job_service.store_job_result(job_id, result)
-            logger.info(f"✅ Completed moodboard generation for job {job_id} with {len(final_images)} images")
+            download_tracker.enqueue_in_background(final_images)  # Unsplash "photo used" events, sent in the background
+            # Keep everything the fetch stage saw (and the providers' next-page cursors) for "load more"
+            if top_aesthetics:
+                candidate_pool.seed_in_background(top_aesthetics[0].name, fetched_pages)
+            logger.info("✅ Completed moodboard generation for job %s with %s images in %.2fs", job_id, len(final_images), trace.elapsed)
+
+            # Only cache real results; empty or local-folder fallbacks should be retried next time
+            if image_hash and final_images and all(img.source_api != "local" for img in final_images):
+                await cache_service.set_moodboard_cache(image_hash, result.model_dump(mode="json", exclude_none=True))
             
             if len(final_images) == 0:
-                logger.error(f"❌ WARNING: Moodboard result has 0 images! This will only show the uploaded image.")
+                logger.error("❌ WARNING: Moodboard result has 0 images! This will only show the uploaded image.")
             
+        except asyncio.CancelledError as e:
+            # DELETE, the reaper (abandoned / past deadline) or a checkpoint; cancel_job is a no-op if already done
+            await job_service.cancel_job(job_id, str(e) or "cancelled")
+            raise
         except Exception as e:
-            logger.error(f"Error processing moodboard for job {job_id}: {str(e)}")
+            logger.error("Error processing moodboard for job %s: %s", job_id, e)
             await job_service.update_job_status(
                 job_id, 
                 JobStatus.FAILED, 
                 error_message=str(e)
             )
+        finally:
+            trace_service.observe("total", trace.elapsed)
+            await job_service.store_stage_timings(job_id, trace.breakdown())
     
     async def _classify_aesthetics(self, image_content: bytes) -> List[AestheticScore]:
         """Classify image aesthetics using CLIP with confidence threshold."""
-        print(f"[CLASSIFY] Starting classification, image size: {len(image_content)} bytes", flush=True)
+        logger.debug("Starting classification, image size: %s bytes", len(image_content))
         try:
             # Lazy import aesthetic_service to avoid hard dependency at module load
             try:
                 from services.aesthetic_service import aesthetic_service
             except Exception as e:
-                print(f"[CLASSIFY] FALLBACK: aesthetic_service unavailable: {e}", flush=True)
+                logger.warning("Classification fallback: aesthetic_service unavailable: %s", e)
                 return [
                     AestheticScore(
                         name="minimalist",
@@ -122,13 +228,13 @@ class MoodboardService:
 
             # Get aesthetic vocabulary
             vocabulary = await aesthetic_service.get_vocabulary()
-            print(f"[CLASSIFY] Got {len(vocabulary)} aesthetics in vocabulary", flush=True)
+            logger.debug("Got %s aesthetics in vocabulary", len(vocabulary))
 
             # Lazy import CLIP service (heavy ML deps)
             try:
                 from services.clip_service import clip_service
             except Exception as e:
-                print(f"[CLASSIFY] FALLBACK: clip_service unavailable: {e}", flush=True)
+                logger.warning("Classification fallback: clip_service unavailable: %s", e)
                 return [
                     AestheticScore(
                         name="minimalist",
@@ -137,63 +243,30 @@ class MoodboardService:
                     )
                 ]
 
-            print(f"[CLASSIFY] clip_service loaded, model_loaded={clip_service._model_loaded}", flush=True)
+            logger.debug("clip_service loaded, model_loaded=%s", clip_service._model_loaded)
 
             # Use CLIP for zero-shot classification
             all_scores = await clip_service.classify_aesthetics(image_content, vocabulary)
-            print(f"[CLASSIFY] Got {len(all_scores)} scores, top 3: {[(s.name, f'{s.score:.3f}') for s in all_scores[:3]]}", flush=True)
             
             # Add descriptions from aesthetic service
             for score in all_scores:
                 description = await aesthetic_service.get_aesthetic_description(score.name)
                 score.description = description
             
-            # Log detailed classification results
-            logger.info("=== CLIP Classification Results ===")
-            for i, score in enumerate(all_scores[:20]):  # Show top 20 to catch more specific aesthetics
-                logger.info(f"#{i+1}: {score.name} = {score.score:.3f} ({score.score*100:.1f}%)")
-            
-            # Check specifically for mob_wife and dark_academia even if not in top 20
-            mob_wife_score = next((score for score in all_scores if score.name == "mob_wife"), None)
-            if mob_wife_score:
-                logger.info(f"🔍 MOB_WIFE FOUND: #{all_scores.index(mob_wife_score)+1} = {mob_wife_score.score:.3f} ({mob_wife_score.score*100:.1f}%)")
-            else:
-                logger.info("❌ MOB_WIFE NOT FOUND in classification results")
-            
-            dark_academia_score = next((score for score in all_scores if score.name == "dark_academia"), None)
-            if dark_academia_score:
-                logger.info(f"🔍 DARK_ACADEMIA FOUND: #{all_scores.index(dark_academia_score)+1} = {dark_academia_score.score:.3f} ({dark_academia_score.score*100:.1f}%)")
-            else:
-                logger.info("❌ DARK_ACADEMIA NOT FOUND in classification results")
-            
-            light_academia_score = next((score for score in all_scores if score.name == "light_academia"), None)
-            if light_academia_score:
-                logger.info(f"🔍 LIGHT_ACADEMIA FOUND: #{all_scores.index(light_academia_score)+1} = {light_academia_score.score:.3f} ({light_academia_score.score*100:.1f}%)")
-            else:
-                logger.info("❌ LIGHT_ACADEMIA NOT FOUND in classification results")
-            
-            maximalist_score = next((score for score in all_scores if score.name == "maximalist"), None)
-            if maximalist_score:
-                logger.info(f"🔍 MAXIMALIST FOUND: #{all_scores.index(maximalist_score)+1} = {maximalist_score.score:.3f} ({maximalist_score.score*100:.1f}%)")
-            else:
-                logger.info("❌ MAXIMALIST NOT FOUND in classification results")
-            
-            gorpcore_score = next((score for score in all_scores if score.name == "gorpcore"), None)
-            if gorpcore_score:
-                logger.info(f"🔍 GORPCORE FOUND: #{all_scores.index(gorpcore_score)+1} = {gorpcore_score.score:.3f} ({gorpcore_score.score*100:.1f}%)")
-            else:
-                logger.info("❌ GORPCORE NOT FOUND in classification results")
-            logger.info("===================================")
+            # Detailed score dumps are diagnostics only; production (INFO) pays nothing for them
+            if logger.isEnabledFor(logging.DEBUG):
+                self._log_classification_scores(all_scores)
 
             # Focus on the dominant (highest confidence) aesthetic
             dominant_aesthetic = all_scores[0]
-            logger.info(f"Selected dominant aesthetic: {dominant_aesthetic.name} ({dominant_aesthetic.score:.3f})")
+            logger.info("Selected dominant aesthetic: %s (%.3f)", dominant_aesthetic.name, dominant_aesthetic.score)
             
             # Apply intelligent threshold logic
             MINIMUM_CONFIDENCE_THRESHOLD = 0.01  # 1% - lowered to catch more specific aesthetics like mob_wife
-            logger.info(f"🏆 HIGHEST CONFIDENCE AESTHETIC: {dominant_aesthetic.name} at {dominant_aesthetic.score:.3f} ({dominant_aesthetic.score*100:.1f}%)")
+            logger.info("🏆 HIGHEST CONFIDENCE AESTHETIC: %s at %.3f (%.1f%%)", dominant_aesthetic.name, dominant_aesthetic.score, dominant_aesthetic.score * 100)
             
             # ⚡ SYSTEMATIC CONFIDENCE-BASED BOOST LOGIC
+            # Bump settings.boost_rules_version when changing these rules (cache keys depend on it)
             # Define aesthetic categories for targeted boosting
             lifestyle_aesthetics = {"cottagecore", "fairycore", "goblincore", "clean_girl", "soft_girl", "coquette", "vintage", "retro", "coastal_grandmother", "gorpcore"}
             preppy_aesthetics = {"preppy", "old_money", "quiet_luxury", "the_row"}
@@ -222,7 +295,7 @@ class MoodboardService:
                     return 15.0
             
             # Apply systematic boosts to ALL aesthetics (not just top 20)
-            logger.info(f"🔍 Checking {len(all_scores)} aesthetics for boosts...")
+            logger.info("🔍 Checking %s aesthetics for boosts...", len(all_scores))
             for aesthetic in all_scores:
                 boost_multiplier = 1.0
                 category = "general"
@@ -234,7 +307,7 @@ class MoodboardService:
                     boost_multiplier = base_boost * 3.0  # Extra 200% boost for lifestyle
                     category = "lifestyle"
                     if aesthetic.name == "gorpcore":
-                        logger.info(f"🎯 GORPCORE BOOST CALCULATION: {aesthetic.score:.3f} × {boost_multiplier:.1f} = {aesthetic.score * boost_multiplier:.3f}")
+                        logger.info("🎯 GORPCORE BOOST CALCULATION: %.3f × %.1f = %.3f", aesthetic.score, boost_multiplier, aesthetic.score * boost_multiplier)
                 elif aesthetic.name in preppy_aesthetics:
                     boost_multiplier = calculate_boost(aesthetic.score, "preppy")
                     category = "preppy"
@@ -250,11 +323,11 @@ class MoodboardService:
                     if aesthetic.score >= 0.08:  # Require minimum 8% confidence for bridal
                         boost_multiplier = calculate_boost(aesthetic.score, "bridal")
                         category = "bridal"
-                        logger.info(f"💍 BRIDAL BOOST: {aesthetic.name} ({aesthetic.score:.3f}) meets threshold")
+                        logger.info("💍 BRIDAL BOOST: %s (%.3f) meets threshold", aesthetic.name, aesthetic.score)
                     else:
                         # Skip bridal boost if confidence is too low
                         boost_multiplier = 1.0
-                        logger.info(f"🚫 BRIDAL REJECTED: {aesthetic.name} ({aesthetic.score:.3f}) below 8% threshold")
+                        logger.info("🚫 BRIDAL REJECTED: %s (%.3f) below 8%% threshold", aesthetic.name, aesthetic.score)
                 elif aesthetic.name == "maximalist":
                     boost_multiplier = calculate_boost(aesthetic.score, "maximalist")
                     category = "maximalist"
@@ -264,17 +337,17 @@ class MoodboardService:
                     if await self._validate_gorpcore_context(image_content, aesthetic.name):
                         boost_multiplier = 3.0  # Reduced from 50x to 3x boost
                         category = "gorpcore"
-                        logger.info(f"🏔️ GORPCORE VALIDATED: {aesthetic.name} context confirmed, applying 3x boost")
+                        logger.info("🏔️ GORPCORE VALIDATED: %s context confirmed, applying 3x boost", aesthetic.name)
                     else:
                         # Skip gorpcore boost if context doesn't match
                         boost_multiplier = 1.0
-                        logger.info(f"🚫 GORPCORE REJECTED: {aesthetic.name} context doesn't match outdoor/hiking elements")
+                        logger.info("🚫 GORPCORE REJECTED: %s context doesn't match outdoor/hiking elements", aesthetic.name)
                 
                 # Apply boost if it improves the score
                 if boost_multiplier > 1.0:
                     boosted = aesthetic.score * boost_multiplier
                     if boosted > best_score:
-                        logger.info(f"⚡ {category.upper()}: {aesthetic.name} ({aesthetic.score:.3f} × {boost_multiplier} = {boosted:.3f})")
+                        logger.info("⚡ %s: %s (%.3f × %s = %.3f)", category.upper(), aesthetic.name, aesthetic.score, boost_multiplier, boosted)
                         best_aesthetic, best_score = aesthetic, boosted
             
             # All aesthetics are now checked above, no need for special checks
@@ -289,12 +362,12 @@ class MoodboardService:
             # Use boosted score for threshold check, not original score
             effective_score = best_score  # This is the boosted score
             if effective_score < MINIMUM_CONFIDENCE_THRESHOLD:
-                logger.warning(f"❌ REJECTED: '{dominant_aesthetic.name}' effective confidence ({effective_score:.3f}) below threshold ({MINIMUM_CONFIDENCE_THRESHOLD})")
+                logger.warning("❌ REJECTED: '%s' effective confidence (%.3f) below threshold (%s)", dominant_aesthetic.name, effective_score, MINIMUM_CONFIDENCE_THRESHOLD)
                 logger.info("Falling back to generic 'minimalist' aesthetic for broad inspiration")
                 fallback_aesthetic = AestheticScore(name="minimalist", score=0.65, description="Clean, versatile style that works with many pieces")
                 return [fallback_aesthetic]
             
-            logger.info(f"✅ ACCEPTED: '{dominant_aesthetic.name}' effective confidence ({effective_score:.3f}) meets threshold ({MINIMUM_CONFIDENCE_THRESHOLD})")
+            logger.info("✅ ACCEPTED: '%s' effective confidence (%.3f) meets threshold (%s)", dominant_aesthetic.name, effective_score, MINIMUM_CONFIDENCE_THRESHOLD)
             
             # POST-PROCESSING FILTER: Fix common misclassifications AFTER boosts
             all_scores = await self._apply_classification_filters(image_content, all_scores)
@@ -307,12 +380,12 @@ class MoodboardService:
             for aesthetic in all_scores[1:3]:  # Check next 2 aesthetics
                 if aesthetic.score >= 0.35:  # Lower threshold for supporting aesthetics
                     result_aesthetics.append(aesthetic)
-                    logger.info(f"➕ SUPPORTING: '{aesthetic.name}' at {aesthetic.score:.3f}")
+                    logger.info("➕ SUPPORTING: '%s' at %.3f", aesthetic.name, aesthetic.score)
             
             return result_aesthetics
             
         except Exception as e:
-            logger.error(f"Error in aesthetic classification: {str(e)}")
+            logger.error("Error in aesthetic classification: %s", e)
             # Fallback to mock data if CLIP fails
             return [
                 AestheticScore(
@@ -322,6 +395,23 @@ class MoodboardService:
                 )
             ]
     
+    def _log_classification_scores(self, all_scores: List[AestheticScore]) -> None:
+        """Dump the top 20 scores plus the rank of aesthetics that are easy to miss."""
+        logger.debug("=== CLIP Classification Results ===")
+        for i, score in enumerate(all_scores[:20]):  # Show top 20 to catch more specific aesthetics
+            logger.debug("#%s: %s = %.3f (%.1f%%)", i + 1, score.name, score.score, score.score * 100)
+
+        # Check specific aesthetics even if not in top 20 (one pass instead of a scan per name)
+        ranks = {score.name: (rank, score) for rank, score in enumerate(all_scores, start=1)
+                 if score.name in DIAGNOSTIC_AESTHETICS}
+        for name in DIAGNOSTIC_AESTHETICS:
+            if name in ranks:
+                rank, score = ranks[name]
+                logger.debug("🔍 %s FOUND: #%s = %.3f (%.1f%%)", name.upper(), rank, score.score, score.score * 100)
+            else:
+                logger.debug("❌ %s NOT FOUND in classification results", name.upper())
+        logger.debug("===================================")
+
     async def _expand_keywords(self, aesthetics: List[AestheticScore]) -> tuple[List[str], List[str]]:
         """Expand aesthetics to search keywords with intelligent filtering."""
         keywords = []
@@ -333,7 +423,7 @@ class MoodboardService:
             from services.aesthetic_service import aesthetic_service
         except Exception as e:
             aesthetic_service_available = False
-            logger.warning(f"Aesthetic service unavailable during keyword expansion, using fallback keywords: {e}")
+            logger.warning("Aesthetic service unavailable during keyword expansion, using fallback keywords: %s", e)
 
         for aesthetic in aesthetics:
             if aesthetic_service_available:
@@ -349,9 +439,9 @@ class MoodboardService:
                     # Get color palette for intelligent filtering
                     color_palette = await aesthetic_service.get_color_palette_for_aesthetic(aesthetic.name)
                     if color_palette:
-                        logger.info(f"Using color palette for {aesthetic.name}: {color_palette}")
+                        logger.info("Using color palette for %s: %s", aesthetic.name, color_palette)
                 except Exception as ex:
-                    logger.warning(f"Error using aesthetic service for '{aesthetic.name}', falling back: {ex}")
+                    logger.warning("Error using aesthetic service for '%s', falling back: %s", aesthetic.name, ex)
                     # Fallback generic keywords for the aesthetic name
                     name = aesthetic.name.replace('_', ' ')
                     keywords.extend([f"{name} outfit", f"{name} fashion", f"{name} style"])
@@ -372,132 +462,157 @@ class MoodboardService:
 
         return unique_keywords, list(negative_keywords)
     
-    async def _fetch_candidates(self, keywords: List[str], pinterest_consent: bool = False) -> List[ImageCandidate]:
-        """Fetch image candidates from APIs - optimized for speed."""
-        all_candidates = []
-        
+    def _keyword_plan(self, keywords: List[str]) -> Tuple[List[str], int]:
+        """Keywords actually searched and images requested per keyword and provider."""
         # ⚡ SPEED OPTIMIZATION: Fewer keywords, fewer images, faster timeout
         top_keywords = keywords[:3]  # Reduced to 3 keywords for speed
         images_per_keyword = max(2, settings.max_candidates // len(top_keywords)) if top_keywords else 4
+        return top_keywords, images_per_keyword
+
+    async def _request_sizes(self, providers: List[ImageProvider], images_per_keyword: int) -> Dict[str, int]:
+        """Images to request per keyword from each provider (the ``n`` of its API cache keys).
+
+        Providers out of rate budget answer from cache only and keep the plain size;
+        the others pick up their share. The cache warmer uses the same sizes so the
+        entries it warms are the ones jobs look up.
+        """
+        budgets = {provider.name: await rate_limiter.has_budget(provider.name) for provider in providers}
+        funded = [provider for provider in providers if budgets[provider.name]]
+        funded_per_keyword = images_per_keyword
+        if funded and len(funded) < len(providers):
+            funded_per_keyword = -(-images_per_keyword * len(providers) // len(funded))
+            logger.warning("⏳ Rate budget exhausted for %s; asking %s for %s images per keyword instead",
+                           [p.name for p in providers if not budgets[p.name]], [p.name for p in funded], funded_per_keyword)
+        return {provider.name: funded_per_keyword if budgets[provider.name] else images_per_keyword
+                for provider in providers}
+
+    async def _active_providers(self) -> List[ImageProvider]:
+        """Providers to query: Unsplash, Pexels and Pinterest (when an account is connected)."""
+        providers = []
+        if settings.unsplash_access_key:
+            providers.append(unsplash_client)
+        else:
+            logger.warning("⚠️ Unsplash API key not configured, skipping Unsplash")
+        if settings.pexels_api_key and getattr(settings, 'enable_pexels', True):
+            providers.append(pexels_client)
+        else:
+            logger.warning("⚠️ Pexels disabled or API key not configured, skipping Pexels")
+        try:
+            if await pinterest_client.is_authenticated():
+                providers.append(pinterest_client)
+        except Exception as e:
+            logger.warning("   ⚠️ Pinterest API error: %s", e)
+        return providers
+
+    async def _fetch_candidates(self, keywords: List[str], pinterest_consent: bool = False,
+                                trace: Optional[PipelineTrace] = None,
+                                pages: Optional[List[FetchedPage]] = None) -> List[ImageCandidate]:
+        """Fetch image candidates from APIs - optimized for speed.
+
+        Every completed provider call is also appended to ``pages`` when given.
+        """
+        trace = trace or PipelineTrace()
         
-        logger.info(f"🔍 Fetching images for keywords: {top_keywords}")
-        logger.info(f"   Images per keyword: {images_per_keyword}")
-        logger.info(f"   Unsplash API key configured: {bool(settings.unsplash_access_key)}")
-        logger.info(f"   Pexels API key configured: {bool(settings.pexels_api_key)}; enabled: {getattr(settings, 'enable_pexels', True)}")
-        logger.info(f"   Pinterest consent: {pinterest_consent}")
+        top_keywords, images_per_keyword = self._keyword_plan(keywords)
         
-        # ⚡ Use multiple APIs with fallback: Unsplash → Pexels → Pinterest
-        all_tasks = []
-        for keyword in top_keywords:
-            tasks = []
-            
-            # Always try Unsplash first
-            if settings.unsplash_access_key:
-                tasks.append(unsplash_client.search_photos(keyword, per_page=images_per_keyword))
-            else:
-                logger.warning(f"⚠️ Unsplash API key not configured, skipping Unsplash for '{keyword}'")
-            
-            # Try Pexels as fallback
-            if settings.pexels_api_key and getattr(settings, 'enable_pexels', True):
-                tasks.append(pexels_client.search_photos(keyword, per_page=images_per_keyword))
-            else:
-                logger.warning(f"⚠️ Pexels disabled or API key not configured, skipping Pexels for '{keyword}'")
-            
-            # Add Pinterest if API key is configured (no OAuth required when using API key)
-            try:
-                if await pinterest_client.is_authenticated():
-                    logger.info(f"   📌 Including Pinterest for '{keyword}'")
-                    tasks.append(pinterest_client.search_and_extract_images(keyword, max_images=images_per_keyword))
-            except Exception as e:
-                logger.warning(f"   ⚠️ Pinterest API error for '{keyword}': {str(e)}")
-            
-            all_tasks.extend(tasks)
+        logger.info("🔍 Fetching images for keywords: %s", top_keywords)
+        logger.info("   Images per keyword: %s", images_per_keyword)
+        logger.info("   Unsplash API key configured: %s", bool(settings.unsplash_access_key))
+        logger.info("   Pexels API key configured: %s; enabled: %s", bool(settings.pexels_api_key), getattr(settings, 'enable_pexels', True))
+        logger.info("   Pinterest consent: %s", pinterest_consent)
+        
+        providers = await self._active_providers()
+        pinterest_authenticated = pinterest_client in providers
+        
+        sizes = await self._request_sizes(providers, images_per_keyword)
+        calls = [(provider, keyword, sizes[provider.name]) for keyword in top_keywords for provider in providers]
         
-        # Execute all API calls concurrently with shorter timeout
-        pinterest_authenticated = await pinterest_client.is_authenticated()
-        api_count = sum([
-            bool(settings.unsplash_access_key),
-            bool(settings.pexels_api_key and getattr(settings, 'enable_pexels', True)),
-            bool(pinterest_authenticated)
-        ])
-        logger.info(f"⚡ SPEED MODE: Fetching from {api_count} API(s) for {len(top_keywords)} keywords ({len(all_tasks)} total requests)")
-        logger.info(f"   Pinterest authenticated: {pinterest_authenticated}, consent: {pinterest_consent}")
+        logger.info("⚡ SPEED MODE: Fetching from %s API(s) for %s keywords (%s total requests)", len(providers), len(top_keywords), len(calls))
+        logger.info("   Pinterest authenticated: %s, consent: %s", pinterest_authenticated, pinterest_consent)
         
-        if not all_tasks:
+        if not calls:
             logger.error("❌ No API keys configured! Falling back to local images in backend/images.")
             return await self._local_folder_candidates()
         
+        # Keep each provider call's results as it lands (each call has its own adaptive
+        # timeout and hedge); stop once every provider delivered its share of the mix
+        # _interleave takes, or the stage timeout passes. Calls still in flight are
+        # dropped from this job, but their provider requests finish and are cached.
+        from collections import Counter, defaultdict
+        seen_urls = set()
+        by_source = defaultdict(list)
+        quotas = self._fetch_quotas(providers)
+        found = Counter()
+        tasks = {
+            asyncio.create_task(trace.timed(f"fetch.{provider.name}", provider.hedged_search(keyword, n))): (provider.name, keyword, n)
+            for provider, keyword, n in calls
+        }
+        pending = set(tasks)
+
+        def enough() -> bool:
+            waiting = {tasks[task][0] for task in pending}
+            return all(found[name] >= quota or name not in waiting for name, quota in quotas.items())
+
+        fetch_timeout = call_timeout(settings.provider_search_timeout)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + fetch_timeout
+        successful_count = 0
+        failed_count = 0
         try:
-            # Use asyncio.wait_for with timeout for API responses
-            # Pinterest board search needs more time (list boards + get pins)
-            results = await asyncio.wait_for(
-                asyncio.gather(*all_tasks, return_exceptions=True),
-                timeout=15.0  # Allow time for Pinterest board search
-            )
-            
-            successful_count = 0
-            failed_count = 0
-            for i, result in enumerate(results):
-                if isinstance(result, list):  # Successful result
-                    all_candidates.extend(result)
+            while pending and not enough():
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    source, keyword, n = tasks[task]
+                    if task.cancelled():
+                        continue
+                    if task.exception() is not None:
+                        failed_count += 1
+                        logger.warning("❌ %s '%s' failed: %s: %s", source, keyword, type(task.exception()).__name__, task.exception())
+                        continue
+                    results = task.result()
                     successful_count += 1
-                    logger.info(f"✅ API call {i+1} succeeded: {len(result)} images")
-                elif isinstance(result, Exception):
-                    failed_count += 1
-                    logger.warning(f"❌ API call {i+1} failed: {type(result).__name__}: {result}")
-                else:
-                    failed_count += 1
-                    logger.warning(f"❌ API call {i+1} returned unexpected type: {type(result)}")
-            
-            logger.info(f"📊 API Results: {successful_count} succeeded, {failed_count} failed, {len(all_candidates)} total images fetched")
-                    
-        except asyncio.TimeoutError:
-            logger.warning("⚠️ API calls timed out after 15 seconds, using partial results")
+                    logger.info("✅ %s '%s': %s images", source, keyword, len(results))
+                    if pages is not None:
+                        pages.append((source, keyword, n, results))
+                    for candidate in results:
+                        if candidate.url not in seen_urls:
+                            seen_urls.add(candidate.url)
+                            by_source[candidate.source_api].append(candidate)
+                            found[source] += 1
+        finally:
+            for task in pending:
+                task.cancel()
+        check_cancelled()
         
-        # Deduplicate and interleave by source so Pinterest isn't crowded out by Unsplash/Pexels
-        from collections import defaultdict
-        seen_urls = set()
-        by_source = defaultdict(list)
-        for candidate in all_candidates:
-            if candidate.url not in seen_urls:
-                seen_urls.add(candidate.url)
-                by_source[candidate.source_api].append(candidate)
-
+        if pending:
+            logger.info("⏱️ Fetch stage done after %.2fs with %s unique candidates; %s call(s) left to finish and cache in the background",
+                        fetch_timeout - max(0.0, deadline - loop.time()), len(seen_urls), len(pending))
+        logger.info("📊 API Results: %s succeeded, %s failed, %s unique images fetched", successful_count, failed_count, len(seen_urls))
+        
+        # Interleave by source so Pinterest isn't crowded out by Unsplash/Pexels
         # Log source counts BEFORE round-robin
         source_counts_before = {src: len(imgs) for src, imgs in by_source.items()}
-        logger.info(f"📸 After deduplication by source: {source_counts_before}")
-
-        # Weighted round-robin: Pinterest 50%, Unsplash 25%, Pexels 25%
-        unique_candidates = []
-        pinterest_list = by_source.get('pinterest', [])
-        unsplash_list = by_source.get('unsplash', [])
-        pexels_list = by_source.get('pexels', [])
-
-        # Pattern: P, P, U, Px (repeat) to achieve 2:1:1 ratio
-        while len(unique_candidates) < settings.max_candidates:
-            added = False
-
-            # Add 2 Pinterest images
-            for _ in range(2):
-                if pinterest_list and len(unique_candidates) < settings.max_candidates:
-                    unique_candidates.append(pinterest_list.pop(0))
-                    added = True
-
-            # Add 1 Unsplash image
-            if unsplash_list and len(unique_candidates) < settings.max_candidates:
-                unique_candidates.append(unsplash_list.pop(0))
-                added = True
-
-            # Add 1 Pexels image
-            if pexels_list and len(unique_candidates) < settings.max_candidates:
-                unique_candidates.append(pexels_list.pop(0))
-                added = True
-
-            if not added:
-                break
+        logger.info("📸 After deduplication by source: %s", source_counts_before)
+
+        unique_candidates = self._interleave(by_source, settings.max_candidates)
+
+        # Drop near-duplicates (same photo from several providers or at several sizes) before
+        # they cost rerank downloads, and top up from what is left
+        if settings.near_duplicate_filter_enabled and unique_candidates:
+            with trace.span("fetch.dedupe"):
+                index = HashIndex(settings.near_duplicate_max_distance)
+                unique_candidates = await dedupe_service.drop_near_duplicates(unique_candidates, index)
+                for _ in range(2):
+                    extra = self._interleave(by_source, settings.max_candidates - len(unique_candidates))
+                    if not extra:
+                        break
+                    unique_candidates += await dedupe_service.drop_near_duplicates(extra, index)
 
         source_counts = {src: len(imgs) for src, imgs in by_source.items()}
-        logger.info(f"⚡ Fast fetch: {len(unique_candidates)} unique candidates (target: {settings.max_candidates}), remaining by source: {source_counts}")
+        logger.info("⚡ Fast fetch: %s unique candidates (target: %s), remaining by source: %s", len(unique_candidates), settings.max_candidates, source_counts)
 
         # Fallback: if no candidates found, try generic keywords via Unsplash only
         if not unique_candidates:
@@ -505,16 +620,16 @@ class MoodboardService:
             fallback_keywords = ["minimalist outfit", "vintage fashion", "cottagecore dress"]
             for kw in fallback_keywords:
                 try:
-                    res = await unsplash_client.search_photos(kw, per_page=4)
+                    res = await unsplash_client.search(kw, 4)
                     for candidate in res:
                         if candidate.url not in seen_urls:
                             seen_urls.add(candidate.url)
                             unique_candidates.append(candidate)
                             if len(unique_candidates) >= settings.max_candidates:
                                 break
-                    logger.info(f"  Fallback '{kw}': {len(res)} images; total unique now {len(unique_candidates)}")
+                    logger.info("  Fallback '%s': %s images; total unique now %s", kw, len(res), len(unique_candidates))
                 except Exception as ex:
-                    logger.warning(f"  Fallback Unsplash error for '{kw}': {ex}")
+                    logger.warning("  Fallback Unsplash error for '%s': %s", kw, ex)
 
         # Final fallback: local folder images served via /static
         if not unique_candidates:
@@ -533,7 +648,7 @@ class MoodboardService:
             backend_dir = Path(__file__).parent.parent
             images_dir = backend_dir / "images"
             if not images_dir.exists():
-                logger.error(f"Local images directory not found: {images_dir}")
+                logger.error("Local images directory not found: %s", images_dir)
                 return []
             exts = {".jpg", ".jpeg", ".png", ".webp", ".gif"}
             files = [p for p in images_dir.iterdir() if p.is_file() and p.suffix.lower() in exts]
@@ -550,31 +665,77 @@ class MoodboardService:
                     source_api="local",
                     source_url=url
                 ))
-            logger.info(f"Local folder candidates: {len(candidates)} images from {images_dir}")
+            logger.info("Local folder candidates: %s images from %s", len(candidates), images_dir)
             return candidates
         except Exception as e:
-            logger.error(f"Local folder candidates error: {e}")
+            logger.error("Local folder candidates error: %s", e)
             return []
     
+    @staticmethod
+    def _fetch_quotas(providers: List[ImageProvider]) -> Dict[str, int]:
+        """Unique candidates wanted from each provider before the fetch stage may stop early."""
+        weights = {provider.name: 2 if provider.name == "pinterest" else 1 for provider in providers}
+        total = sum(weights.values())
+        return {name: -(-settings.fetch_enough_candidates * weight // total) for name, weight in weights.items()}
+
+    @staticmethod
+    def _interleave(by_source: Dict[str, List[ImageCandidate]], count: int) -> List[ImageCandidate]:
+        """Take up to ``count`` candidates off the per-source lists in a 2:1:1 Pinterest/Unsplash/Pexels mix."""
+        # Weighted round-robin: Pinterest 50%, Unsplash 25%, Pexels 25%
+        unique_candidates = []
+        pinterest_list = by_source.get('pinterest', [])
+        unsplash_list = by_source.get('unsplash', [])
+        pexels_list = by_source.get('pexels', [])
+
+        # Pattern: P, P, U, Px (repeat) to achieve 2:1:1 ratio
+        while len(unique_candidates) < count:
+            added = False
+
+            # Add 2 Pinterest images
+            for _ in range(2):
+                if pinterest_list and len(unique_candidates) < count:
+                    unique_candidates.append(pinterest_list.pop(0))
+                    added = True
+
+            # Add 1 Unsplash image
+            if unsplash_list and len(unique_candidates) < count:
+                unique_candidates.append(unsplash_list.pop(0))
+                added = True
+
+            # Add 1 Pexels image
+            if pexels_list and len(unique_candidates) < count:
+                unique_candidates.append(pexels_list.pop(0))
+                added = True
+
+            if not added:
+                break
+
+        return unique_candidates
+
     async def _rerank_candidates(self, original_image: bytes,
-                                candidates: List[ImageCandidate]) -> List[ImageCandidate]:
+                                candidates: List[ImageCandidate],
+                                trace: Optional[PipelineTrace] = None) -> List[ImageCandidate]:
         """Re-rank candidates using SigLIP similarity to match the input image's vibe."""
+        trace = trace or PipelineTrace()
         if not candidates:
             logger.warning("No candidates to select from!")
             return []
 
         final_count = min(len(candidates), settings.final_moodboard_size)
-        logger.info(f"🔄 Re-ranking {len(candidates)} candidates using SigLIP similarity...")
+        logger.info("🔄 Re-ranking %s candidates using SigLIP similarity...", len(candidates))
 
         try:
+            # Lazy import CLIP service (heavy ML deps)
+            from services.clip_service import clip_service
+
             # Get embedding for the original image
-            original_embedding = await clip_service.get_image_embedding(original_image)
+            original_embedding = await trace.timed("rerank.embed_original", clip_service.get_image_embedding(original_image))
 
             # Get candidate URLs
             candidate_urls = [c.url for c in candidates]
 
             # Calculate similarity scores for all candidates
-            similarities = await clip_service.batch_similarity(original_embedding, candidate_urls)
+            similarities = await clip_service.batch_similarity(original_embedding, candidate_urls, trace=trace)
 
             # Pair candidates with their similarity scores
             scored_candidates = list(zip(candidates, similarities))
@@ -589,13 +750,13 @@ class MoodboardService:
             from collections import Counter
             final_sources = Counter(c.source_api for c in final_candidates)
             top_scores = [score for _, score in scored_candidates[:final_count]]
-            logger.info(f"🎯 Final {final_count} images by source: {dict(final_sources)}")
-            logger.info(f"📊 SigLIP similarity range: [{min(top_scores):.3f}, {max(top_scores):.3f}]")
+            logger.info("🎯 Final %s images by source: %s", final_count, dict(final_sources))
+            logger.info("📊 SigLIP similarity range: [%.3f, %.3f]", min(top_scores), max(top_scores))
 
             return final_candidates
 
         except Exception as e:
-            logger.error(f"Error in SigLIP re-ranking: {str(e)}, falling back to API order")
+            logger.error("Error in SigLIP re-ranking: %s, falling back to API order", e)
             # Fallback to API order if re-ranking fails
             return candidates[:final_count]
 
@@ -0,0 +1,218 @@
+"""Queries for users' saved moodboards.
+
+Listings are keyset-paginated, newest first, on (user_id, created_at, id), backed
+by the ix_moodboards_user_created_id index. A cursor is the (created_at, id) of the
+last row returned, so pages stay stable while moodboards are added or deleted.
+Listings select a summary projection (cover image and image count) instead of
+the images themselves.
+
+Images are normalized: each distinct image is one ``images`` row, keyed by
+(source, provider image id), and ``moodboard_images`` lists a moodboard's images
+by position. Only fields describing the image itself (IMAGE_FIELDS) are shared
+on the image row; the rest of what was saved, such as the similarity score
+against the board's upload, stays with the board on its ``moodboard_images`` row. Moodboards saved before this layout keep their inline JSON list
+(Moodboard.images) until scripts/migrate_moodboard_images.py moves it; every read
+here falls back to that list when a moodboard has no image rows.
+"""
+
+import base64
+import hashlib
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, delete, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import AsyncSessionLocal, Moodboard, MoodboardImage, SavedImage, dialect_insert
+
+MAX_PAGE_SIZE = 100
+
+# Saved image fields that describe the image itself, shared by every board that saves it
+IMAGE_FIELDS = {"source_api", "source", "thumbnail_url", "photographer", "source_url", "download_location",
+                "pinterest_url", "pinterest_board", "title", "description"}
+
+
+def encode_cursor(created_at: datetime, moodboard_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{moodboard_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inverse of encode_cursor(); raises ValueError for malformed cursors."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, moodboard_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(moodboard_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def _after(cursor: Optional[str]):
+    """Rows strictly after the cursor in (created_at DESC, id DESC) order."""
+    if not cursor:
+        return True
+    created_at, moodboard_id = decode_cursor(cursor)
+    return or_(
+        Moodboard.created_at < created_at,
+        and_(Moodboard.created_at == created_at, Moodboard.id < moodboard_id),
+    )
+
+
+def _image_key(item: Dict) -> Tuple[str, str]:
+    """(source, provider image id) identifying a saved image."""
+    source = str(item.get("source_api") or item.get("source") or "unknown")
+    if item.get("id"):
+        return source, str(item["id"])
+    return source, "url:" + hashlib.sha256(str(item.get("url", "")).encode()).hexdigest()
+
+
+def _image_dict(image: SavedImage, board_details: Optional[Dict] = None) -> Dict:
+    """A saved image in the shape it was saved in (with a board's own fields when given)."""
+    item = {"url": image.url, **(image.details or {}), **(board_details or {})}
+    if not image.provider_image_id.startswith("url:"):
+        item["id"] = image.provider_image_id
+    return item
+
+
+async def save_images(db: AsyncSession, moodboard_id: int, items: List[Dict]) -> None:
+    """Store a moodboard's images in order, reusing existing image records (caller commits)."""
+    keyed = [(_image_key(item), item) for item in items]
+    unique = {key: item for key, item in keyed}
+    if unique:
+        await db.execute(
+            dialect_insert(db)(SavedImage)
+            .values([
+                {"source": source, "provider_image_id": provider_id, "url": item.get("url", ""),
+                 "details": {k: v for k, v in item.items() if k in IMAGE_FIELDS},
+                 "created_at": datetime.utcnow()}
+                for (source, provider_id), item in unique.items()
+            ])
+            .on_conflict_do_nothing(index_elements=["source", "provider_image_id"])
+        )
+        rows = await db.execute(
+            select(SavedImage.id, SavedImage.source, SavedImage.provider_image_id)
+            .where(SavedImage.provider_image_id.in_(sorted({provider_id for _, provider_id in unique})))
+        )
+        ids = {(source, provider_id): image_id for image_id, source, provider_id in rows}
+        db.add_all(
+            MoodboardImage(moodboard_id=moodboard_id, position=position, image_id=ids[key],
+                           details={k: v for k, v in item.items() if k not in IMAGE_FIELDS | {"url", "id"}} or None)
+            for position, (key, item) in enumerate(keyed)
+        )
+    await db.flush()
+
+
+async def delete_images(db: AsyncSession, moodboard_ids) -> None:
+    """Remove moodboards' image positions (image records stay; other boards may use them)."""
+    await db.execute(delete(MoodboardImage).where(MoodboardImage.moodboard_id.in_(moodboard_ids)))
+
+
+async def images_for(db: AsyncSession, moodboards: Iterable[Moodboard]) -> Dict[int, List[Dict]]:
+    """Images of several moodboards in one query, by moodboard id (legacy lists as fallback)."""
+    moodboards = list(moodboards)
+    rows = await db.execute(
+        select(MoodboardImage.moodboard_id, MoodboardImage.details, SavedImage)
+        .join(SavedImage, SavedImage.id == MoodboardImage.image_id)
+        .where(MoodboardImage.moodboard_id.in_([mb.id for mb in moodboards]))
+        .order_by(MoodboardImage.moodboard_id, MoodboardImage.position)
+    )
+    images: Dict[int, List[Dict]] = {}
+    for moodboard_id, board_details, image in rows:
+        images.setdefault(moodboard_id, []).append(_image_dict(image, board_details))
+    return {mb.id: images.get(mb.id) or list(mb.images or []) for mb in moodboards}
+
+
+def _summary_columns():
+    def cover(column):
+        return (
+            select(column)
+            .join(MoodboardImage, MoodboardImage.image_id == SavedImage.id)
+            .where(MoodboardImage.moodboard_id == Moodboard.id, MoodboardImage.position == 0)
+            .scalar_subquery()
+        )
+
+    legacy_cover = Moodboard.images[0]
+    image_rows = (
+        select(func.count()).select_from(MoodboardImage)
+        .where(MoodboardImage.moodboard_id == Moodboard.id)
+        .scalar_subquery()
+    )
+    return (
+        Moodboard.id,
+        Moodboard.title,
+        Moodboard.description,
+        Moodboard.aesthetic,
+        Moodboard.created_at,
+        Moodboard.updated_at,
+        func.coalesce(cover(SavedImage.url), legacy_cover["url"].as_string()).label("cover_image_url"),
+        func.coalesce(
+            cover(SavedImage.source), legacy_cover["source_api"].as_string(), legacy_cover["source"].as_string()
+        ).label("cover_source"),
+        func.coalesce(
+            cover(func.coalesce(SavedImage.details["pinterest_url"].as_string(),
+                                SavedImage.details["source_url"].as_string())),
+            legacy_cover["pinterest_url"].as_string(), legacy_cover["source_url"].as_string()
+        ).label("cover_link_url"),
+        func.coalesce(func.nullif(image_rows, 0), func.json_array_length(Moodboard.images), 0).label("image_count"),
+    )
+
+
+async def list_summaries(db: AsyncSession, user_id: int, cursor: Optional[str],
+                         limit: int) -> Tuple[List[dict], Optional[str]]:
+    """One page of a user's moodboard summaries and the cursor of the next page (None at the end)."""
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    rows = (await db.execute(
+        select(*_summary_columns())
+        .where(Moodboard.user_id == user_id, _after(cursor))
+        .order_by(Moodboard.created_at.desc(), Moodboard.id.desc())
+        .limit(limit + 1)
+    )).mappings().all()
+
+    items = [dict(row) for row in rows[:limit]]
+    next_cursor = encode_cursor(items[-1]["created_at"], items[-1]["id"]) if len(rows) > limit else None
+    return items, next_cursor
+
+
+async def count_moodboards(db: AsyncSession, user_id: int) -> int:
+    return await db.scalar(select(func.count()).select_from(Moodboard).where(Moodboard.user_id == user_id))
+
+
+async def iter_moodboards(user_id: int, batch_size: int = 100) -> AsyncIterator[Tuple[Moodboard, List[Dict]]]:
+    """Every moodboard of a user with its images, loaded one keyset page at a time (streaming exports).
+
+    Uses its own session so it can outlive the request's dependencies.
+    """
+    cursor = None
+    async with AsyncSessionLocal() as db:
+        while True:
+            batch = (await db.scalars(
+                select(Moodboard)
+                .where(Moodboard.user_id == user_id, _after(cursor))
+                .order_by(Moodboard.created_at.desc(), Moodboard.id.desc())
+                .limit(batch_size)
+            )).all()
+            images = await images_for(db, batch) if batch else {}
+            for moodboard in batch:
+                yield moodboard, images[moodboard.id]
+            if len(batch) < batch_size:
+                return
+            cursor = encode_cursor(batch[-1].created_at, batch[-1].id)
+            db.expunge_all()  # Keep memory flat across pages
+
+
+async def most_saved_images(db: AsyncSession, limit: int = 20) -> List[Dict]:
+    """Images saved in the most moodboards (uploads excluded), from the moodboard_images index."""
+    saves = func.count(MoodboardImage.moodboard_id.distinct()).label("saves")  # A board may hold an image twice
+    top = (
+        select(MoodboardImage.image_id, saves)
+        .group_by(MoodboardImage.image_id)
+        .order_by(saves.desc())
+        .subquery()
+    )
+    rows = await db.execute(
+        select(SavedImage, top.c.saves)
+        .join(top, top.c.image_id == SavedImage.id)
+        .where(SavedImage.source != "original_upload")
+        .order_by(top.c.saves.desc(), SavedImage.id)
+        .limit(limit)
+    )
+    return [{**_image_dict(image), "source": image.source, "saves": count} for image, count in rows]
@@ -1,19 +1,46 @@
 """Pinterest API client for fetching pins and images."""
 
 import asyncio
-from typing import List, Dict, Any, Optional
+import hashlib
+import logging
+from typing import List, Dict, Any, Optional, Tuple
 from urllib.parse import urlencode
 
+from config import settings
+from services.cache_service import cache_service
+from services.cancellation import bind_token, call_timeout
+from services.image_provider import ImageProvider, ProviderPolicy
 from services.pinterest_oauth_service import pinterest_oauth
-from models import ImageCandidate
+from services.rate_limiter import RateLimitedError
+from models import ImageCandidate, from_cache
 
+logger = logging.getLogger(__name__)
 
-class PinterestAPIClient:
+
+class PinterestAPIClient(ImageProvider):
     """Client for Pinterest REST API v5."""
 
+    name = "pinterest"
+    policy = ProviderPolicy(timeout=8.0, max_concurrency=4)
+
     def __init__(self):
+        super().__init__()
         self.oauth_service = pinterest_oauth
 
+    async def _api_get(self, endpoint: str) -> Dict[str, Any]:
+        """Authenticated GET under the Pinterest concurrency and timeout policy."""
+        await self.spend_budget()
+        async with self.slot():
+            return await self.oauth_service.make_authenticated_request(
+                "GET", endpoint, timeout=call_timeout(self.policy.timeout)
+            )
+
+    async def is_available(self) -> bool:
+        return await self.is_authenticated()
+
+    async def _search_page(self, query: str, n: int, cursor: Optional[str]) -> Tuple[List[ImageCandidate], Optional[str]]:
+        return await self.search_and_extract_page(query, max_images=n, bookmark=cursor)
+
     async def search_pins(
         self,
         query: str,
@@ -36,12 +63,12 @@ class PinterestAPIClient:
 
         endpoint = f"/v5/search/partner/pins?{urlencode(params)}"
 
-        return await self.oauth_service.make_authenticated_request("GET", endpoint)
+        return await self._api_get(endpoint)
 
     async def get_pin_details(self, pin_id: str) -> Dict[str, Any]:
         """Get detailed information about a specific pin."""
         endpoint = f"/v5/pins/{pin_id}"
-        return await self.oauth_service.make_authenticated_request("GET", endpoint)
+        return await self._api_get(endpoint)
 
     async def get_user_pins(
         self,
@@ -58,7 +85,7 @@ class PinterestAPIClient:
         query_string = f"?{urlencode(params)}" if params else ""
         endpoint = f"/v5/users/{username}/pins{query_string}"
 
-        return await self.oauth_service.make_authenticated_request("GET", endpoint)
+        return await self._api_get(endpoint)
 
     async def get_boards(self, limit: int = 100, bookmark: Optional[str] = None) -> Dict[str, Any]:
         """Get user's Pinterest boards."""
@@ -69,7 +96,7 @@ class PinterestAPIClient:
 
         query_string = f"?{urlencode(params)}" if params else ""
         endpoint = f"/v5/boards{query_string}"
-        return await self.oauth_service.make_authenticated_request("GET", endpoint)
+        return await self._api_get(endpoint)
 
     async def get_board_pins(
         self,
@@ -85,124 +112,163 @@ class PinterestAPIClient:
 
         query_string = f"?{urlencode(params)}" if params else ""
         endpoint = f"/v5/boards/{board_id}/pins{query_string}"
-        return await self.oauth_service.make_authenticated_request("GET", endpoint)
+        return await self._api_get(endpoint)
+
+    def _account_key(self) -> str:
+        """Short id of the connected account, used to key its board cache."""
+        token = self.oauth_service.get_access_token() or ""
+        return hashlib.sha256(token.encode()).hexdigest()[:16]
+
+    async def list_boards(self) -> List[Dict[str, Any]]:
+        """The connected account's boards, following bookmarks; cached per account.
+
+        Each board keeps only what ranking needs (id, name, lower-cased name and
+        description, pin count). A fresh listing prefetches the pins of the largest
+        boards in the background, so the no-match fallback is served from cache.
+        """
+        account = self._account_key()
+        boards = await cache_service.get_pinterest_boards(account)
+        if boards is not None:
+            return boards
+
+        boards = []
+        bookmark = None
+        for _ in range(settings.pinterest_max_board_pages):
+            response = await self.get_boards(bookmark=bookmark)
+            for board in response.get("items", []):
+                boards.append({
+                    "id": board.get("id"),
+                    "name": board.get("name", "Unknown"),
+                    "text": f"{board.get('name', '')} {board.get('description', '')}".lower(),
+                    "pin_count": board.get("pin_count", 0),
+                })
+            bookmark = response.get("bookmark")
+            if not bookmark:
+                break
+
+        logger.info("Listed %s Pinterest boards", len(boards))
+        await cache_service.set_pinterest_boards(account, boards)
+        self._prefetch_board_pins(self._largest_boards(boards, settings.pinterest_prefetch_boards))
+        return boards
+
+    @staticmethod
+    def _largest_boards(boards: List[Dict[str, Any]], limit: int) -> List[Dict[str, Any]]:
+        return sorted(boards, key=lambda b: b.get("pin_count", 0), reverse=True)[:limit]
+
+    def rank_boards(self, boards: List[Dict[str, Any]], query: str) -> List[Tuple[int, Dict[str, Any]]]:
+        """(score, board) by number of query words in the board's name/description.
+
+        Falls back to the largest boards when nothing matches.
+        """
+        query_words = set(query.lower().split())
+        scored = [(sum(1 for word in query_words if word in board["text"]), board) for board in boards]
+        scored = [(score, board) for score, board in scored if score > 0]
+        if not scored:
+            logger.info("No keyword matches for '%s', using top boards by pin count", query)
+            return [(0, board) for board in self._largest_boards(boards, settings.pinterest_boards_per_search)]
+        scored.sort(reverse=True, key=lambda x: x[0])
+        return scored
+
+    async def board_candidates(self, board: Dict[str, Any]) -> List[ImageCandidate]:
+        """Image candidates from one board's first page of pins; cached per board."""
+        cached = await cache_service.get_pinterest_board_pins(board["id"])
+        if cached is not None:
+            return from_cache(ImageCandidate, cached)
+
+        pins_response = await self.get_board_pins(board["id"], limit=25)
+        pins = pins_response.get("items", [])
+        logger.info("Board '%s' returned %s pins", board["name"], len(pins))
+
+        candidates = []
+        for pin in pins:
+            media = pin.get("media", {})
+            images_data = media.get("images", pin.get("images", {}))
+            image_url = None
+
+            preferred_sizes = ["1200x", "600x", "400x300", "236x", "150x150", "original", "564x", "136x"]
+            for size in preferred_sizes:
+                if size in images_data:
+                    entry = images_data[size]
+                    if isinstance(entry, dict) and "url" in entry:
+                        image_url = entry["url"]
+                        break
+
+            if not image_url and images_data:
+                first = next(iter(images_data.values()), None)
+                if isinstance(first, dict):
+                    image_url = first.get("url")
+
+            if image_url:
+                candidates.append(ImageCandidate(
+                    id=pin.get("id", ""),
+                    url=image_url,
+                    photographer=pin.get("creator", {}).get("username", "Pinterest User"),
+                    source_api="pinterest",
+                    pinterest_url=pin.get("link", ""),
+                    pinterest_board=board["name"],
+                    title=pin.get("title", ""),
+                    description=pin.get("description", "")
+                ))
+
+        await cache_service.set_pinterest_board_pins(board["id"], [c.model_dump(exclude_none=True) for c in candidates])
+        return candidates
+
+    def _prefetch_board_pins(self, boards: List[Dict[str, Any]]) -> None:
+        """Warm the board-pins cache in the background (not bound to the current job)."""
+        if not boards:
+            return
+
+        async def prefetch():
+            bind_token(None)
+            results = await asyncio.gather(*(self.board_candidates(board) for board in boards), return_exceptions=True)
+            failed = sum(1 for result in results if isinstance(result, Exception))
+            logger.info("Prefetched pins for %s Pinterest boards (%s failed)", len(boards) - failed, failed)
+
+        task = asyncio.create_task(prefetch())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
 
     async def search_boards_for_pins(
         self,
         aesthetic_query: str,
         max_images: int = 20
     ) -> List[ImageCandidate]:
-        """Search user's boards for pins matching the aesthetic query."""
-        import logging
-        logger = logging.getLogger(__name__)
-
-        images = []
-        query_lower = aesthetic_query.lower()
-        query_words = set(query_lower.split())
+        """Search user's boards for pins matching the aesthetic query.
 
+        Pins of the top-ranked boards are fetched concurrently (bounded by the
+        Pinterest policy's concurrency slots and rate budget) and taken evenly
+        across boards for variety.
+        """
         try:
-            # Get user's boards
-            boards_response = await self.get_boards(limit=100)
-            logger.info(f"DEBUG: Boards API response keys: {list(boards_response.keys())}")
-            logger.info(f"DEBUG: Boards API response type: {type(boards_response)}")
-            if isinstance(boards_response, dict) and "items" in boards_response:
-                logger.info(f"DEBUG: Items count in response: {len(boards_response['items'])}")
-            else:
-                logger.warning(f"DEBUG: Full boards response: {boards_response}")
-            boards = boards_response.get("items", [])
-
-            logger.info(f"Found {len(boards)} Pinterest boards to search")
-
-            # Score boards by relevance to query
-            scored_boards = []
-            for board in boards:
-                board_name = board.get("name", "").lower()
-                board_desc = board.get("description", "").lower()
-                board_text = f"{board_name} {board_desc}"
-
-                # Simple keyword matching score
-                score = sum(1 for word in query_words if word in board_text)
-
-                if score > 0:
-                    scored_boards.append((score, board))
-
-            # If no keyword matches, fall back to top boards by pin count
-            if not scored_boards:
-                logger.info(f"No keyword matches for '{aesthetic_query}', using top boards by pin count")
-                # Sort boards by pin count and use top ones
-                boards_by_pins = sorted(boards, key=lambda b: b.get("pin_count", 0), reverse=True)
-                scored_boards = [(0, board) for board in boards_by_pins[:5]]  # Top 5 boards
-            else:
-                # Sort by relevance
-                scored_boards.sort(reverse=True, key=lambda x: x[0])
-
-            logger.info(f"Found {len(scored_boards)} relevant boards for '{aesthetic_query}'")
-
-            # Get pins from top matching boards (fetch from multiple boards for variety)
-            # Take 2-3 images per board to ensure diversity
-            images_per_board = max(2, max_images // len(scored_boards[:5]))
-            num_boards_to_fetch = min(5, len(scored_boards))
-
-            logger.info(f"Fetching {images_per_board} images from each of top {num_boards_to_fetch} boards")
-
-            for score, board in scored_boards[:num_boards_to_fetch]:
-                board_id = board.get("id")
-                board_name = board.get("name", "Unknown")
-
-                logger.info(f"Getting pins from board '{board_name}' (id: {board_id}, score: {score})")
-
-                try:
-                    pins_response = await self.get_board_pins(board_id, limit=25)
-                    pins = pins_response.get("items", [])
-                    logger.info(f"Board '{board_name}' returned {len(pins)} pins")
-                except Exception as e:
-                    logger.error(f"Failed to get pins from board '{board_name}': {str(e)}")
+            boards = await self.list_boards()
+            ranked = self.rank_boards(boards, aesthetic_query)[:settings.pinterest_boards_per_search]
+            if not ranked:
+                return []
+
+            images_per_board = max(2, max_images // len(ranked))
+            logger.info("Fetching %s images from each of top %s boards for '%s'",
+                        images_per_board, len(ranked), aesthetic_query)
+
+            results = await asyncio.gather(
+                *(self.board_candidates(board) for _, board in ranked), return_exceptions=True
+            )
+
+            images = []
+            for (score, board), result in zip(ranked, results):
+                if isinstance(result, asyncio.CancelledError):
+                    raise result
+                if isinstance(result, Exception):
+                    logger.error("Failed to get pins from board '%s': %s", board["name"], result)
                     continue
+                images.extend(result[:min(images_per_board, max_images - len(images))])
 
-                # Extract limited number of images from this board for variety
-                board_images_count = 0
-                for pin in pins:
-                    if board_images_count >= images_per_board:
-                        break
-                    if len(images) >= max_images:
-                        break
-
-                    media = pin.get("media", {})
-                    images_data = media.get("images", pin.get("images", {}))
-                    image_url = None
-
-                    preferred_sizes = ["1200x", "600x", "400x300", "236x", "150x150", "original", "564x", "136x"]
-                    for size in preferred_sizes:
-                        if size in images_data:
-                            entry = images_data[size]
-                            if isinstance(entry, dict) and "url" in entry:
-                                image_url = entry["url"]
-                                break
-
-                    if not image_url and images_data:
-                        first = next(iter(images_data.values()), None)
-                        if isinstance(first, dict):
-                            image_url = first.get("url")
-
-                    if image_url:
-                        candidate = ImageCandidate(
-                            id=pin.get("id", ""),
-                            url=image_url,
-                            photographer=pin.get("creator", {}).get("username", "Pinterest User"),
-                            source_api="pinterest",
-                            pinterest_url=pin.get("link", ""),
-                            pinterest_board=board_name,
-                            title=pin.get("title", ""),
-                            description=pin.get("description", "")
-                        )
-                        images.append(candidate)
-                        board_images_count += 1
-
-            logger.info(f"Board search extracted {len(images)} images for '{aesthetic_query}'")
+            logger.info("Board search extracted %s images for '%s'", len(images), aesthetic_query)
             return images
 
+        except RateLimitedError:
+            raise
         except Exception as e:
-            logger.error(f"Error searching boards for '{aesthetic_query}': {str(e)}", exc_info=True)
+            logger.error("Error searching boards for '%s': %s", aesthetic_query, e, exc_info=True)
             return []
 
     async def search_and_extract_images(
@@ -211,8 +277,21 @@ class PinterestAPIClient:
         max_images: int = 20
     ) -> List[ImageCandidate]:
         """Search Pinterest for images matching an aesthetic and extract image data."""
+        images, _ = await self.search_and_extract_page(aesthetic_query, max_images)
+        return images
+
+    async def search_and_extract_page(
+        self,
+        aesthetic_query: str,
+        max_images: int = 20,
+        bookmark: Optional[str] = None
+    ) -> Tuple[List[ImageCandidate], Optional[str]]:
+        """Like search_and_extract_images, starting at ``bookmark``; also returns the next bookmark.
+
+        The board-search fallback has no next page (None).
+        """
         images = []
-        bookmark = None
+        first_page = bookmark is None
         import logging
         logger = logging.getLogger(__name__)
 
@@ -237,11 +316,13 @@ class PinterestAPIClient:
                     if "message" in search_results:
                         logger.warning(f"Pinterest API message: {search_results.get('message')}")
 
+                if not pins and not first_page:
+                    return images, None  # Ran out of deeper results
+
                 if not pins:
                     # Public search returned 0 results - fall back to searching user's boards
                     logger.info(f"Public search returned 0 pins, falling back to board search for '{aesthetic_query}'")
-                    return await self.search_boards_for_pins(aesthetic_query, max_images)
-                    break
+                    return await self.search_boards_for_pins(aesthetic_query, max_images), None
 
                 # Extract image data from pins
                 for pin in pins:
@@ -284,31 +365,28 @@ class PinterestAPIClient:
                         )
                         images.append(candidate)
 
-                # Check for next page
+                # Next page; pacing is left to the rate budget spent per request
                 bookmark = search_results.get("bookmark")
                 if not bookmark:
                     break
 
-                # Small delay to be respectful to the API
-                await asyncio.sleep(0.1)
-
+            except RateLimitedError:
+                raise
             except Exception as e:
                 # Check if this is a Partner API access denied error
                 error_str = str(e)
                 if "pin_search" in error_str or "401" in error_str:
                     logger.warning(f"Partner API access denied, falling back to board search for '{aesthetic_query}'")
-                    return await self.search_boards_for_pins(aesthetic_query, max_images)
+                    return await self.search_boards_for_pins(aesthetic_query, max_images), None
 
                 logger.error(f"Error fetching Pinterest images for '{aesthetic_query}': {str(e)}", exc_info=True)
                 break
 
-        return images
+        return images, bookmark
 
     async def is_authenticated(self) -> bool:
-        """Check if Pinterest API is authenticated (has access or refresh token)."""
-        has_access = self.oauth_service.get_access_token() is not None
-        has_refresh = self.oauth_service.redis_client.get("pinterest_refresh_token") is not None
-        return has_access or has_refresh
+        """Check if Pinterest API is authenticated (has access or refresh token). No I/O."""
+        return self.oauth_service.has_credentials()
 
 
 # Global Pinterest API client instance
@@ -0,0 +1,226 @@
+"""Per-provider request budgets shared across workers.
+
+Every outbound provider request spends one token from a Redis token bucket
+(``ratelimit:<provider>``) sized to the provider's hourly quota and refilled
+continuously. A provider without a configured quota is not capped locally until
+it reports its limit (``X-Ratelimit-Limit``), which then sizes the bucket. Buckets
+are corrected from the ``X-Ratelimit-Remaining`` header the provider reports, and a 429 (or a reported remaining of 0) puts the provider into
+exponential backoff (``ratelimit:<provider>:backoff``), honouring ``Retry-After``
+or ``X-Ratelimit-Reset`` when present.
+
+When a provider has no budget left, ImageProvider.search serves the cached result
+for the query instead of calling out, and _fetch_candidates shifts that
+provider's share of images to the providers that still have budget.
+
+Without Redis the same buckets are kept in-process.
+"""
+
+import logging
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from config import settings
+from services.cache_service import cache_service
+
+logger = logging.getLogger(__name__)
+
+# Refill, optionally clamp to a provider-reported remaining count, then try to spend.
+# Returns {allowed, tokens}. cost=0 peeks without spending.
+_TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local clamp = tonumber(ARGV[5])
+local state = redis.call("HMGET", KEYS[1], "tokens", "ts")
+local tokens = tonumber(state[1])
+local ts = tonumber(state[2])
+if tokens == nil then
+    tokens = capacity
+    ts = now
+end
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+if clamp >= 0 then
+    tokens = math.min(tokens, clamp)
+end
+local allowed = 0
+if cost > 0 and tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+elseif cost == 0 and tokens >= 1 then
+    allowed = 1
+end
+redis.call("HSET", KEYS[1], "tokens", tostring(tokens), "ts", tostring(now))
+redis.call("EXPIRE", KEYS[1], math.ceil(capacity / rate) + 60)
+return {allowed, tostring(tokens)}
+"""
+
+
+class RateLimitedError(Exception):
+    """Raised instead of sending a request the provider's budget cannot cover."""
+
+    def __init__(self, provider: str):
+        super().__init__(f"{provider} rate budget exhausted")
+        self.provider = provider
+
+
+class RateLimiter:
+    """Token buckets and adaptive backoff per provider."""
+
+    def __init__(self):
+        # In-process fallback state when Redis is unavailable
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._backoff_until: Dict[str, float] = {}
+        self._strikes: Dict[str, int] = {}  # Also mirrors the Redis count this worker last saw
+        self._reported_limits: Dict[str, int] = {}
+
+    def quota(self, provider: str) -> Optional[int]:
+        """Requests per hour allowed for a provider: configured, else as reported (None: not capped)."""
+        configured = {
+            "unsplash": settings.unsplash_hourly_quota,
+            "pexels": settings.pexels_hourly_quota,
+            "flickr": settings.flickr_hourly_quota,
+            "pinterest": settings.pinterest_hourly_quota,
+        }.get(provider, 1000)
+        return configured if configured is not None else self._reported_limits.get(provider)
+
+    async def _bucket(self, provider: str, cost: int, clamp: Optional[int] = None) -> Tuple[bool, float]:
+        capacity = self.quota(provider)
+        if capacity is None:
+            return True, float("inf")
+        rate = capacity / 3600.0
+        now = time.time()
+        client = cache_service.client
+        if client is not None:
+            try:
+                allowed, tokens = await client.eval(
+                    _TOKEN_BUCKET_SCRIPT, 1, f"ratelimit:{provider}",
+                    capacity, rate, now, cost, -1 if clamp is None else clamp,
+                )
+                return bool(allowed), float(tokens)
+            except Exception as e:
+                logger.warning("Rate limiter Redis error for %s, using local bucket: %s", provider, e)
+
+        tokens, ts = self._buckets.get(provider, (float(capacity), now))
+        tokens = min(capacity, tokens + max(0.0, now - ts) * rate)
+        if clamp is not None:
+            tokens = min(tokens, clamp)
+        allowed = tokens >= max(cost, 1)
+        if allowed and cost:
+            tokens -= cost
+        self._buckets[provider] = (tokens, now)
+        return allowed, tokens
+
+    async def backoff_remaining(self, provider: str) -> float:
+        """Seconds until the provider may be called again (0 when not backing off)."""
+        client = cache_service.client
+        if client is not None:
+            try:
+                ttl = await client.pttl(f"ratelimit:{provider}:backoff")
+                return max(0.0, ttl / 1000.0)
+            except Exception as e:
+                logger.warning("Rate limiter Redis error for %s: %s", provider, e)
+        return max(0.0, self._backoff_until.get(provider, 0.0) - time.time())
+
+    async def acquire(self, provider: str) -> bool:
+        """Spend one request from the provider's budget; False if it cannot be spent."""
+        if await self.backoff_remaining(provider) > 0:
+            return False
+        allowed, _ = await self._bucket(provider, cost=1)
+        return allowed
+
+    async def has_budget(self, provider: str) -> bool:
+        """Whether at least one request could be sent now, without spending it."""
+        if await self.backoff_remaining(provider) > 0:
+            return False
+        allowed, _ = await self._bucket(provider, cost=0)
+        return allowed
+
+    async def remaining(self, provider: str) -> float:
+        """Tokens left in the provider's bucket (0 while backing off)."""
+        if await self.backoff_remaining(provider) > 0:
+            return 0.0
+        _, tokens = await self._bucket(provider, cost=0)
+        return tokens
+
+    async def observe_response(self, provider: str, status_code: int, headers: Any) -> None:
+        """Feed a provider response back into the bucket and the backoff state."""
+        limit = headers.get("x-ratelimit-limit")
+        if limit is not None:
+            try:
+                self._reported_limits[provider] = max(1, int(float(limit)))
+            except ValueError:
+                pass
+
+        remaining = headers.get("x-ratelimit-remaining")
+        if remaining is not None:
+            try:
+                await self._bucket(provider, cost=0, clamp=max(0, int(float(remaining))))
+            except ValueError:
+                remaining = None
+
+        if status_code == 429 or remaining in ("0", 0):
+            await self._back_off(provider, self._retry_after(headers))
+        elif status_code < 400:
+            await self._reset_strikes(provider)
+
+    def _retry_after(self, headers: Any) -> Optional[float]:
+        """Server-suggested wait from Retry-After (seconds) or X-Ratelimit-Reset (epoch)."""
+        try:
+            if headers.get("retry-after") is not None:
+                return float(headers["retry-after"])
+            if headers.get("x-ratelimit-reset") is not None:
+                return max(0.0, float(headers["x-ratelimit-reset"]) - time.time())
+        except ValueError:
+            pass
+        return None
+
+    async def _back_off(self, provider: str, retry_after: Optional[float]) -> None:
+        client = cache_service.client
+        strikes = None
+        if client is not None:
+            try:
+                strikes = self._strikes[provider] = await client.incr(f"ratelimit:{provider}:strikes")
+                await client.expire(f"ratelimit:{provider}:strikes", 3600)
+            except Exception as e:
+                logger.warning("Rate limiter Redis error for %s: %s", provider, e)
+        if strikes is None:
+            strikes = self._strikes[provider] = self._strikes.get(provider, 0) + 1
+
+        delay = retry_after or settings.provider_backoff_base * 2 ** (strikes - 1)
+        delay = min(delay, settings.provider_backoff_max)
+        logger.warning("%s rate limited, backing off for %.0fs (strike %s)", provider, delay, strikes)
+
+        if client is not None:
+            try:
+                await client.set(f"ratelimit:{provider}:backoff", "1", px=max(1, int(delay * 1000)))
+                return
+            except Exception as e:
+                logger.warning("Rate limiter Redis error for %s: %s", provider, e)
+        self._backoff_until[provider] = time.time() + delay
+
+    async def _reset_strikes(self, provider: str) -> None:
+        # Only after a strike this worker counted: successes are the common case and
+        # must not cost a Redis round trip each (strikes expire after an hour anyway)
+        if self._strikes.pop(provider, None) is None:
+            return
+        self._backoff_until.pop(provider, None)
+        client = cache_service.client
+        if client is not None:
+            try:
+                await client.delete(f"ratelimit:{provider}:strikes")
+            except Exception as e:
+                logger.warning("Rate limiter Redis error for %s: %s", provider, e)
+
+    async def status(self, provider: str) -> Dict[str, Any]:
+        """Budget snapshot for /providers/status."""
+        _, tokens = await self._bucket(provider, cost=0)
+        return {
+            "hourly_quota": self.quota(provider),
+            "remaining": int(tokens) if tokens != float("inf") else None,
+            "backoff_seconds": round(await self.backoff_remaining(provider), 1),
+        }
+
+
+# Global service instance
+rate_limiter = RateLimiter()
@@ -0,0 +1,79 @@
+"""Span-style timing for the moodboard pipeline.
+
+Every pipeline step runs inside a span:
+
+    trace = PipelineTrace()
+    with trace.span("classify"):
+        ...
+    candidates = await trace.timed("fetch.unsplash", unsplash_client.search(...))
+
+Span names are dotted ("fetch.pexels", "rerank.download"); repeated spans with the
+same name (one per provider call or per candidate image) are summed in the job's
+breakdown and observed individually in the process-wide stage histograms.
+"""
+
+import logging
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Dict, Iterator, List, Tuple, TypeVar
+
+from services.metrics_service import metrics_service
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class TraceService:
+    """Aggregates span durations from every job into per-stage histograms.
+
+    The histograms live in metrics_service (moorea_pipeline_stage_duration_seconds)
+    so they are scraped with everything else; snapshot() renders them as JSON.
+    """
+
+    def observe(self, stage: str, seconds: float) -> None:
+        metrics_service.pipeline_stage_duration.labels(stage).observe(seconds)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        histogram = metrics_service.pipeline_stage_duration
+        return {stage: series for (stage,), series in histogram.snapshot().items()}
+
+
+class PipelineTrace:
+    """Collects the spans of a single moodboard job."""
+
+    def __init__(self):
+        self._started = time.perf_counter()
+        self._spans: List[Tuple[str, float]] = []
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        """Time the enclosed block. Safe to use from executor threads."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            self._spans.append((name, duration))
+            trace_service.observe(name, duration)
+
+    async def timed(self, name: str, awaitable: Awaitable[T]) -> T:
+        """Await a coroutine inside a span."""
+        with self.span(name):
+            return await awaitable
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the trace was started."""
+        return time.perf_counter() - self._started
+
+    def breakdown(self) -> Dict[str, float]:
+        """Total seconds per span name, in first-seen order."""
+        totals: Dict[str, float] = {}
+        for name, duration in list(self._spans):
+            totals[name] = totals.get(name, 0.0) + duration
+        return {name: round(seconds, 4) for name, seconds in totals.items()}
+
+
+# Global service instance
+trace_service = TraceService()
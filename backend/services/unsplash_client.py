@@ -1,89 +1,74 @@
 """Unsplash API client for fetching images."""
 
+import asyncio
 import logging
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 import httpx
 
 from config import settings
 from models import ImageCandidate
-from services.cache_service import cache_service
+from services.image_provider import ImageProvider, ProviderPolicy
 
 logger = logging.getLogger(__name__)
 
 
-class UnsplashClient:
+class UnsplashClient(ImageProvider):
     """Client for Unsplash API integration."""
     
+    name = "unsplash"
+    policy = ProviderPolicy(timeout=5.0, max_concurrency=8)
+    
     def __init__(self, access_key: Optional[str] = None):
+        super().__init__()
         self.access_key = access_key or settings.unsplash_access_key
         self.base_url = "https://api.unsplash.com"
-        self.session = httpx.AsyncClient(
-            timeout=5.0,  # Reduced from 30s to 5s for faster response
-            headers={
-                "Authorization": f"Client-ID {self.access_key}" if self.access_key else ""
-            }
-        )
+    
+    def default_headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Client-ID {self.access_key}"} if self.access_key else {}
+    
+    async def is_available(self) -> bool:
+        return bool(self.access_key)
     
     async def search_photos(self, query: str, per_page: int = 20) -> List[ImageCandidate]:
-        """Search for photos on Unsplash."""
-        if not self.access_key:
-            logger.warning("Unsplash access key not configured, skipping Unsplash search")
-            return []
+        """Search for photos on Unsplash (alias of search() kept for scripts)."""
+        return await self.search(query, per_page)
+    
+    async def _search_page(self, query: str, n: int, cursor: Optional[str]) -> Tuple[List[ImageCandidate], Optional[str]]:
+        page = int(cursor or 1)
+        params = {
+            'query': query,
+            'per_page': min(n, 30),  # Unsplash max is 30
+            'page': page,
+            'order_by': 'relevant',
+            'content_filter': 'high'
+            # Removed 'orientation': 'all' as it's not a valid Unsplash parameter
+        }
         
-        # Check cache first
-        cached_result = await cache_service.get_api_cache("unsplash", f"{query}:{per_page}")
-        if cached_result:
-            return [ImageCandidate(**item) for item in cached_result]
+        response = await self._request("GET", f"{self.base_url}/search/photos", params=params)
         
-        try:
-            params = {
-                'query': query,
-                'per_page': min(per_page, 30),  # Unsplash max is 30
-                'order_by': 'relevant',
-                'content_filter': 'high'
-                # Removed 'orientation': 'all' as it's not a valid Unsplash parameter
-            }
-            
-            response = await self.session.get(f"{self.base_url}/search/photos", params=params)
-            response.raise_for_status()
-            
-            data = response.json()
-            photos = data.get('results', [])
-            
-            candidates = []
-            for photo in photos:
-                urls = photo.get('urls', {})
-                user = photo.get('user', {})
-                links = photo.get('links', {})
-                
-                candidate = ImageCandidate(
-                    id=f"unsplash_{photo['id']}",
-                    url=urls.get('regular', urls.get('small', '')),
-                    thumbnail_url=urls.get('thumb', urls.get('small', '')),
-                    photographer=user.get('name', 'Unknown'),
-                    source_api="unsplash",
-                    source_url=links.get('html', f"https://unsplash.com/photos/{photo['id']}"),
-                    download_location=links.get('download_location')
-                )
-                candidates.append(candidate)
-            
-            logger.info(f"Unsplash: Found {len(candidates)} images for '{query}'")
-            
-            # Cache the result
-            candidate_dicts = [candidate.dict() for candidate in candidates]
-            await cache_service.set_api_cache("unsplash", f"{query}:{per_page}", candidate_dicts)
-            
-            return candidates
+        data = response.json()
+        photos = data.get('results', [])
+        
+        candidates = []
+        for photo in photos:
+            urls = photo.get('urls', {})
+            user = photo.get('user', {})
+            links = photo.get('links', {})
             
-        except httpx.TimeoutException:
-            logger.error(f"Unsplash API timeout for query: {query}")
-            return []
-        except httpx.HTTPStatusError as e:
-            logger.error(f"Unsplash API HTTP error for query '{query}': {e}")
-            return []
-        except Exception as e:
-            logger.error(f"Unsplash API error for query '{query}': {str(e)}")
-            return []
+            candidate = ImageCandidate(
+                id=f"unsplash_{photo['id']}",
+                url=urls.get('regular', urls.get('small', '')),
+                thumbnail_url=urls.get('thumb', urls.get('small', '')),
+                photographer=user.get('name', 'Unknown'),
+                source_api="unsplash",
+                source_url=links.get('html', f"https://unsplash.com/photos/{photo['id']}"),
+                download_location=links.get('download_location')
+            )
+            candidates.append(candidate)
+        
+        logger.info("Unsplash: Found %s images for '%s' (page %s)", len(candidates), query, page)
+        next_cursor = str(page + 1) if data.get('total_pages', 0) > page else None
+        return candidates, next_cursor
     
     async def trigger_download_event(self, download_location: str) -> bool:
         """Trigger download event for Unsplash tracking compliance."""
@@ -91,8 +76,8 @@ class UnsplashClient:
             return False
         
         try:
-            response = await self.session.get(download_location)
-            response.raise_for_status()
+            # Download events are not search requests and must be sent even when the search budget is spent
+            await self._request("GET", download_location, budget=False)
             logger.info(f"Unsplash download event triggered successfully: {download_location}")
             return True
             
@@ -104,23 +89,20 @@ class UnsplashClient:
             return False
     
     async def trigger_download_events(self, images: List[ImageCandidate]) -> int:
-        """Trigger download events for multiple Unsplash images."""
-        success_count = 0
-        
-        for image in images:
-            if image.source_api == "unsplash" and image.download_location:
-                success = await self.trigger_download_event(image.download_location)
-                if success:
-                    success_count += 1
+        """Trigger download events for multiple Unsplash images concurrently.
+
+        The pipeline does not call this inline; it queues events with
+        services/download_tracker.py instead.
+        """
+        locations = [image.download_location for image in images
+                     if image.source_api == "unsplash" and image.download_location]
+        results = await asyncio.gather(*(self.trigger_download_event(location) for location in locations))
+        success_count = sum(results)
         
         if success_count > 0:
             logger.info(f"Successfully triggered {success_count} Unsplash download events")
         
         return success_count
-    
-    async def close(self):
-        """Close the HTTP session."""
-        await self.session.aclose()
 
 
 # Global client instance
@@ -0,0 +1,174 @@
+"""Waitlist bulk import and launch notification.
+
+- bulk_import() adds many signups (e.g. a CSV from a landing-page tool) with
+  multi-row INSERT ... ON CONFLICT DO NOTHING statements, so emails already on
+  the list are skipped by the database instead of being looked up one by one.
+- WaitlistNotifier walks un-notified rows by id (keyset pages backed by the
+  ix_waitlist_users_notified_id index), sends each page's emails concurrently
+  through a Mailer, and marks the page's successful sends notified in one
+  UPDATE. Failed sends stay un-notified, so a re-run retries only those.
+
+Mailers are chosen by settings.waitlist_mailer: ``log`` writes emails to the
+log (local runs, dry runs) and ``smtp`` sends them through settings.smtp_host.
+"""
+
+import asyncio
+import logging
+import smtplib
+from datetime import datetime
+from email.message import EmailMessage
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from email_validator import EmailNotValidError, validate_email
+from sqlalchemy import func, select, update
+
+from config import settings
+from database import AsyncSessionLocal, WaitlistUser, dialect_insert
+
+logger = logging.getLogger(__name__)
+
+IMPORT_CHUNK_SIZE = 1000
+LAUNCH_SUBJECT = "Moorea is live"
+
+
+def launch_email(email: str, name: Optional[str]) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = settings.smtp_from
+    message["To"] = email
+    message["Subject"] = LAUNCH_SUBJECT
+    message.set_content(
+        f"Hi {name or 'there'},\n\n"
+        "Thanks for joining the waitlist. Moorea is now open: turn any image into a moodboard at\n"
+        f"{settings.frontend_url}\n"
+    )
+    return message
+
+
+class Mailer:
+    """Sends one email; raise on failure."""
+
+    async def send(self, message: EmailMessage) -> None:
+        raise NotImplementedError
+
+
+class LogMailer(Mailer):
+    """Logs emails instead of sending them."""
+
+    def __init__(self):
+        self.sent: List[str] = []
+
+    async def send(self, message: EmailMessage) -> None:
+        self.sent.append(message["To"])
+        logger.info("Would send %r to %s", message["Subject"], message["To"])
+
+
+class SMTPMailer(Mailer):
+    """Sends through an SMTP relay, one connection per email on the default thread pool."""
+
+    def _send(self, message: EmailMessage) -> None:
+        with smtplib.SMTP(settings.smtp_host, settings.smtp_port, timeout=30) as smtp:
+            if settings.smtp_starttls:
+                smtp.starttls()
+            if settings.smtp_username:
+                smtp.login(settings.smtp_username, settings.smtp_password or "")
+            smtp.send_message(message)
+
+    async def send(self, message: EmailMessage) -> None:
+        await asyncio.get_running_loop().run_in_executor(None, self._send, message)
+
+
+def get_mailer(name: Optional[str] = None) -> Mailer:
+    name = name or settings.waitlist_mailer
+    if name == "smtp":
+        if not settings.smtp_host:
+            raise ValueError("waitlist_mailer is 'smtp' but SMTP_HOST is not set")
+        return SMTPMailer()
+    if name == "log":
+        return LogMailer()
+    raise ValueError(f"Unknown waitlist mailer: {name}")
+
+
+def _normalize(rows: Iterable[Tuple[str, Optional[str]]]) -> Tuple[List[Dict], int]:
+    """Valid, de-duplicated signup rows and the number of invalid emails."""
+    signups: Dict[str, Dict] = {}
+    invalid = 0
+    now = datetime.utcnow()
+    for email, name in rows:
+        try:
+            email = validate_email((email or "").strip(), check_deliverability=False).normalized
+        except EmailNotValidError:
+            invalid += 1
+            continue
+        signups.setdefault(email, {"email": email, "name": (name or "").strip() or None,
+                                   "notified": False, "created_at": now})
+    return list(signups.values()), invalid
+
+
+async def bulk_import(rows: Iterable[Tuple[str, Optional[str]]]) -> Dict[str, int]:
+    """Add (email, name) rows to the waitlist, skipping invalid and already-listed emails."""
+    signups, invalid = _normalize(rows)
+    added = 0
+    async with AsyncSessionLocal() as db:
+        insert = dialect_insert(db)
+        for start in range(0, len(signups), IMPORT_CHUNK_SIZE):
+            result = await db.execute(
+                insert(WaitlistUser)
+                .values(signups[start:start + IMPORT_CHUNK_SIZE])
+                .on_conflict_do_nothing(index_elements=["email"])
+                .returning(WaitlistUser.id)
+            )
+            added += len(result.all())
+            await db.commit()
+    return {"added": added, "already_listed": len(signups) - added, "invalid": invalid}
+
+
+class WaitlistNotifier:
+    """Sends the launch email to everyone on the waitlist not yet notified."""
+
+    def __init__(self, mailer: Mailer, batch_size: Optional[int] = None, concurrency: Optional[int] = None):
+        self.mailer = mailer
+        self.batch_size = batch_size or settings.waitlist_notify_batch_size
+        self._slots = asyncio.Semaphore(concurrency or settings.waitlist_notify_concurrency)
+
+    async def _send(self, email: str, name: Optional[str]) -> bool:
+        async with self._slots:
+            try:
+                await self.mailer.send(launch_email(email, name))
+                return True
+            except Exception as e:
+                logger.warning("Launch email to %s failed: %s", email, e)
+                return False
+
+    async def pending(self) -> int:
+        async with AsyncSessionLocal() as db:
+            return await db.scalar(
+                select(func.count()).select_from(WaitlistUser).where(WaitlistUser.notified.is_(False))
+            )
+
+    async def run(self) -> Dict[str, int]:
+        """One pass over the waitlist; returns sent/failed counts."""
+        sent = failed = 0
+        last_id = 0
+        async with AsyncSessionLocal() as db:
+            while True:
+                page = (await db.execute(
+                    select(WaitlistUser.id, WaitlistUser.email, WaitlistUser.name)
+                    .where(WaitlistUser.notified.is_(False), WaitlistUser.id > last_id)
+                    .order_by(WaitlistUser.id)
+                    .limit(self.batch_size)
+                )).all()
+                if not page:
+                    break
+                last_id = page[-1].id
+
+                results = await asyncio.gather(*(self._send(row.email, row.name) for row in page))
+                delivered = [row.id for row, ok in zip(page, results) if ok]
+                if delivered:
+                    await db.execute(
+                        update(WaitlistUser).where(WaitlistUser.id.in_(delivered)).values(notified=True)
+                    )
+                    await db.commit()
+                sent += len(delivered)
+                failed += len(page) - len(delivered)
+                logger.info("Waitlist launch email: %s sent, %s failed so far", sent, failed)
+        return {"sent": sent, "failed": failed}
@@ -0,0 +1,101 @@
+"""Shared fixtures: a throwaway SQLite database, fakeredis in place of Redis, anyio for async tests.
+
+Run from backend/ (pip install -r requirements-dev.txt): python -m pytest -q
+"""
+
+import inspect
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Before anything imports database.py, which reads DATABASE_URL at import time
+_db_dir = tempfile.mkdtemp(prefix="moorea-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_dir}/test.db"
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import fakeredis
+import httpx
+import pytest
+
+from app.main import app
+from database import Base, async_engine, create_tables, engine
+from services import image_provider
+from services.cache_service import cache_service
+from services.job_service import job_service
+from services.rate_limiter import rate_limiter
+
+# A standalone script (python tests/test_generate_links.py); it replaces the services
+# package with stubs at import time, which would break every test collected after it
+collect_ignore = ["test_generate_links.py"]
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def redis():
+    """cache_service (and everything built on it) talking to a fresh fakeredis."""
+    server = fakeredis.FakeServer()
+    cache_service.redis_client = fakeredis.aioredis.FakeRedis(server=server, decode_responses=True)
+    cache_service._binary_client = fakeredis.aioredis.FakeRedis(server=server)
+    cache_service._connected = True
+    cache_service._versions = {}
+    cache_service._versions_checked = 0.0
+    cache_service.local = type(cache_service.local)(cache_service.local.max_bytes)
+    yield cache_service.redis_client
+    cache_service._connected = False
+    cache_service.redis_client = cache_service._binary_client = None
+    cache_service._versions = {}
+    cache_service.local = type(cache_service.local)(cache_service.local.max_bytes)
+
+
+@pytest.fixture
+async def db():
+    """Empty tables for the test; yields nothing, use AsyncSessionLocal or the app."""
+    create_tables()
+    yield
+    await async_engine.dispose()
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+async def client():
+    """HTTP client for the app (no lifespan: background loops stay off)."""
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+@pytest.fixture
+def jobs():
+    """The global job_service, emptied after the test."""
+    yield job_service
+    job_service._jobs.clear()
+    job_service._hash_to_job.clear()
+
+
+class FakeProviderAPI:
+    """MockTransport handler: records requests and answers them with ``handler(request)``."""
+
+    def __init__(self):
+        self.requests = []
+        self.handler = lambda request: httpx.Response(404)
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        response = self.handler(request)
+        return await response if inspect.isawaitable(response) else response
+
+
+@pytest.fixture
+async def provider_api(monkeypatch):
+    """Provider traffic (the shared pooled client) answered in-process; fresh rate budgets."""
+    api = FakeProviderAPI()
+    client = httpx.AsyncClient(transport=httpx.MockTransport(api))
+    monkeypatch.setattr(image_provider, "_http_client", client)
+    rate_limiter.__init__()
+    yield api
+    await client.aclose()
+    rate_limiter.__init__()
@@ -0,0 +1,158 @@
+"""Password hashing off the event loop, login limits, client addresses and the principal cache (services/auth_service.py)."""
+
+import threading
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import select
+
+from config import settings
+from database import AsyncSessionLocal, User
+from services import auth_service
+from services.auth_service import (
+    check_password,
+    client_ip,
+    create_access_token,
+    hash_password,
+    login_slot,
+    needs_rehash,
+    verify_token,
+)
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture(autouse=True)
+def cheap_bcrypt(monkeypatch):
+    monkeypatch.setattr(settings, "bcrypt_rounds", 4)
+
+
+async def _register(client, username="ada", password="correct horse"):
+    response = await client.post("/api/v1/auth/register",
+                                 json={"username": username, "email": f"{username}@example.com", "password": password})
+    assert response.status_code == 200, response.text
+
+
+async def _login(client, username="ada", password="correct horse", **kwargs):
+    return await client.post("/api/v1/auth/login", data={"username": username, "password": password}, **kwargs)
+
+
+async def test_bcrypt_runs_on_its_pool_not_the_event_loop(monkeypatch):
+    threads = []
+    real_hash = auth_service.get_password_hash
+
+    def recording_hash(password):
+        threads.append(threading.current_thread().name)
+        return real_hash(password)
+
+    monkeypatch.setattr(auth_service, "get_password_hash", recording_hash)
+    hashed = await hash_password("secret")
+    assert threads[0].startswith("bcrypt")
+    assert await check_password("secret", hashed) and not await check_password("wrong", hashed)
+
+
+def test_needs_rehash_compares_the_cost_factor():
+    assert not needs_rehash("$2b$04$" + "x" * 53)
+    assert needs_rehash("$2b$12$" + "x" * 53)
+    assert not needs_rehash("not-a-bcrypt-hash")
+
+
+async def test_login_rehashes_passwords_of_an_older_cost(db, client, monkeypatch):
+    await _register(client)
+    monkeypatch.setattr(settings, "bcrypt_rounds", 5)
+
+    assert (await _login(client)).status_code == 200
+    async with AsyncSessionLocal() as db_session:
+        hashed = await db_session.scalar(select(User.hashed_password).where(User.username == "ada"))
+    assert hashed.startswith("$2b$05$")
+    assert (await _login(client)).status_code == 200
+
+
+async def test_login_slots_are_limited_per_address():
+    async with login_slot("10.0.0.1") as first, login_slot("10.0.0.1") as second:
+        async with login_slot("10.0.0.1") as third, login_slot("10.0.0.2") as elsewhere:
+            assert (first, second, third, elsewhere) == (True, True, False, True)
+    async with login_slot("10.0.0.1") as again:
+        assert again  # Slots are given back
+    assert auth_service._logins_in_flight == {}
+
+
+async def test_login_beyond_the_slots_gets_429(db, client):
+    await _register(client)
+    async with login_slot("127.0.0.1"), login_slot("127.0.0.1"):
+        response = await _login(client)
+    assert response.status_code == 429
+    assert (await _login(client)).status_code == 200
+
+
+def _request(forwarded=None, peer="10.0.0.9"):
+    headers = {"x-forwarded-for": forwarded} if forwarded else {}
+    return SimpleNamespace(headers=headers, client=SimpleNamespace(host=peer))
+
+
+def test_client_ip_trusts_only_the_configured_proxy_hops(monkeypatch):
+    assert client_ip(_request("6.6.6.6")) == "10.0.0.9"  # No trusted proxies: the header is ignored
+
+    monkeypatch.setattr(settings, "trusted_proxy_hops", 1)
+    assert client_ip(_request("6.6.6.6, 203.0.113.7")) == "203.0.113.7"  # Forged entry on the left is skipped
+    assert client_ip(_request()) == "10.0.0.9"
+
+    monkeypatch.setattr(settings, "trusted_proxy_hops", 2)
+    assert client_ip(_request("6.6.6.6, 203.0.113.7, 10.1.1.1")) == "203.0.113.7"
+    assert client_ip(None) is None
+
+
+@pytest.fixture
+def user_queries(monkeypatch):
+    """Counts user lookups that reach the database."""
+    calls = []
+    real_lookup = auth_service.get_user_by_username
+
+    async def lookup(db_session, username):
+        calls.append(username)
+        return await real_lookup(db_session, username)
+
+    monkeypatch.setattr(auth_service, "get_user_by_username", lookup)
+    return calls
+
+
+async def _token(client):
+    await _register(client)
+    return {"Authorization": f"Bearer {(await _login(client)).json()['access_token']}"}
+
+
+async def test_repeat_requests_are_served_from_the_principal_cache(redis, db, client, user_queries):
+    headers = await _token(client)
+    user_queries.clear()
+
+    for _ in range(3):
+        response = await client.get("/api/v1/auth/me", headers=headers)
+        assert response.status_code == 200 and response.json()["username"] == "ada"
+    assert user_queries == ["ada"]  # Only the first request reached the database
+
+
+async def test_deleting_an_account_evicts_its_principal(redis, db, client):
+    headers = await _token(client)
+    assert (await client.get("/api/v1/auth/me", headers=headers)).status_code == 200
+
+    assert (await client.delete("/api/v1/auth/delete-account", headers=headers)).status_code == 200
+    assert (await client.get("/api/v1/auth/me", headers=headers)).status_code == 401
+
+
+async def test_decoded_tokens_are_memoized_until_they_expire(monkeypatch):
+    decodes = []
+    real_decode = auth_service.jwt.decode
+
+    def decode(*args, **kwargs):
+        decodes.append(args[0])
+        return real_decode(*args, **kwargs)
+
+    monkeypatch.setattr(auth_service.jwt, "decode", decode)
+    token = create_access_token({"sub": "ada"}, timedelta(minutes=5))
+    assert verify_token(token) == verify_token(token) == "ada"
+    assert len(decodes) == 1
+
+    expired = create_access_token({"sub": "ada"}, timedelta(seconds=-1))
+    assert verify_token(expired) is None
+    assert expired not in auth_service._decoded_tokens
@@ -0,0 +1,68 @@
+"""Byte encoding of cache values (services/cache_codec.py)."""
+
+import json
+
+import numpy as np
+import pytest
+
+from models import AestheticScore, ImageCandidate, from_cache
+from services import cache_codec
+
+VALUE = {"results": [{"url": "https://example.com/a.jpg", "similarity_score": 0.5}], "cursor": None}
+
+
+def test_round_trip_uncompressed(monkeypatch):
+    monkeypatch.setattr(cache_codec.settings, "cache_compress_min_bytes", 10 ** 9)
+    data = cache_codec.encode(VALUE)
+    assert data[:4] != cache_codec._ZSTD_MAGIC
+    assert cache_codec.decode(data) == VALUE
+
+
+def test_round_trip_without_orjson(monkeypatch):
+    monkeypatch.setattr(cache_codec, "ORJSON_AVAILABLE", False)
+    monkeypatch.setattr(cache_codec.settings, "cache_compress_min_bytes", 10 ** 9)
+    assert cache_codec.decode(cache_codec.encode(VALUE)) == VALUE
+
+
+def test_round_trip_compressed(monkeypatch):
+    pytest.importorskip("zstandard")
+    monkeypatch.setattr(cache_codec.settings, "cache_compress_min_bytes", 1)
+    data = cache_codec.encode(VALUE)
+    assert data[:4] == cache_codec._ZSTD_MAGIC
+    assert cache_codec.decode(data) == VALUE
+
+
+def test_compressed_value_without_zstandard_is_an_error(monkeypatch):
+    monkeypatch.setattr(cache_codec, "ZSTD_AVAILABLE", False)
+    with pytest.raises(ValueError):
+        cache_codec.decode(cache_codec._ZSTD_MAGIC + b"\x00\x00")
+
+
+def test_reads_legacy_json_values():
+    # Values written as JSON text before the codec existed
+    legacy = json.dumps(VALUE, indent=2).encode()
+    assert cache_codec.decode(legacy) == VALUE
+
+
+def test_encodes_numpy_arrays():
+    pytest.importorskip("orjson")
+    assert cache_codec.decode(cache_codec.encode({"v": np.array([1.0, 2.0], dtype=np.float32)})) == {"v": [1.0, 2.0]}
+
+
+def test_cached_candidates_round_trip_without_none_fields():
+    candidates = [
+        ImageCandidate(id="1", url="https://img/1.jpg", source_api="unsplash", photographer="Ada"),
+        ImageCandidate(id="2", url="https://img/2.jpg", source_api="pinterest", pinterest_board="Boho"),
+    ]
+    data = cache_codec.encode([c.model_dump(exclude_none=True) for c in candidates])
+    assert b"null" not in data and len(data) < len(json.dumps([c.model_dump() for c in candidates]))
+
+    rebuilt = from_cache(ImageCandidate, cache_codec.decode(data))
+    assert rebuilt == candidates
+    assert rebuilt[0].title is None and rebuilt[0].model_dump() == candidates[0].model_dump()
+
+
+def test_from_cache_trusts_its_input():
+    score, = from_cache(AestheticScore, [{"name": "boho", "score": 0.9}])
+    assert score.description is None  # Defaults for fields the cache left out
+    assert from_cache(AestheticScore, [{"name": "boho", "score": 2.0}])[0].score == 2.0  # Not re-validated
@@ -0,0 +1,228 @@
+"""LocalCache (L1), the Redis-backed tiers behind it and namespace versioning."""
+
+import time
+
+import numpy as np
+import pytest
+
+from config import settings
+from services.cache_service import LocalCache, cache_service
+
+pytestmark = pytest.mark.anyio
+
+
+def test_local_cache_hit_and_lru_eviction():
+    cache = LocalCache(max_bytes=80)  # Room for eight 10-byte entries
+    cache.set("a", b"x" * 9, ttl=60)
+    cache.set("b", b"y" * 9, ttl=60)
+    assert cache.get("a") == b"x" * 9  # "a" is now most recently used
+
+    cache.set("c", b"z" * 10, ttl=60)  # Over 1/8 of the budget: not kept at all
+    assert cache.get("c") is None
+
+    for key in "defghij":
+        cache.set(key, b"w" * 9, ttl=60)
+    assert cache.get("b") is None  # Least recently used went first
+    assert cache.get("a") == b"x" * 9
+    assert cache.size == cache.max_bytes
+
+
+def test_local_cache_expiry(monkeypatch):
+    cache = LocalCache(max_bytes=1024)
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+    cache.set("k", b"v", ttl=10)
+    assert cache.get("k") == b"v"
+
+    monkeypatch.setattr(time, "monotonic", lambda: now + 10)
+    assert cache.get("k") is None
+    assert len(cache) == 0 and cache.size == 0
+
+
+def test_local_cache_invalidation():
+    cache = LocalCache(max_bytes=1024)
+    for key in ("api:v0:unsplash:a", "api:v0:pexels:a", "embedding:v0:x"):
+        cache.set(key, b"1", ttl=60)
+
+    cache.invalidate("api:v0:pexels:a")
+    assert cache.get("api:v0:pexels:a") is None
+    cache.invalidate("api:*")
+    assert cache.get("api:v0:unsplash:a") is None
+    assert cache.get("embedding:v0:x") == b"1"
+
+
+async def test_l1_serves_without_redis_round_trip(redis):
+    await cache_service.set_api_cache("unsplash", "Boho  Dress", 6, [{"url": "u"}])
+    await redis.flushall()  # Only L1 can answer now
+
+    results, stale = await cache_service.get_api_cache("unsplash", "boho dress", 6)
+    assert results == [{"url": "u"}] and not stale
+
+
+async def test_redis_hit_fills_l1(redis):
+    await cache_service.set_api_cache("unsplash", "boho", 6, [{"url": "u"}])
+    cache_service.local = LocalCache(cache_service.local.max_bytes)  # Another worker's empty L1
+
+    assert (await cache_service.get_api_cache("unsplash", "boho", 6))[0] == [{"url": "u"}]
+    assert len(cache_service.local) == 1
+
+
+async def test_l1_fill_never_outlives_the_redis_entry(redis):
+    await cache_service._set("pinterest:v0:boards:x", [1], 3600)
+    await redis.expire("pinterest:v0:boards:x", 2)  # Almost expired in Redis
+    cache_service.local = LocalCache(cache_service.local.max_bytes)
+
+    assert await cache_service._get("pinterest:v0:boards:x") == [1]
+    _, expires_at = cache_service.local._entries["pinterest:v0:boards:x"]
+    assert expires_at - time.monotonic() <= 2
+
+
+async def test_evict_drops_local_entry(redis):
+    cache_service.set_local("principal:ada", {"id": 1}, ttl=30)
+    assert cache_service.get_local("principal:ada") == {"id": 1}
+
+    await cache_service.evict("principal:ada")
+    assert cache_service.get_local("principal:ada") is None
+
+
+async def test_namespace_bump_hides_old_entries(redis):
+    await cache_service.set_api_cache("unsplash", "boho", 6, [{"url": "old"}])
+    await cache_service.set_pinterest_boards("acct", [{"id": "b1"}])
+
+    assert await cache_service.invalidate_namespace("api") == 1
+    assert await redis.get("cache:version:api") == "1"
+    assert await cache_service.get_api_cache("unsplash", "boho", 6) is None
+    assert await cache_service.get_pinterest_boards("acct") == [{"id": "b1"}]  # Other namespaces untouched
+
+    await cache_service.set_api_cache("unsplash", "boho", 6, [{"url": "new"}])
+    assert (await cache_service.get_api_cache("unsplash", "boho", 6))[0] == [{"url": "new"}]
+
+
+async def test_other_workers_pick_up_namespace_bumps(redis):
+    await cache_service.set_api_cache("unsplash", "boho", 6, [{"url": "old"}])
+    await redis.incr("cache:version:api")  # Bumped by another worker
+    cache_service.local = LocalCache(cache_service.local.max_bytes)
+
+    assert await cache_service.get_api_cache("unsplash", "boho", 6) is not None  # Versions not re-read yet
+    cache_service._versions_checked = 0.0
+    assert await cache_service.get_api_cache("unsplash", "boho", 6) is None
+
+
+async def test_model_fingerprint_scopes_model_namespaces(redis):
+    previous = cache_service.model_fingerprint
+    try:
+        cache_service.set_model_fingerprint("model-a")
+        await cache_service.set_moodboard_cache("hash", {"images": []})
+        assert await cache_service.get_moodboard_cache("hash") == {"images": []}
+
+        cache_service.set_model_fingerprint("model-b")
+        assert await cache_service.get_moodboard_cache("hash") is None
+    finally:
+        cache_service.set_model_fingerprint(previous)
+
+
+async def test_model_fingerprint_scopes_classifications_and_embeddings_only(redis):
+    previous = cache_service.model_fingerprint
+    try:
+        cache_service.set_model_fingerprint("model-a")
+        await cache_service.set_classification_cache(b"image", [{"name": "boho", "score": 0.9}])
+        await cache_service.set_embedding_cache("https://img/1.jpg", np.ones(4, dtype=np.float32))
+        await cache_service.set_api_cache("unsplash", "boho", 6, [{"url": "u"}])
+        assert await redis.keys("classification:v0:model-a:*") and await redis.keys("embedding:v0:model-a:*")
+
+        cache_service.set_model_fingerprint("model-b")
+        assert await cache_service.get_classification_cache(b"image") is None
+        assert await cache_service.get_embedding_cache("https://img/1.jpg") is None
+        assert await cache_service.get_api_cache("unsplash", "boho", 6) is not None
+    finally:
+        cache_service.set_model_fingerprint(previous)
+
+
+async def test_a_restart_with_the_same_model_keeps_its_entries(redis):
+    await cache_service.set_classification_cache(b"image", [{"name": "boho", "score": 0.9}])
+    cache_service.local = LocalCache(cache_service.local.max_bytes)  # A new process: empty L1 and versions
+    cache_service._versions, cache_service._versions_checked = {}, 0.0
+
+    assert await cache_service.get_classification_cache(b"image") == [{"name": "boho", "score": 0.9}]
+
+
+async def test_api_cache_serves_stale_entries_until_the_stale_window_ends(redis, monkeypatch):
+    await cache_service.set_api_cache("pexels", "boho", 6, [{"url": "u"}], cursor="2")
+    key = await cache_service._api_cache_key("pexels", "boho", 6)
+    assert await redis.ttl(key) == pytest.approx(settings.api_cache_ttl + settings.api_cache_stale_ttl, abs=1)
+    assert await cache_service.get_api_cache("pexels", "boho", 6) == ([{"url": "u"}], False)
+    assert await cache_service.get_api_cursor("pexels", "boho", 6) == "2"
+
+    monkeypatch.setattr(settings, "api_cache_ttl", 0)  # Fresh window already over
+    await cache_service.set_api_cache("pexels", "boho", 6, [{"url": "u"}])
+    assert await cache_service.get_api_cache("pexels", "boho", 6) == ([{"url": "u"}], True)
+    assert not await cache_service.is_api_cache_fresh("pexels", "boho", 6)
+
+
+async def test_pinterest_results_are_kept_briefly_and_never_served_stale(redis, monkeypatch):
+    monkeypatch.setattr(settings, "api_cache_ttl", 0)
+    await cache_service.set_api_cache("pinterest", "boho", 6, [{"url": "u"}])
+
+    key = await cache_service._api_cache_key("pinterest", "boho", 6)
+    assert settings.pinterest_api_cache_ttl == 3600
+    assert await redis.ttl(key) == pytest.approx(3600, abs=1)
+    assert await cache_service.get_api_cache("pinterest", "boho", 6) == ([{"url": "u"}], False)
+
+
+async def test_empty_results_are_cached_briefly_and_never_stale(redis):
+    await cache_service.set_api_cache("flickr", "nothing here", 6, [])
+
+    key = await cache_service._api_cache_key("flickr", "nothing here", 6)
+    assert await redis.ttl(key) == pytest.approx(settings.api_negative_cache_ttl, abs=1)
+    assert await cache_service.get_api_cache("flickr", "nothing here", 6) == ([], False)
+
+
+@pytest.fixture
+def redis_info(redis, monkeypatch):
+    """fakeredis has no INFO; report a fixed memory figure."""
+    async def info(section=None):
+        return {"used_memory_human": "1M"}
+
+    monkeypatch.setattr(redis, "info", info)
+    return redis
+
+
+async def test_stats_count_current_namespace_keys_with_scan(redis_info):
+    for query in ("boho", "linen"):
+        await cache_service.set_api_cache("unsplash", query, 6, [{"url": "u"}])
+    await cache_service.set_pinterest_boards("acct", [])
+    await cache_service.invalidate_namespace("pinterest")  # Its old key is no longer counted
+
+    stats = await cache_service.get_cache_stats()
+    assert stats["cache_breakdown"]["api_responses"] == 2
+    assert stats["cache_breakdown"]["pinterest_boards"] == 0
+    assert stats["versions"]["pinterest"] == 1 and not stats["sampled"]
+
+
+async def test_stats_scan_stops_at_the_limit(redis_info, monkeypatch):
+    for i in range(10):
+        await redis_info.set(f"other:{i}", "x")
+    monkeypatch.setattr(settings, "cache_scan_batch", 2)
+    monkeypatch.setattr(settings, "cache_stats_scan_limit", 4)
+
+    stats = await cache_service.get_cache_stats()
+    assert stats["sampled"] and stats["total_keys"] == 10
+
+
+async def test_clear_cache_unlinks_matching_keys_in_chunks(redis, monkeypatch):
+    monkeypatch.setattr(settings, "cache_scan_batch", 2)
+    for i in range(5):
+        await redis.set(f"imghash:{i}", "x")
+    await cache_service.set_api_cache("unsplash", "boho", 6, [{"url": "u"}])
+    unlinked = []
+    real_unlink = redis.unlink
+
+    async def unlink(*keys):
+        unlinked.append(len(keys))
+        return await real_unlink(*keys)
+
+    monkeypatch.setattr(redis, "unlink", unlink)
+    assert await cache_service.clear_cache("imghash:*") == 5
+    assert max(unlinked) <= 2
+    assert await redis.keys("imghash:*") == []
+    assert await cache_service.get_api_cache("unsplash", "boho", 6) is not None
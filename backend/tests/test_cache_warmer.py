@@ -0,0 +1,101 @@
+"""API cache warmer (services/cache_warmer.py)."""
+
+import pytest
+
+from config import settings
+from models import AestheticScore
+from services.aesthetic_service import aesthetic_service
+from services.cache_service import cache_service
+from services.cache_warmer import CacheWarmer
+from services.image_provider import ImageProvider
+from services.moodboard_service import moodboard_service
+from services.rate_limiter import rate_limiter
+
+pytestmark = pytest.mark.anyio
+
+
+class RecordingProvider(ImageProvider):
+    """Caches one result per refresh and remembers what was refreshed."""
+
+    def __init__(self, name):
+        super().__init__()
+        self.name = name
+        self.refreshed = []
+
+    async def refresh(self, query, n):
+        self.refreshed.append((query, n))
+        await cache_service.set_api_cache(self.name, query, n, [{"id": query, "url": "u", "source_api": self.name}])
+        return []
+
+
+@pytest.fixture
+def providers(monkeypatch, provider_api):
+    providers = [RecordingProvider("unsplash"), RecordingProvider("pexels")]
+
+    async def active():
+        return providers
+
+    monkeypatch.setattr(moodboard_service, "_active_providers", active)
+    monkeypatch.setattr(settings, "unsplash_hourly_quota", 100)
+    monkeypatch.setattr(settings, "pexels_hourly_quota", 100)
+    return providers
+
+
+@pytest.fixture
+def vocabulary(monkeypatch):
+    async def get_vocabulary():
+        return ["minimalist", "boho", "gorpcore"]
+
+    monkeypatch.setattr(aesthetic_service, "get_vocabulary", get_vocabulary)
+
+
+async def test_plan_puts_popular_aesthetics_first(redis, vocabulary):
+    warmer = CacheWarmer()
+    await warmer.record_aesthetics(["gorpcore", "boho"])
+    await warmer.record_aesthetics(["gorpcore"])
+
+    plan = await warmer.plan()
+    assert [aesthetic for aesthetic, _, _ in plan] == ["gorpcore", "boho", "minimalist"]
+    keywords, _ = await moodboard_service._expand_keywords([AestheticScore(name="minimalist", score=1.0)])
+    assert plan[2][1:] == moodboard_service._keyword_plan(keywords)  # The keywords and size a job would use
+
+
+async def test_warms_missing_entries_and_skips_fresh_ones(redis, vocabulary, providers):
+    warmer = CacheWarmer()
+    first = await warmer.warm_once()
+    total = sum(len(keywords) for _, keywords, _ in await warmer.plan()) * len(providers)
+    assert first == {"fresh": 0, "warmed": total, "skipped_budget": 0}
+
+    assert await warmer.warm_once() == {"fresh": total, "warmed": 0, "skipped_budget": 0}
+
+
+async def test_request_cap_per_pass(redis, vocabulary, providers, monkeypatch):
+    monkeypatch.setattr(settings, "cache_warm_max_requests", 3)
+    assert (await CacheWarmer().warm_once())["warmed"] == 3
+
+
+async def test_keeps_the_budget_reserve_for_live_jobs(redis, vocabulary, providers):
+    for _ in range(51):  # Just over half of pexels' quota gone: below the reserve
+        await rate_limiter.acquire("pexels")
+
+    stats = await CacheWarmer().warm_once()
+    assert providers[1].refreshed == []
+    assert stats["skipped_budget"] == stats["warmed"] > 0
+
+
+async def test_warms_the_keys_jobs_look_up_when_a_provider_is_out_of_budget(redis, vocabulary, providers,
+                                                                              monkeypatch):
+    monkeypatch.setattr(settings, "cache_warm_budget_reserve", 0.0)
+    monkeypatch.setattr(settings, "cache_warm_max_requests", 1)
+    await rate_limiter.observe_response("pexels", 429, {})  # Pexels answers from cache only
+
+    await CacheWarmer().warm_once()
+    (keyword, n), = providers[0].refreshed
+    sizes = await moodboard_service._request_sizes(providers, 6)
+    assert n == sizes["unsplash"] == 12
+    assert await cache_service.is_api_cache_fresh("unsplash", keyword, sizes["unsplash"])
+
+
+async def test_nothing_to_warm_without_redis(vocabulary, providers):
+    assert await CacheWarmer().warm_once() == {"fresh": 0, "warmed": 0, "skipped_budget": 0}
+    assert providers[0].refreshed == []
@@ -0,0 +1,108 @@
+"""Candidate pools for "load more" (services/candidate_pool.py)."""
+
+import asyncio
+
+import pytest
+
+from config import settings
+from models import ImageCandidate
+from services.cache_service import cache_service
+from services.candidate_pool import CandidatePoolService
+from services.image_provider import ImageProvider
+
+pytestmark = pytest.mark.anyio
+
+
+def _candidates(*ids, source="paged"):
+    return [ImageCandidate(id=i, url=f"https://img/{i}.jpg", source_api=source) for i in ids]
+
+
+class PagedProvider(ImageProvider):
+    """Serves page ``cursor`` as two candidates after ``delay`` seconds; the next cursor is cursor + 1."""
+
+    name = "paged"
+
+    def __init__(self, delay=0.0):
+        super().__init__()
+        self.delay = delay
+        self.pages = []
+
+    async def is_available(self):
+        return True
+
+    async def _search_page(self, query, n, cursor):
+        self.pages.append(cursor)
+        await asyncio.sleep(self.delay)
+        page = int(cursor)
+        return _candidates(f"{query}-{page}a", f"{query}-{page}b"), str(page + 1)
+
+
+@pytest.fixture
+def pools():
+    """A pool service whose only provider is a PagedProvider; its first page cursor is cached."""
+    service = CandidatePoolService()
+    service._providers = {"paged": PagedProvider()}
+    return service
+
+
+async def _seed(service, keyword, *ids):
+    await cache_service.set_api_cache("paged", keyword, 2, [], cursor="1")
+    await service.seed("boho", [("paged", keyword, 2, _candidates(*ids))])
+
+
+async def test_pools_live_in_the_versioned_pool_namespace(redis, pools):
+    await _seed(pools, "Linen  Dress", "a", "b")
+
+    assert await redis.exists("pool:v0:boho:linen dress")
+    entry = await cache_service.get_candidate_pool("boho:linen dress")
+    assert [item["id"] for item in entry["candidates"]] == ["a", "b"]
+    assert entry["cursors"] == {"paged": "1"} and entry["sizes"] == {"paged": 2}
+
+    await cache_service.invalidate_namespace("pool")
+    assert await cache_service.get_candidate_pool("boho:linen dress") is None
+
+
+async def test_pages_from_the_pool_then_extends_from_the_cursor(redis, pools):
+    await _seed(pools, "linen", "a", "b")
+
+    shown = {"https://img/a.jpg"}
+    images, positions, total, has_more = await pools.page("boho", ["linen"], ["paged"], [0], 3, exclude=shown)
+    assert [c.id for c in images] == ["b", "linen-1a", "linen-1b"]
+    assert positions == [4] and total == 4 and has_more
+    assert pools._providers["paged"].pages == ["1"]
+
+    images, positions, _, _ = await pools.page("boho", ["linen"], ["paged"], positions, 2, exclude=set())
+    assert [c.id for c in images] == ["linen-2a", "linen-2b"]
+
+
+async def test_concurrent_extends_fetch_a_page_once(redis, pools):
+    await _seed(pools, "linen", "a")
+    pools._providers["paged"].delay = 0.05
+
+    added = await asyncio.gather(*(pools.extend("boho", "linen", ["paged"]) for _ in range(3)))
+    assert sorted(added) == [0, 0, 2]
+    assert pools._providers["paged"].pages == ["1"]
+
+
+async def test_seed_waits_for_an_extend_instead_of_overwriting_it(redis, pools):
+    await _seed(pools, "linen", "a")
+    pools._providers["paged"].delay = 0.1
+
+    extending = asyncio.create_task(pools.extend("boho", "linen", ["paged"]))
+    await asyncio.sleep(0.02)
+    await pools.seed("boho", [("paged", "linen", 2, _candidates("b"))])  # A second job with the same keyword
+    assert await extending == 2
+
+    entry = await cache_service.get_candidate_pool("boho:linen")
+    assert [item["id"] for item in entry["candidates"]] == ["a", "linen-1a", "linen-1b", "b"]
+    assert entry["cursors"] == {"paged": "2"}
+
+
+async def test_pools_are_kept_in_process_without_redis(pools, monkeypatch):
+    monkeypatch.setattr(settings, "candidate_pool_local_size", 1)
+    await pools.seed("boho", [("paged", "linen", 2, _candidates("a"))])
+    await pools.seed("boho", [("paged", "rattan", 2, _candidates("b"))])
+
+    assert list(pools._local) == ["boho:rattan"]
+    images, _, _, has_more = await pools.page("boho", ["rattan"], ["paged"], [0], 5, exclude=set())
+    assert [c.id for c in images] == ["b"] and not has_more
@@ -0,0 +1,23 @@
+"""Model fingerprint that scopes model-dependent cache keys (services/clip_service.py)."""
+
+import pytest
+
+pytest.importorskip("torch")
+
+from config import settings  # noqa: E402
+from services.clip_service import CLIPService  # noqa: E402
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_fingerprint_changes_with_model_and_boost_rules(monkeypatch):
+    service = CLIPService()
+    fingerprint = await service.model_fingerprint()
+    assert fingerprint == await CLIPService().model_fingerprint()  # Stable across restarts
+
+    monkeypatch.setattr(settings, "boost_rules_version", settings.boost_rules_version + "-next")
+    assert await service.model_fingerprint() != fingerprint
+
+    monkeypatch.undo()
+    service.model_name = "another/model"
+    assert await service.model_fingerprint() != fingerprint
@@ -0,0 +1,50 @@
+"""Async engine URL and pooler handling, and the get_db dependency (database.py)."""
+
+import asyncio
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import User, _async_url, _behind_pgbouncer, get_db
+
+pytestmark = pytest.mark.anyio
+
+
+def test_async_url_picks_the_async_driver():
+    assert _async_url("sqlite:///./dev.db") == "sqlite+aiosqlite:///./dev.db"
+    assert _async_url("postgres://u:p%40ss@db:5432/app") == "postgresql+asyncpg://u:p%40ss@db:5432/app"
+    assert _async_url("postgresql+psycopg2://u:pw@db/app").startswith("postgresql+asyncpg://u:pw@db/app")
+
+
+def test_async_url_translates_libpq_parameters():
+    url = _async_url("postgresql://u:pw@db/app?sslmode=require&connect_timeout=10&options=-c%20x%3D1")
+    assert url == "postgresql+asyncpg://u:pw@db/app?ssl=require"
+
+
+def test_transaction_poolers_are_detected():
+    assert _behind_pgbouncer("postgresql://u:pw@aws-0-eu.pooler.supabase.com:5432/postgres")
+    assert _behind_pgbouncer("postgresql://u:pw@db.example.com:6543/postgres")
+    assert not _behind_pgbouncer("postgresql://u:pw@db.example.com:5432/postgres")
+
+
+async def test_get_db_yields_async_sessions_that_do_not_block_the_loop(db):
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0)
+
+    ticking = asyncio.create_task(ticker())
+    try:
+        sessions = get_db()
+        session = await sessions.__anext__()
+        assert isinstance(session, AsyncSession)
+        for _ in range(20):
+            await session.execute(select(User).where(User.username == "nobody"))
+        await sessions.aclose()
+    finally:
+        ticking.cancel()
+    assert ticks > 20  # The loop kept running other tasks while queries were in flight
@@ -0,0 +1,86 @@
+"""dHash near-duplicate removal (services/dedupe_service.py)."""
+
+import io
+import random
+
+import httpx
+import pytest
+from PIL import Image
+
+from models import ImageCandidate
+from services.dedupe_service import DedupeService, HashIndex, dhash
+
+pytestmark = pytest.mark.anyio
+
+
+def _image(size=(90, 80), mirrored=False, fmt="PNG") -> bytes:
+    """A horizontal gradient (left to right, or right to left when mirrored)."""
+    image = Image.linear_gradient("L").rotate(90 if mirrored else -90).resize(size).convert("RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt, quality=60)
+    return buffer.getvalue()
+
+
+def _flip(value: int, bits) -> int:
+    for bit in bits:
+        value ^= 1 << bit
+    return value
+
+
+def test_dhash_ignores_size_and_compression():
+    original = dhash(_image())
+    assert bin(original ^ dhash(_image(size=(900, 800), fmt="JPEG"))).count("1") <= 2
+    assert bin(original ^ dhash(_image(mirrored=True))).count("1") > 32
+
+
+def test_banded_index_finds_every_hash_within_distance():
+    rng = random.Random(7)
+    for _ in range(500):
+        value = rng.getrandbits(64)
+        index = HashIndex(max_distance=7)
+        index.add(value)
+        assert index.near(_flip(value, rng.sample(range(64), 7)))  # Some band is always left intact
+
+
+def test_index_rejects_hashes_beyond_max_distance():
+    index = HashIndex(max_distance=3)
+    index.add(0)
+    assert index.near(_flip(0, (0, 20, 40)))
+    assert not index.near(_flip(0, (0, 20, 40, 60)))
+    assert HashIndex(max_distance=12).max_distance == 7  # Banding only guarantees recall up to 7
+
+
+@pytest.fixture
+def image_server(provider_api):
+    images = {"/a.png": _image(), "/a-large.jpg": _image(size=(900, 800), fmt="JPEG"),
+              "/b.png": _image(mirrored=True)}
+    provider_api.handler = lambda request: (
+        httpx.Response(200, content=images[request.url.path]) if request.url.path in images else httpx.Response(404))
+    return provider_api
+
+
+def _candidate(path, source="unsplash"):
+    return ImageCandidate(id=path, url=f"https://img{path}", source_api=source)
+
+
+async def test_drops_near_duplicates_across_providers_and_sizes(redis, image_server):
+    candidates = [_candidate("/a.png"), _candidate("/b.png"), _candidate("/a-large.jpg", "pexels"),
+                  _candidate("/missing.png")]
+
+    kept = await DedupeService().drop_near_duplicates(candidates, HashIndex(6))
+    assert [c.id for c in kept] == ["/a.png", "/b.png", "/missing.png"]  # Unhashable candidates are kept
+
+
+async def test_one_index_screens_several_batches(redis, image_server):
+    service, index = DedupeService(), HashIndex(6)
+    assert len(await service.drop_near_duplicates([_candidate("/a.png")], index)) == 1
+    assert await service.drop_near_duplicates([_candidate("/a-large.jpg")], index) == []
+
+
+async def test_hashes_are_cached_per_url(redis, image_server):
+    candidates = [_candidate("/a.png"), _candidate("/b.png")]
+    first = await DedupeService().hashes(candidates)
+    assert len(image_server.requests) == 2
+
+    assert await DedupeService().hashes(candidates) == first  # A fresh worker: from Redis
+    assert len(image_server.requests) == 2
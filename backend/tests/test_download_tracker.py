@@ -0,0 +1,134 @@
+"""Background Unsplash download events (services/download_tracker.py)."""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from config import settings
+from models import ImageCandidate
+from services.download_tracker import PROCESSING_KEY, QUEUE_KEY, WORKER_KEY, DownloadTracker
+from services.rate_limiter import rate_limiter
+from services.unsplash_client import unsplash_client
+
+pytestmark = pytest.mark.anyio
+
+
+def _image(i, source="unsplash"):
+    return ImageCandidate(id=str(i), url=f"https://img/{i}.jpg", source_api=source,
+                          download_location=f"https://api.unsplash.com/photos/{i}/download")
+
+
+@pytest.fixture
+def unsplash(provider_api, monkeypatch):
+    """Answers download events with ``unsplash.status`` (200 by default)."""
+    monkeypatch.setattr(unsplash_client, "access_key", "key")
+    provider_api.status = 200
+    provider_api.handler = lambda request: httpx.Response(provider_api.status)
+    return provider_api
+
+
+async def _queued(redis):
+    return [json.loads(raw) for raw in await redis.lrange(QUEUE_KEY, 0, -1)]
+
+
+async def test_enqueue_skips_other_providers_and_recent_locations(redis):
+    tracker = DownloadTracker()
+    assert await tracker.enqueue([_image(1), _image(1), _image(2, "pexels"), _image(3)]) == 2
+    assert await tracker.enqueue([_image(1), _image(4)]) == 1  # 1 was tracked within the dedupe window
+
+    assert [item["location"].split("/")[-2] for item in await _queued(redis)] == ["1", "3", "4"]
+
+
+async def test_enqueue_in_background_does_not_wait_for_redis(redis, monkeypatch):
+    tracker = DownloadTracker()
+    claimed = asyncio.Event()
+    real_first_use = tracker._first_use
+
+    async def slow_first_use(locations):
+        await claimed.wait()
+        return await real_first_use(locations)
+
+    monkeypatch.setattr(tracker, "_first_use", slow_first_use)
+    tracker.enqueue_in_background([_image(1), _image(2)])
+    assert await redis.llen(QUEUE_KEY) == 0  # Returned before touching Redis
+
+    claimed.set()
+    await tracker.drain()
+    assert await redis.llen(QUEUE_KEY) == 2
+
+
+async def test_flush_sends_events_and_clears_the_processing_list(redis, unsplash):
+    tracker = DownloadTracker()
+    await tracker.enqueue([_image(1), _image(2)])
+
+    assert await tracker.flush_once() == 2
+    assert len(unsplash.requests) == 2
+    assert await redis.llen(QUEUE_KEY) == 0 and not await redis.exists(tracker._processing_key)
+
+
+async def test_failed_events_are_retried_with_backoff_then_dropped(redis, unsplash, monkeypatch):
+    monkeypatch.setattr(settings, "unsplash_download_max_attempts", 2)
+    unsplash.status = 500
+    tracker = DownloadTracker()
+    await tracker.enqueue([_image(1)])
+
+    assert await tracker.flush_once() == 0
+    item, = await _queued(redis)
+    assert item["attempts"] == 1 and item["not_before"] > 0
+
+    await redis.delete(QUEUE_KEY)
+    await redis.rpush(QUEUE_KEY, json.dumps({**item, "not_before": 0.0}))
+    assert await tracker.flush_once() == 0
+    assert await _queued(redis) == []  # Second failure: max attempts reached
+
+
+async def test_rate_limited_events_keep_their_attempts(redis, unsplash):
+    unsplash.status = 429
+    tracker = DownloadTracker()
+    await tracker.enqueue([_image(1)])
+
+    await tracker.flush_once()
+    item, = await _queued(redis)
+    assert item["attempts"] == 0 and item["not_before"] > 0
+    assert await rate_limiter.backoff_remaining("unsplash") > 0
+
+
+async def test_a_stopped_workers_batch_is_requeued(redis, unsplash):
+    crashed, survivor = DownloadTracker(), DownloadTracker()
+    await crashed.enqueue([_image(1), _image(2)])
+    await crashed.recover()  # Marks it live
+    assert len(await crashed._pop(10)) == 2  # ... then it dies before sending
+
+    assert await survivor.recover() == 0  # Still within its liveness window
+    await redis.delete(f"{WORKER_KEY}{crashed._worker_id}")
+    assert await survivor.recover() == 2
+    assert await redis.keys(f"{PROCESSING_KEY}*") == []
+    assert await survivor.flush_once() == 2
+
+
+async def test_cancelled_batch_goes_back_on_the_queue(redis, unsplash):
+    sending = asyncio.Event()
+
+    async def hang(request):
+        sending.set()
+        await asyncio.sleep(10)
+
+    unsplash.handler = hang
+    tracker = DownloadTracker()
+    await tracker.enqueue([_image(1)])
+
+    flushing = asyncio.create_task(tracker.flush_once())
+    await sending.wait()
+    flushing.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await flushing
+    assert len(await _queued(redis)) == 1 and not await redis.exists(tracker._processing_key)
+
+
+async def test_without_redis_events_are_queued_in_process(unsplash):
+    tracker = DownloadTracker()
+    assert await tracker.enqueue([_image(1), _image(2)]) == 2
+    assert await tracker.enqueue([_image(1)]) == 0
+    assert await tracker.flush_once() == 2
@@ -0,0 +1,241 @@
+"""ImageProvider base class: pooled HTTP client, per-provider policies and search() (services/image_provider.py)."""
+
+import asyncio
+import gc
+
+import httpx
+import pytest
+
+from config import settings
+from models import ImageCandidate
+from services import image_provider
+from services.cache_service import cache_service
+from services.cancellation import CancellationToken, bind_token
+from services.image_provider import (
+    ImageProvider,
+    LatencyWindow,
+    ProviderPolicy,
+    close_http_client,
+    get_http_client,
+)
+from services.metrics_service import metrics_service
+from services.pexels_client import PexelsClient
+
+pytestmark = pytest.mark.anyio
+
+
+class FakeProvider(ImageProvider):
+    name = "fake"
+    policy = ProviderPolicy(timeout=5.0, max_concurrency=2)
+
+    async def _search_page(self, query, n, cursor):
+        response = await self._request("GET", "https://fake.test/search", params={"q": query, "n": n})
+        return [ImageCandidate(**item) for item in response.json()["items"]], None
+
+
+def _items(*ids):
+    return {"items": [{"id": i, "url": f"https://img/{i}.jpg", "source_api": "fake"} for i in ids]}
+
+
+async def test_one_pooled_client_per_process(monkeypatch):
+    monkeypatch.setattr(image_provider, "_http_client", None)
+    client = get_http_client()
+    assert get_http_client() is client
+
+    await close_http_client()
+    assert client.is_closed
+    assert get_http_client() is not client
+    await close_http_client()
+
+
+async def test_requests_carry_provider_headers_and_job_deadline(provider_api):
+    provider_api.handler = lambda request: httpx.Response(200, json={"photos": []})
+    bind_token(CancellationToken(1.0))
+    try:
+        await PexelsClient(api_key="secret")._search_page("boho", 10, None)
+    finally:
+        bind_token(None)
+
+    request = provider_api.requests[0]
+    assert request.headers["Authorization"] == "secret"
+    assert request.url.params["per_page"] == "10"
+    assert request.extensions["timeout"]["read"] <= 1.0  # Policy timeout capped by the job's time left
+
+
+async def test_concurrency_is_limited_per_provider(provider_api):
+    in_flight = peak = 0
+
+    async def slow(request):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.02)
+        in_flight -= 1
+        return httpx.Response(200, json=_items())
+
+    provider_api.handler = slow
+    provider = FakeProvider()
+    await asyncio.gather(*(provider._request("GET", "https://fake.test/x") for _ in range(6)))
+    assert len(provider_api.requests) == 6 and peak == 2
+
+
+async def test_search_caches_results(redis, provider_api):
+    provider_api.handler = lambda request: httpx.Response(200, json=_items("a", "b"))
+    provider = FakeProvider()
+
+    assert [c.id for c in await provider.search("boho", 2)] == ["a", "b"]
+    assert [c.id for c in await provider.search(" Boho ", 2)] == ["a", "b"]
+    assert len(provider_api.requests) == 1
+
+
+async def test_search_failures_yield_empty_and_are_not_cached(redis, provider_api):
+    errors = metrics_service.provider_errors.labels("fake", "http_500")
+    before = errors.value
+    provider_api.handler = lambda request: httpx.Response(500)
+    provider = FakeProvider()
+
+    assert await provider.search("boho", 2) == []
+    assert errors.value == before + 1
+
+    provider_api.handler = lambda request: httpx.Response(200, json=_items("a"))
+    assert [c.id for c in await provider.search("boho", 2)] == ["a"]
+
+
+async def test_unconfigured_provider_makes_no_requests(provider_api):
+    client = PexelsClient()
+    client.api_key = None
+    assert await client.search("boho") == []
+    assert provider_api.requests == []
+
+
+async def test_stale_hits_answer_at_once_and_refresh_once_in_background(redis, provider_api, monkeypatch):
+    monkeypatch.setattr(settings, "api_cache_ttl", 0)  # Every entry is stale as soon as it is written
+    await cache_service.set_api_cache("fake", "boho", 2, _items("old")["items"])
+    refreshed = asyncio.Event()
+
+    async def fresh(request):
+        await refreshed.wait()
+        return httpx.Response(200, json=_items("new"))
+
+    provider_api.handler = fresh
+    provider = FakeProvider()
+    answers = await asyncio.gather(*(provider.search("boho", 2) for _ in range(3)))
+    assert [[c.id for c in answer] for answer in answers] == [["old"]] * 3
+
+    refreshed.set()
+    await asyncio.gather(*provider._background)
+    assert len(provider_api.requests) == 1
+    assert (await cache_service.get_api_cache("fake", "boho", 2))[0][0]["id"] == "new"
+
+
+class ScriptedProvider(ImageProvider):
+    """search() attempts play back ``answers`` in order: (seconds, candidate ids or an exception)."""
+
+    name = "scripted"
+
+    def __init__(self, *answers, latency=None):
+        super().__init__()
+        self.answers = list(answers)
+        self.attempts = []
+        for seconds in latency or ():
+            self.latency.observe(seconds)
+
+    async def search(self, query, n=20):
+        delay, answer = self.answers.pop(0)
+        self.attempts.append(asyncio.current_task())
+        await asyncio.sleep(delay)
+        if isinstance(answer, Exception):
+            raise answer
+        return [ImageCandidate(id=i, url=f"https://img/{i}.jpg", source_api=self.name) for i in answer]
+
+
+@pytest.fixture
+async def unretrieved_task_errors():
+    """Errors the event loop reports for tasks whose exception nobody retrieved."""
+    loop = asyncio.get_running_loop()
+    errors = []
+    loop.set_exception_handler(lambda loop, context: errors.append(context["message"]))
+    yield errors
+    loop.set_exception_handler(None)
+
+
+def test_latency_window_quantiles(monkeypatch):
+    monkeypatch.setattr(settings, "provider_latency_min_samples", 10)
+    window = LatencyWindow(size=100)
+    for ms in range(1, 10):
+        window.observe(ms / 1000)
+    assert window.quantile(0.95) is None  # Too few samples to trust
+
+    for ms in range(10, 101):
+        window.observe(ms / 1000)
+    assert window.quantile(0.5) == 0.051
+    assert window.quantile(0.95) == 0.096
+    assert window.quantile(1.0) == 0.1
+
+
+def test_search_timeout_follows_recent_p99(monkeypatch):
+    provider = ScriptedProvider()
+    assert provider.search_timeout() == settings.provider_search_timeout  # No history yet
+
+    for _ in range(settings.provider_latency_min_samples):
+        provider.latency.observe(3.0)
+    assert provider.search_timeout() == 3.0 * settings.provider_timeout_multiplier
+
+    for _ in range(settings.provider_latency_window):
+        provider.latency.observe(0.01)
+    assert provider.search_timeout() == settings.provider_search_timeout_floor
+
+    bind_token(CancellationToken(1.0))
+    try:
+        assert provider.search_timeout() <= 1.0  # Never past the job deadline
+    finally:
+        bind_token(None)
+
+
+async def test_slow_search_is_hedged_once_past_p95(provider_api):
+    won = metrics_service.provider_hedges.labels("scripted", "won")
+    before = won.value
+    provider = ScriptedProvider((5.0, ["slow"]), (0.0, ["fast"]), latency=[0.05] * 20)
+
+    assert [c.id for c in await provider.hedged_search("boho")] == ["fast"]
+    assert won.value == before + 1
+    await asyncio.sleep(0.01)
+    assert provider.attempts[0].cancelled()  # The losing attempt does not linger
+    assert not provider._background
+
+
+async def test_no_hedge_without_latency_history(provider_api):
+    provider = ScriptedProvider((0.1, ["only"]))
+    assert [c.id for c in await provider.hedged_search("boho")] == ["only"]
+    assert len(provider.attempts) == 1
+
+
+async def test_failed_attempt_counts_as_empty(provider_api, unretrieved_task_errors):
+    provider = ScriptedProvider((0.2, ["first"]), (0.0, RuntimeError("boom")), latency=[0.05] * 20)
+
+    assert [c.id for c in await provider.hedged_search("boho")] == ["first"]
+    assert len(provider.attempts) == 2
+
+    provider = ScriptedProvider((0.0, RuntimeError("boom")))
+    assert await provider.hedged_search("boho") == []
+    gc.collect()
+    assert unretrieved_task_errors == []
+
+
+async def test_loser_failing_after_the_answer_is_not_left_unretrieved(provider_api, unretrieved_task_errors):
+    provider = ScriptedProvider((0.1, ValueError("late")), (0.0, ["fast"]), latency=[0.01] * 20)
+
+    assert [c.id for c in await provider.hedged_search("boho")] == ["fast"]
+    await asyncio.sleep(0.2)
+    gc.collect()
+    assert unretrieved_task_errors == []
+
+
+async def test_timed_out_attempt_finishes_in_background(provider_api, monkeypatch):
+    monkeypatch.setattr(settings, "provider_search_timeout", 0.05)
+    provider = ScriptedProvider((0.1, ["late"]))
+
+    assert await provider.hedged_search("boho") == []
+    attempt, = provider.attempts
+    assert attempt in provider._background
+    assert [c.id for c in await attempt] == ["late"]
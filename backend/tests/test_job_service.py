@@ -0,0 +1,149 @@
+"""Job deadlines, reaping and cancellation (services/job_service.py, services/cancellation.py)."""
+
+import asyncio
+import contextvars
+from uuid import uuid4
+
+import pytest
+
+from config import settings
+from models import JobStatus
+from services.cancellation import (
+    CancellationToken,
+    JobCancelledError,
+    bind_token,
+    call_timeout,
+    check_cancelled,
+    current_token,
+)
+from services.job_service import JobService
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_reaper_cancels_jobs_past_their_deadline(monkeypatch):
+    service = JobService()
+    monkeypatch.setattr(settings, "job_deadline", 0.0)
+    job = await service.create_job(uuid4(), "hash", b"")
+    task = asyncio.create_task(asyncio.sleep(60))
+    service.attach_task(job.id, task)
+
+    assert await service.reap_jobs() == 1
+    assert job.status == JobStatus.CANCELLED
+    assert job.error_message == "deadline exceeded"
+    assert job.cancel_token.cancelled
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+
+async def test_reaper_cancels_jobs_nobody_polls():
+    service = JobService()
+    polled = await service.create_job(uuid4(), "a", b"")
+    abandoned = await service.create_job(uuid4(), "b", b"")
+    for job in (polled, abandoned):
+        job.last_seen -= settings.job_abandon_timeout + 1
+    service.touch(polled.id)
+
+    assert await service.reap_jobs() == 1
+    assert abandoned.status == JobStatus.CANCELLED
+    assert abandoned.error_message == "abandoned by client"
+    assert polled.status == JobStatus.PENDING
+
+
+async def test_reaper_leaves_finished_jobs_alone(monkeypatch):
+    service = JobService()
+    monkeypatch.setattr(settings, "job_deadline", 0.0)
+    job = await service.create_job(uuid4(), "hash", b"")
+    await service.update_job_status(job.id, JobStatus.FAILED, error_message="boom")
+
+    assert await service.reap_jobs() == 0
+    assert job.status == JobStatus.FAILED
+    assert not await service.cancel_job(job.id)
+
+
+async def test_shared_job_is_cancelled_by_its_last_client():
+    service = JobService()
+    job = await service.create_job(uuid4(), "hash", b"")
+    first, second = service.attach_client(job.id), service.attach_client(job.id)
+
+    assert not await service.detach_client(job.id, "someone-else")
+    assert await service.detach_client(job.id, first)
+    assert job.status == JobStatus.PENDING
+    assert await service.detach_client(job.id, second)
+    assert job.status == JobStatus.CANCELLED
+
+
+async def test_cancel_route(jobs, client):
+    job = await jobs.create_job(uuid4(), "hash", b"")
+    client_id = jobs.attach_client(job.id)
+    url = f"/api/v1/moodboard/{job.id}"
+
+    assert (await client.delete(f"/api/v1/moodboard/{uuid4()}", params={"client_id": client_id})).status_code == 404
+    assert (await client.delete(url)).status_code == 422
+    assert (await client.delete(url, params={"client_id": "guess"})).status_code == 403
+    assert (await client.delete(url, params={"client_id": client_id})).status_code == 204
+    assert job.status == JobStatus.CANCELLED
+
+
+async def test_cancel_route_refuses_finished_jobs(jobs, client):
+    job = await jobs.create_job(uuid4(), "hash", b"")
+    client_id = jobs.attach_client(job.id)
+    await jobs.update_job_status(job.id, JobStatus.COMPLETED, progress=100)
+
+    response = await client.delete(f"/api/v1/moodboard/{job.id}", params={"client_id": client_id})
+    assert response.status_code == 409
+    assert job.status == JobStatus.COMPLETED
+
+
+def test_checkpoints_are_no_ops_outside_a_job():
+    assert current_token() is None
+    check_cancelled()
+    assert call_timeout(5.0) == 5.0
+
+
+def test_checkpoints_raise_once_cancelled():
+    token = CancellationToken(60)
+    bind_token(token)
+    try:
+        check_cancelled()
+        assert 0 < call_timeout(5.0) <= 5.0
+        assert call_timeout(600.0) <= 60
+
+        token.cancel("cancelled by client")
+        token.cancel("second reason is ignored")
+        with pytest.raises(JobCancelledError, match="cancelled by client"):
+            check_cancelled()
+        with pytest.raises(JobCancelledError):
+            call_timeout(5.0)
+    finally:
+        bind_token(None)
+
+
+def test_expired_token_raises_deadline_exceeded():
+    token = CancellationToken(0)
+    assert token.expired and token.cancelled and token.remaining() == 0
+    with pytest.raises(JobCancelledError, match="deadline exceeded"):
+        token.check()
+
+
+def test_cancellation_passes_through_broad_exception_handlers():
+    token = CancellationToken(0)
+    with pytest.raises(asyncio.CancelledError):
+        try:
+            token.check()
+        except Exception:  # The pipeline's fallbacks must not swallow cancellation
+            pytest.fail("JobCancelledError caught as Exception")
+
+
+async def test_executor_threads_see_the_job_token():
+    token = CancellationToken(60)
+    bind_token(token)
+    try:
+        context = contextvars.copy_context()
+        loop = asyncio.get_running_loop()
+        assert await loop.run_in_executor(None, context.run, current_token) is token
+        token.cancel()
+        with pytest.raises(JobCancelledError):
+            await loop.run_in_executor(None, context.run, check_cancelled)
+    finally:
+        bind_token(None)
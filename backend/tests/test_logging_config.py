@@ -0,0 +1,71 @@
+"""Queued, job-correlated logging (config/logging_config.py)."""
+
+import asyncio
+import contextvars
+import io
+import json
+import logging
+import sys
+
+import pytest
+
+from config.logging_config import bind_job_id, configure_logging, job_id_var, shutdown_logging
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def log_output():
+    """JSON logs at INFO written to a buffer; the app's logging is restored afterwards."""
+    buffer = io.StringIO()
+    real_stdout = sys.stdout
+    sys.stdout = buffer  # configure_logging binds the handler to the current stdout
+    try:
+        configure_logging("INFO", "json")
+    finally:
+        sys.stdout = real_stdout
+
+    def records():
+        shutdown_logging()  # Flushes the queue
+        return [json.loads(line) for line in buffer.getvalue().splitlines()]
+
+    yield records
+    shutdown_logging()
+    configure_logging()
+
+
+async def test_records_carry_the_job_id_of_their_task(log_output):
+    logger = logging.getLogger("tests.logging")
+
+    async def job(job_id):
+        bind_job_id(job_id)
+        await asyncio.sleep(0)
+        logger.info("working on %s", job_id)
+
+    await asyncio.gather(job("job-a"), job("job-b"))
+    logger.info("outside any job")
+
+    records = {record["message"]: record["job_id"] for record in log_output() if record["logger"] == "tests.logging"}
+    assert records == {"working on job-a": "job-a", "working on job-b": "job-b", "outside any job": "-"}
+    assert job_id_var.get() is None  # Binding inside a task does not leak out
+
+
+async def test_executor_threads_keep_the_job_id(log_output):
+    logger = logging.getLogger("tests.logging")
+    bind_job_id("job-c")
+    try:
+        context = contextvars.copy_context()
+        await asyncio.get_running_loop().run_in_executor(None, context.run, logger.info, "from a thread")
+    finally:
+        job_id_var.set(None)
+
+    assert [r["job_id"] for r in log_output() if r["message"] == "from a thread"] == ["job-c"]
+
+
+def test_disabled_levels_are_never_formatted(log_output):
+    class Expensive:
+        def __str__(self):
+            pytest.fail("DEBUG argument formatted at INFO")
+
+    logging.getLogger("tests.logging").debug("dump: %s", Expensive())
+    assert log_output() == []
@@ -0,0 +1,69 @@
+"""Prometheus text rendering (services/metrics_service.py) and GET /metrics."""
+
+import pytest
+
+from services.metrics_service import Counter, Gauge, Histogram, _route_template
+
+pytestmark = pytest.mark.anyio
+
+
+def test_counter_and_label_escaping():
+    counter = Counter("test_total", "Things.", ("kind",))
+    counter.labels('a"b\\c\nd').inc()
+    counter.labels('a"b\\c\nd').inc(2)
+
+    assert counter.render().splitlines() == [
+        "# HELP test_total Things.",
+        "# TYPE test_total counter",
+        'test_total{kind="a\\"b\\\\c\\nd"} 3',
+    ]
+    with pytest.raises(ValueError):
+        counter.labels("too", "many")
+
+
+def test_gauge_callback_and_failing_callback():
+    gauge = Gauge("test_jobs", "Jobs.", ("status",), callback=lambda: {("running",): 2, ("done",): 0.5})
+    assert gauge.render().splitlines()[2:] == ['test_jobs{status="running"} 2', 'test_jobs{status="done"} 0.5']
+
+    def broken():
+        raise RuntimeError("pool gone")
+
+    gauge.callback = broken
+    assert gauge.render().splitlines()[2:] == []  # A broken callback must not break the scrape
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("test_seconds", "Latency.", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.labels().observe(value)
+
+    assert histogram.render().splitlines()[2:] == [
+        'test_seconds_bucket{le="0.1"} 2',
+        'test_seconds_bucket{le="1"} 3',
+        'test_seconds_bucket{le="+Inf"} 4',
+        "test_seconds_sum 3.65",
+        "test_seconds_count 4",
+    ]
+    snapshot = histogram.snapshot()[()]
+    assert snapshot["count"] == 4 and snapshot["avg"] == pytest.approx(0.9125)
+
+
+def test_route_template_collapses_path_params():
+    def endpoint():
+        pass
+
+    scope = {"endpoint": endpoint, "path": "/api/v1/moodboard/status/123", "path_params": {"job_id": "123"}}
+    assert _route_template(scope) == "/api/v1/moodboard/status/{job_id}"
+    assert _route_template({"path": "/nope"}) == "unmatched"
+
+
+async def test_metrics_endpoint_reports_requests_by_route(jobs, client):
+    await client.get("/api/v1/moodboard/status/00000000-0000-0000-0000-000000000000")
+
+    response = await client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert 'route="/api/v1/moodboard/status/{job_id}",status="404"' in body
+    assert "# TYPE moorea_jobs gauge" in body
+    assert "# TYPE moorea_pipeline_stage_duration_seconds histogram" in body
@@ -0,0 +1,199 @@
+"""Moodboard result cache and single-flight generation (services/moodboard_service.py)."""
+
+import asyncio
+import hashlib
+import io
+from datetime import datetime
+from types import SimpleNamespace
+from uuid import UUID, uuid4
+
+import pytest
+from PIL import Image
+
+from config import settings
+from models import ImageCandidate, JobStatus, MoodboardResult
+from services.cache_service import cache_service
+from services.moodboard_service import moodboard_service
+
+pytestmark = pytest.mark.anyio
+
+
+def _result(job_id, urls=("https://img/1.jpg",)) -> MoodboardResult:
+    return MoodboardResult(
+        job_id=job_id, status=JobStatus.COMPLETED, created_at=datetime(2026, 1, 1),
+        top_aesthetics=[{"name": "boho", "score": 0.9}],
+        images=[{"id": url, "url": url, "source_api": "pexels"} for url in urls],
+    )
+
+
+def _png() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (4, 4), "red").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def pipeline(monkeypatch, jobs):
+    """Replaces the pipeline with one that takes `pipeline.duration` seconds and caches its result."""
+    class Pipeline:
+        def __init__(self):
+            self.duration = 0.0
+            self.runs = []
+
+        async def __call__(self, job_id, image_content, pinterest_consent=False, image_hash=None):
+            self.runs.append(job_id)
+            await asyncio.sleep(self.duration)
+            result = _result(job_id)
+            await jobs.store_job_result(job_id, result)
+            await cache_service.set_moodboard_cache(image_hash, result.model_dump(mode="json"))
+
+    fake = Pipeline()
+    monkeypatch.setattr(moodboard_service, "_process_moodboard", fake)
+    return fake
+
+
+async def test_follower_reuses_leader_result(redis, jobs, pipeline):
+    pipeline.duration = 0.3
+    leader, follower = uuid4(), uuid4()
+    for job_id in (leader, follower):
+        await jobs.create_job(job_id, "hash", b"")
+
+    await asyncio.gather(
+        moodboard_service._run_single_flight(leader, b"", "hash"),
+        moodboard_service._run_single_flight(follower, b"", "hash"),
+    )
+    assert pipeline.runs == [leader]
+    assert (await jobs.get_job_status(follower)).status == JobStatus.COMPLETED
+    assert not await cache_service.is_locked(f"moodboard:{settings.pipeline_version}:hash")
+
+
+async def test_follower_does_not_take_over_from_a_live_leader(redis, jobs, pipeline, monkeypatch):
+    monkeypatch.setattr(settings, "moodboard_lock_ttl", 1)
+    pipeline.duration = 2.2  # Outlasts the lock TTL twice; only the heartbeat keeps the lock
+    leader, follower = uuid4(), uuid4()
+    for job_id in (leader, follower):
+        await jobs.create_job(job_id, "hash", b"")
+
+    leading = asyncio.create_task(moodboard_service._run_single_flight(leader, b"", "hash"))
+    await asyncio.sleep(0.1)
+    await moodboard_service._run_single_flight(follower, b"", "hash")
+    await leading
+
+    assert pipeline.runs == [leader]
+    result = await jobs.get_job_result(follower)
+    assert result.job_id == follower and [img.url for img in result.images] == ["https://img/1.jpg"]
+
+
+async def test_lock_heartbeat_only_extends_own_lock(redis):
+    assert await cache_service.acquire_lock("moodboard:x", "leader", 10)
+    assert await cache_service.extend_lock("moodboard:x", "leader", 60)
+    assert await redis.ttl("lock:moodboard:x") > 10
+
+    assert not await cache_service.extend_lock("moodboard:x", "someone-else", 600)
+    assert not await cache_service.acquire_lock("moodboard:x", "someone-else", 10)
+    await cache_service.release_lock("moodboard:x", "someone-else")
+    assert await cache_service.is_locked("moodboard:x")
+
+
+async def test_upload_of_cached_image_is_served_from_cache(redis, jobs, client, monkeypatch):
+    async def queue(*args, **kwargs):
+        pytest.fail("cached image sent through the pipeline")
+
+    monkeypatch.setattr(moodboard_service, "queue_generation", queue)
+    content = _png()
+    await cache_service.set_moodboard_cache(hashlib.sha256(content).hexdigest(),
+                                            _result(uuid4()).model_dump(mode="json"))
+
+    response = await client.post("/api/v1/moodboard/generate", files={"file": ("a.png", content, "image/png")})
+    body = response.json()
+    assert response.status_code == 200 and body["status"] == "completed"
+    result = await jobs.get_job_result(UUID(body["job_id"]))
+    assert result.job_id == UUID(body["job_id"]) and len(result.images) == 1
+
+
+async def test_duplicate_upload_joins_the_in_flight_job(redis, jobs, client, monkeypatch):
+    async def queue(*args, **kwargs):
+        pass
+
+    monkeypatch.setattr(moodboard_service, "queue_generation", queue)
+    upload = {"file": ("a.png", _png(), "image/png")}
+    first = (await client.post("/api/v1/moodboard/generate", files=upload)).json()
+    second = (await client.post("/api/v1/moodboard/generate", files=upload)).json()
+
+    assert second["job_id"] == first["job_id"]
+    assert second["client_id"] != first["client_id"]
+    assert len(jobs._jobs) == 1
+
+
+class TimedProvider:
+    """Stands in for a provider: each keyword answers ``n`` candidates after ``delays[keyword]`` seconds."""
+
+    def __init__(self, name, delays):
+        self.name = name
+        self.delays = delays
+        self.calls = []
+
+    async def hedged_search(self, query, n=20):
+        self.calls.append(query)
+        await asyncio.sleep(self.delays.get(query, 0.0))
+        return [ImageCandidate(id=f"{self.name}-{query}-{i}", url=f"https://{self.name}/{query}/{i}.jpg",
+                               source_api=self.name) for i in range(n)]
+
+
+@pytest.fixture
+def timed_providers(monkeypatch, provider_api):
+    """Pinterest, Unsplash and Pexels stand-ins; set ``delays`` on each before fetching."""
+    providers = [TimedProvider(name, {}) for name in ("pinterest", "unsplash", "pexels")]
+
+    async def active():
+        return providers
+
+    monkeypatch.setattr(moodboard_service, "_active_providers", active)
+    monkeypatch.setattr(settings, "near_duplicate_filter_enabled", False)
+    return providers
+
+
+def _named(*names):
+    return [SimpleNamespace(name=name) for name in names]
+
+
+def test_fetch_quotas_weight_pinterest_two_to_one(monkeypatch):
+    monkeypatch.setattr(settings, "fetch_enough_candidates", 40)
+    assert moodboard_service._fetch_quotas(_named("pinterest", "unsplash", "pexels")) == {
+        "pinterest": 20, "unsplash": 10, "pexels": 10}
+    assert moodboard_service._fetch_quotas(_named("unsplash", "pexels")) == {"unsplash": 20, "pexels": 20}
+
+    monkeypatch.setattr(settings, "fetch_enough_candidates", 30)
+    assert moodboard_service._fetch_quotas(_named("pinterest", "unsplash", "pexels")) == {
+        "pinterest": 15, "unsplash": 8, "pexels": 8}  # Rounded up
+
+
+def test_interleave_takes_two_pinterest_per_unsplash_and_pexels():
+    by_source = {name: [ImageCandidate(id=f"{name[:2]}{i}", url=f"https://{name}/{i}", source_api=name)
+                        for i in range(count)]
+                 for name, count in (("pinterest", 3), ("unsplash", 3), ("pexels", 3))}
+
+    mix = moodboard_service._interleave(by_source, 8)
+    assert [c.id for c in mix] == ["pi0", "pi1", "un0", "pe0", "pi2", "un1", "pe1", "un2"]
+    assert [c.id for c in by_source["pexels"]] == ["pe2"]  # What is left tops up after deduplication
+
+
+async def test_fetch_waits_for_pinterest_share(timed_providers):
+    pinterest = timed_providers[0]
+    pinterest.delays = {"boho": 0.1, "linen": 0.1, "rattan": 0.1}
+
+    candidates = await moodboard_service._fetch_candidates(["boho", "linen", "rattan"])
+    assert [c.source_api for c in candidates[:4]] == ["pinterest", "pinterest", "unsplash", "pexels"]
+    assert sum(c.source_api == "pinterest" for c in candidates) == settings.max_candidates // 2
+
+
+async def test_fetch_stops_once_every_provider_has_its_share(timed_providers, monkeypatch):
+    monkeypatch.setattr(settings, "fetch_enough_candidates", 16)  # Quotas 8:4:4; one call delivers 6
+    for provider in timed_providers:
+        provider.delays = {"rattan": 5.0}
+
+    started = asyncio.get_running_loop().time()
+    candidates = await moodboard_service._fetch_candidates(["boho", "linen", "rattan"])
+    assert asyncio.get_running_loop().time() - started < 1.0
+    assert not any("rattan" in c.id for c in candidates)
+    assert len(candidates) == settings.max_candidates
@@ -0,0 +1,202 @@
+"""Keyset-paginated moodboard listings and the streamed data export (services/moodboard_store.py)."""
+
+import importlib.util
+import json
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from sqlalchemy import func, select
+
+from app.main import app
+from app.routes.auth import get_current_user
+from database import AsyncSessionLocal, Moodboard, MoodboardImage, User
+from services.moodboard_store import (
+    decode_cursor,
+    encode_cursor,
+    images_for,
+    iter_moodboards,
+    list_summaries,
+    most_saved_images,
+    save_images,
+)
+
+pytestmark = pytest.mark.anyio
+
+NOW = datetime(2026, 1, 1, 12, 0, 0)
+
+
+async def _user(db_session, name="ada") -> User:
+    user = User(email=f"{name}@example.com", username=name, hashed_password="x")
+    db_session.add(user)
+    await db_session.flush()
+    return user
+
+
+async def _moodboard(db_session, user: User, created_at: datetime, images=(), legacy_images=()) -> Moodboard:
+    moodboard = Moodboard(title=f"board {created_at:%H%M%S}", aesthetic="boho", user_id=user.id,
+                          created_at=created_at, images=list(legacy_images))
+    db_session.add(moodboard)
+    await db_session.flush()
+    await save_images(db_session, moodboard.id, list(images))
+    return moodboard
+
+
+@pytest.fixture
+async def user(db):
+    async with AsyncSessionLocal() as db_session:
+        user = await _user(db_session)
+        await db_session.commit()
+    app.dependency_overrides[get_current_user] = lambda: user
+    yield user
+    app.dependency_overrides.pop(get_current_user, None)
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(NOW, 42)) == (NOW, 42)
+    for bad in ("", "not-a-cursor", encode_cursor(NOW, 42)[:-3] + "!!!"):
+        with pytest.raises(ValueError):
+            decode_cursor(bad)
+
+
+async def test_pages_split_ties_on_created_at(user):
+    async with AsyncSessionLocal() as db_session:
+        tied = [await _moodboard(db_session, user, NOW) for _ in range(5)]
+        older = await _moodboard(db_session, user, NOW - timedelta(days=1))
+        other = await _user(db_session, "grace")
+        await _moodboard(db_session, other, NOW)
+        await db_session.commit()
+
+        seen, cursor = [], None
+        while True:
+            items, cursor = await list_summaries(db_session, user.id, cursor, limit=2)
+            seen.extend(item["id"] for item in items)
+            if cursor is None:
+                break
+    assert seen == sorted((mb.id for mb in tied), reverse=True) + [older.id]
+
+
+async def test_pages_are_stable_while_boards_are_added(user):
+    async with AsyncSessionLocal() as db_session:
+        boards = [await _moodboard(db_session, user, NOW - timedelta(minutes=i)) for i in range(4)]
+        await db_session.commit()
+
+        first, cursor = await list_summaries(db_session, user.id, None, limit=2)
+        await _moodboard(db_session, user, NOW + timedelta(minutes=1))  # Lands before the cursor
+        await db_session.commit()
+        second, cursor = await list_summaries(db_session, user.id, cursor, limit=2)
+    assert [item["id"] for item in first + second] == [mb.id for mb in boards]
+    assert cursor is None
+
+
+async def test_summaries_cover_normalized_and_legacy_boards(user):
+    images = [{"id": "p1", "url": "https://img/1.jpg", "source_api": "pexels", "similarity_score": 0.9},
+              {"id": "p2", "url": "https://img/2.jpg", "source_api": "pexels"}]
+    async with AsyncSessionLocal() as db_session:
+        await _moodboard(db_session, user, NOW, images=images)
+        await _moodboard(db_session, user, NOW - timedelta(hours=1),
+                         legacy_images=[{"url": "https://img/legacy.jpg", "source": "unsplash"}])
+        await db_session.commit()
+        items, _ = await list_summaries(db_session, user.id, None, limit=10)
+
+    assert [(item["cover_image_url"], item["cover_source"], item["image_count"]) for item in items] == [
+        ("https://img/1.jpg", "pexels", 2),
+        ("https://img/legacy.jpg", "unsplash", 1),
+    ]
+
+
+async def test_listing_route_pages_and_rejects_bad_cursors(user, client):
+    async with AsyncSessionLocal() as db_session:
+        for _ in range(3):
+            await _moodboard(db_session, user, NOW)
+        await db_session.commit()
+
+    page = (await client.get("/api/v1/moodboards/", params={"limit": 2})).json()
+    assert len(page["items"]) == 2 and page["next_cursor"]
+    page = (await client.get("/api/v1/moodboards/", params={"limit": 2, "cursor": page["next_cursor"]})).json()
+    assert len(page["items"]) == 1 and page["next_cursor"] is None
+
+    response = await client.get("/api/v1/moodboards/", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+
+async def test_streamed_export_is_valid_json(user, client, monkeypatch):
+    monkeypatch.setattr("app.routes.auth.iter_moodboards",
+                        lambda user_id: iter_moodboards(user_id, batch_size=2))  # Several pages
+    async with AsyncSessionLocal() as db_session:
+        for i in range(5):
+            await _moodboard(db_session, user, NOW - timedelta(minutes=i),
+                             images=[{"id": f"p{i}", "url": f"https://img/{i}.jpg", "source_api": "pexels",
+                                      "similarity_score": i / 10}])
+        await db_session.commit()
+
+    response = await client.get("/api/v1/auth/export-data")
+    assert response.status_code == 200
+    export = json.loads(response.text)
+    assert export["user_account"]["username"] == "ada"
+    assert export["data_usage_summary"]["total_moodboards"] == 5
+    assert [mb["images"][0]["similarity_score"] for mb in export["moodboards"]] == [0.0, 0.1, 0.2, 0.3, 0.4]
+
+
+async def test_export_without_moodboards_is_valid_json(user, client):
+    export = json.loads((await client.get("/api/v1/auth/export-data")).text)
+    assert export["moodboards"] == []
+
+
+def _saved(i, source="pexels"):
+    return {"id": f"p{i}", "url": f"https://img/{i}.jpg", "source_api": source}
+
+
+async def test_most_saved_counts_each_board_once_and_skips_uploads(user):
+    async with AsyncSessionLocal() as db_session:
+        other = await _user(db_session, "grace")
+        await _moodboard(db_session, user, NOW, images=[_saved(1), _saved(1), _saved(2)])  # p1 twice in one board
+        await _moodboard(db_session, other, NOW, images=[_saved(2), _saved(1)])
+        await _moodboard(db_session, other, NOW, images=[_saved(2), _saved(9, "original_upload")])
+        await db_session.commit()
+        top = await most_saved_images(db_session, limit=10)
+
+    assert [(image["url"], image["saves"]) for image in top] == [("https://img/2.jpg", 3), ("https://img/1.jpg", 2)]
+
+
+async def test_most_saved_route_requires_a_signed_in_user(db, client):
+    response = await client.get("/api/v1/metrics/most-saved-images")
+    assert response.status_code == 401
+
+
+async def test_most_saved_route_for_signed_in_users(user, client):
+    async with AsyncSessionLocal() as db_session:
+        await _moodboard(db_session, user, NOW, images=[_saved(1)])
+        await db_session.commit()
+
+    response = await client.get("/api/v1/metrics/most-saved-images", params={"limit": 5})
+    assert response.status_code == 200
+    assert [(image["url"], image["saves"]) for image in response.json()["images"]] == [("https://img/1.jpg", 1)]
+
+
+def _migration_script():
+    path = Path(__file__).resolve().parents[1] / "scripts" / "migrate_moodboard_images.py"
+    spec = importlib.util.spec_from_file_location("migrate_moodboard_images", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+async def test_migration_moves_inline_images_and_can_be_rerun(user):
+    legacy = [_saved(1), _saved(2), _saved(1)]
+    async with AsyncSessionLocal() as db_session:
+        old = [await _moodboard(db_session, user, NOW - timedelta(minutes=i), legacy_images=legacy) for i in range(3)]
+        new = await _moodboard(db_session, user, NOW, images=[_saved(3)])
+        await db_session.commit()
+        before = await images_for(db_session, old + [new])
+
+    migrate = _migration_script()
+    await migrate.main(batch_size=2)
+    await migrate.main(batch_size=2)  # Nothing left to do
+
+    async with AsyncSessionLocal() as db_session:
+        boards = (await db_session.scalars(select(Moodboard).order_by(Moodboard.id))).all()
+        assert all(board.images == [] for board in boards)
+        assert await images_for(db_session, boards) == before
+        rows = await db_session.scalar(select(func.count()).select_from(MoodboardImage))
+    assert rows == 3 * len(legacy) + 1
@@ -0,0 +1,129 @@
+"""Pinterest board index, concurrent board crawling and search pagination (services/pinterest_client.py)."""
+
+import asyncio
+
+import httpx
+import pytest
+
+from config import settings
+from services.cache_service import cache_service
+from services.pinterest_client import PinterestAPIClient
+from services.pinterest_oauth_service import PinterestOAuthService
+
+pytestmark = pytest.mark.anyio
+
+
+def _pins(*ids):
+    return [{"id": i, "media": {"images": {"600x": {"url": f"https://i.pinimg/{i}.jpg"}}}} for i in ids]
+
+
+BOARDS = [
+    {"id": "b1", "name": "Boho living", "description": "rattan and linen", "pin_count": 5},
+    {"id": "b2", "name": "Gorpcore", "description": "", "pin_count": 50},
+    {"id": "b3", "name": "Boho outfits", "description": "", "pin_count": 20},
+    {"id": "b4", "name": "Recipes", "description": "", "pin_count": 80},
+]
+
+
+@pytest.fixture
+def pinterest(provider_api):
+    client = PinterestAPIClient()
+    client.oauth_service = PinterestOAuthService()
+    client.oauth_service._access_token = "token"
+    return client
+
+
+def _board_api(provider_api, pages=(BOARDS,), pin_delay=0.0):
+    """Serves the board list in ``pages`` (chained by bookmarks) and a few pins per board."""
+    state = {"in_flight": 0, "peak": 0}
+
+    async def handle(request):
+        path = request.url.path
+        if path == "/v5/boards":
+            page = int(request.url.params.get("bookmark", 0))
+            bookmark = str(page + 1) if page + 1 < len(pages) else None
+            return httpx.Response(200, json={"items": pages[page], "bookmark": bookmark})
+        board = path.split("/")[3]
+        state["in_flight"] += 1
+        state["peak"] = max(state["peak"], state["in_flight"])
+        await asyncio.sleep(pin_delay)
+        state["in_flight"] -= 1
+        return httpx.Response(200, json={"items": _pins(f"{board}-1", f"{board}-2")})
+
+    provider_api.handler = handle
+    return state
+
+
+def _board_pin_requests(provider_api):
+    return [r.url.path for r in provider_api.requests if r.url.path.endswith("/pins")]
+
+
+async def test_board_list_follows_bookmarks_and_is_cached(redis, pinterest, provider_api, monkeypatch):
+    monkeypatch.setattr(settings, "pinterest_prefetch_boards", 0)
+    _board_api(provider_api, pages=(BOARDS[:2], BOARDS[2:]))
+
+    boards = await pinterest.list_boards()
+    assert [b["id"] for b in boards] == ["b1", "b2", "b3", "b4"]
+    assert boards[0] == {"id": "b1", "name": "Boho living", "text": "boho living rattan and linen", "pin_count": 5}
+    assert [r.url.params.get("bookmark") for r in provider_api.requests] == [None, "1"]
+
+    assert await pinterest.list_boards() == boards
+    assert len(provider_api.requests) == 2
+
+
+async def test_boards_rank_by_matching_words_then_size(pinterest, monkeypatch):
+    monkeypatch.setattr(settings, "pinterest_boards_per_search", 2)
+    boards = [{**b, "text": f"{b['name']} {b['description']}".lower()} for b in BOARDS]
+
+    assert [(score, b["id"]) for score, b in pinterest.rank_boards(boards, "boho linen")] == [(2, "b1"), (1, "b3")]
+    assert [b["id"] for _, b in pinterest.rank_boards(boards, "cottagecore")] == ["b4", "b2"]  # Largest boards
+
+
+async def test_board_pins_are_fetched_concurrently(redis, pinterest, provider_api, monkeypatch):
+    monkeypatch.setattr(settings, "pinterest_prefetch_boards", 0)
+    state = _board_api(provider_api, pin_delay=0.05)
+
+    images = await pinterest.search_boards_for_pins("boho", max_images=4)
+    assert [c.id for c in images] == ["b1-1", "b1-2", "b3-1", "b3-2"]
+    assert images[0].pinterest_board == "Boho living" and images[0].source_api == "pinterest"
+    assert state["peak"] == 2
+
+
+async def test_board_crawl_respects_the_pinterest_concurrency_policy(redis, pinterest, provider_api, monkeypatch):
+    monkeypatch.setattr(settings, "pinterest_prefetch_boards", 0)
+    monkeypatch.setattr(settings, "pinterest_boards_per_search", 10)
+    many = [{"id": f"b{i}", "name": f"Board {i}", "pin_count": i} for i in range(10)]
+    state = _board_api(provider_api, pages=(many,), pin_delay=0.02)
+
+    await pinterest.search_boards_for_pins("anything", max_images=40)
+    assert len(_board_pin_requests(provider_api)) == 10
+    assert state["peak"] == pinterest.policy.max_concurrency
+
+
+async def test_listing_prefetches_the_largest_boards(redis, pinterest, provider_api, monkeypatch):
+    monkeypatch.setattr(settings, "pinterest_prefetch_boards", 2)
+    monkeypatch.setattr(settings, "pinterest_boards_per_search", 2)
+    _board_api(provider_api)
+
+    await pinterest.list_boards()
+    await asyncio.gather(*pinterest._background)
+    assert sorted(_board_pin_requests(provider_api)) == ["/v5/boards/b2/pins", "/v5/boards/b4/pins"]
+    assert await cache_service.get_pinterest_board_pins("b4")
+
+    images = await pinterest.search_boards_for_pins("cottagecore", max_images=4)  # No match: largest boards
+    assert [c.id for c in images] == ["b4-1", "b4-2", "b2-1", "b2-2"]
+    assert len(_board_pin_requests(provider_api)) == 2  # Served from the prefetched cache
+
+
+async def test_search_follows_bookmarks_until_enough(pinterest, provider_api):
+    pages = {None: (_pins("p1", "p2"), "next"), "next": (_pins("p3", "p4"), "last")}
+
+    def handle(request):
+        items, bookmark = pages[request.url.params.get("bookmark")]
+        return httpx.Response(200, json={"items": items, "bookmark": bookmark})
+
+    provider_api.handler = handle
+    images, bookmark = await pinterest.search_and_extract_page("boho", max_images=3)
+    assert [c.id for c in images] == ["p1", "p2", "p3"]
+    assert bookmark == "last"
+    assert [r.url.params["limit"] for r in provider_api.requests] == ["3", "1"]
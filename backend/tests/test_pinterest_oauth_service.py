@@ -0,0 +1,73 @@
+"""Pinterest token state and authenticated requests (services/pinterest_oauth_service.py)."""
+
+import httpx
+import pytest
+
+from config import settings
+from services.pinterest_oauth_service import ACCESS_TOKEN_KEY, REFRESH_TOKEN_KEY, PinterestOAuthService
+from services.rate_limiter import RateLimitedError, rate_limiter
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def env_tokens(monkeypatch):
+    monkeypatch.setattr(settings, "pinterest_access_token", "env-access")
+    monkeypatch.setattr(settings, "pinterest_refresh_token", "env-refresh")
+
+
+async def test_environment_tokens_load_without_printing(env_tokens, capsys):
+    oauth = PinterestOAuthService()
+    assert oauth.get_access_token() == "env-access" and oauth.has_credentials()
+    assert capsys.readouterr().out == ""
+
+
+async def test_redis_tokens_win_over_the_environment(redis, env_tokens):
+    await redis.set(ACCESS_TOKEN_KEY, "refreshed-access", ex=600)
+    await redis.set(REFRESH_TOKEN_KEY, "rotated-refresh")
+    oauth = PinterestOAuthService()
+
+    await oauth.load_tokens()
+    assert oauth.get_access_token() == "refreshed-access"
+    assert oauth._refresh_token == "rotated-refresh"
+
+
+async def test_environment_tokens_seed_an_empty_redis(redis, env_tokens):
+    await PinterestOAuthService().load_tokens()
+    assert await redis.get(ACCESS_TOKEN_KEY) == "env-access"
+    assert await redis.get(REFRESH_TOKEN_KEY) == "env-refresh"
+
+
+@pytest.fixture
+def expired_token_api(provider_api):
+    """Answers 401 to the old token, issues a new one on refresh and 200 to it."""
+    def handle(request):
+        if request.url.path == "/v5/oauth/token":
+            return httpx.Response(200, json={"access_token": "new", "expires_in": 86400})
+        if request.headers["Authorization"] == "Bearer new":
+            return httpx.Response(200, json={"id": "me"})
+        return httpx.Response(401, json={"message": "expired"})
+
+    provider_api.handler = handle
+    oauth = PinterestOAuthService()
+    oauth._access_token, oauth._refresh_token = "old", "refresh"
+    return oauth
+
+
+def _api_calls(provider_api):
+    return [r.headers["Authorization"] for r in provider_api.requests if r.url.path != "/v5/oauth/token"]
+
+
+async def test_refreshes_once_and_retries_after_401(expired_token_api, provider_api):
+    assert await expired_token_api.make_authenticated_request("GET", "/v5/user_account") == {"id": "me"}
+    assert _api_calls(provider_api) == ["Bearer old", "Bearer new"]
+    assert expired_token_api.get_access_token() == "new"
+
+
+async def test_retry_after_401_is_charged_to_the_rate_budget(expired_token_api, provider_api, monkeypatch):
+    monkeypatch.setattr(settings, "pinterest_hourly_quota", 1)
+    assert await rate_limiter.acquire("pinterest")  # The first call's budget, as the client spends it
+
+    with pytest.raises(RateLimitedError):
+        await expired_token_api.make_authenticated_request("GET", "/v5/user_account")
+    assert _api_calls(provider_api) == ["Bearer old"]
@@ -0,0 +1,127 @@
+"""Provider token buckets and 429 backoff (services/rate_limiter.py), with Redis and in-process."""
+
+import pytest
+
+from config import settings
+from services import rate_limiter as rate_limiter_module
+from services.rate_limiter import RateLimiter
+
+pytestmark = pytest.mark.anyio
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limiter_module, "time", clock)
+    return clock
+
+
+@pytest.fixture(params=["redis", "in-process"])
+def limiter(request):
+    if request.param == "redis":
+        request.getfixturevalue("redis")
+    return RateLimiter()
+
+
+async def test_bucket_drains_and_refills(limiter, clock, monkeypatch):
+    monkeypatch.setattr(settings, "pexels_hourly_quota", 360)  # One token every 10s
+    for _ in range(360):
+        assert await limiter.acquire("pexels")
+    assert not await limiter.acquire("pexels")
+    assert not await limiter.has_budget("pexels")
+
+    clock.now += 10
+    assert await limiter.has_budget("pexels")  # Peeking does not spend
+    assert await limiter.acquire("pexels")
+    assert not await limiter.acquire("pexels")
+
+    clock.now += 36000  # Refill stops at capacity
+    assert await limiter.remaining("pexels") == 360
+
+
+async def test_reported_remaining_clamps_the_bucket(limiter, clock):
+    await limiter.observe_response("pexels", 200, {"x-ratelimit-remaining": "5"})
+    assert await limiter.remaining("pexels") == 5
+
+    await limiter.observe_response("pexels", 200, {"x-ratelimit-remaining": "150"})
+    assert await limiter.remaining("pexels") == 5  # Only ever lowered by headers
+
+    await limiter.observe_response("pexels", 200, {"x-ratelimit-remaining": "garbage"})
+    assert await limiter.remaining("pexels") == 5
+
+
+async def test_unconfigured_quota_is_learned_from_headers(limiter, clock, monkeypatch):
+    monkeypatch.setattr(settings, "unsplash_hourly_quota", None)
+    assert (await limiter.status("unsplash"))["remaining"] is None
+    assert await limiter.acquire("unsplash")
+
+    await limiter.observe_response("unsplash", 200, {"x-ratelimit-limit": "50", "x-ratelimit-remaining": "49"})
+    status = await limiter.status("unsplash")
+    assert status["hourly_quota"] == 50 and status["remaining"] == 49
+
+
+async def test_429_backs_off_exponentially(limiter, clock):
+    await limiter.observe_response("pexels", 429, {})
+    assert await limiter.backoff_remaining("pexels") == pytest.approx(settings.provider_backoff_base, abs=1)
+    assert not await limiter.acquire("pexels")
+    assert await limiter.remaining("pexels") == 0
+
+    await limiter.observe_response("pexels", 429, {})
+    assert await limiter.backoff_remaining("pexels") == pytest.approx(2 * settings.provider_backoff_base, abs=1)
+
+
+async def test_retry_after_and_exhausted_remaining(limiter, clock):
+    await limiter.observe_response("flickr", 429, {"retry-after": "7"})
+    assert await limiter.backoff_remaining("flickr") == pytest.approx(7, abs=1)
+
+    await limiter.observe_response(
+        "pexels", 200, {"x-ratelimit-remaining": "0", "x-ratelimit-reset": str(clock.now + 120)},
+    )
+    assert await limiter.backoff_remaining("pexels") == pytest.approx(120, abs=1)
+
+
+async def test_success_resets_strikes(limiter, clock):
+    await limiter.observe_response("pexels", 429, {})
+    await limiter.observe_response("pexels", 429, {})
+    await limiter.observe_response("pexels", 200, {})
+    assert "pexels" not in limiter._strikes
+
+    await limiter.observe_response("pexels", 429, {})
+    assert await limiter.backoff_remaining("pexels") == pytest.approx(settings.provider_backoff_base, abs=1)
+
+
+async def test_workers_share_buckets_and_strikes_through_redis(redis, clock, monkeypatch):
+    monkeypatch.setattr(settings, "pexels_hourly_quota", 2)
+    first, second = RateLimiter(), RateLimiter()
+    assert await first.acquire("pexels")
+    assert await second.acquire("pexels")
+    assert not await first.acquire("pexels")
+
+    await first.observe_response("flickr", 429, {})
+    await second.observe_response("flickr", 429, {})
+    assert await redis.get("ratelimit:flickr:strikes") == "2"
+    assert await first.backoff_remaining("flickr") == pytest.approx(2 * settings.provider_backoff_base, abs=1)
+
+    await second.observe_response("flickr", 200, {})
+    assert await redis.get("ratelimit:flickr:strikes") is None
+
+
+async def test_falls_back_to_local_buckets_on_redis_errors(redis, clock, monkeypatch):
+    async def broken(*args, **kwargs):
+        raise ConnectionError("redis down")
+
+    monkeypatch.setattr(redis, "eval", broken)
+    monkeypatch.setattr(redis, "pttl", broken)
+    monkeypatch.setattr(settings, "pexels_hourly_quota", 1)
+    limiter = RateLimiter()
+    assert await limiter.acquire("pexels")
+    assert not await limiter.acquire("pexels")
+    assert "pexels" in limiter._buckets
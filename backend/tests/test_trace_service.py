@@ -0,0 +1,75 @@
+"""Per-stage pipeline timing (services/trace_service.py) and where it is reported."""
+
+import asyncio
+from uuid import uuid4
+
+import pytest
+
+from models import AestheticScore, ImageCandidate
+from services.moodboard_service import moodboard_service
+from services.trace_service import PipelineTrace, trace_service
+
+pytestmark = pytest.mark.anyio
+
+
+def _count(stage: str) -> int:
+    return trace_service.snapshot().get(stage, {}).get("count", 0)
+
+
+async def test_spans_sum_per_name_in_first_seen_order():
+    trace = PipelineTrace()
+    observed = _count("test.fetch.pexels")
+    with trace.span("test.classify"):
+        pass
+    for _ in range(3):
+        await trace.timed("test.fetch.pexels", asyncio.sleep(0.01))
+
+    breakdown = trace.breakdown()
+    assert list(breakdown) == ["test.classify", "test.fetch.pexels"]
+    assert breakdown["test.fetch.pexels"] >= 0.03
+    assert _count("test.fetch.pexels") == observed + 3  # Every span is observed on its own
+    assert trace.elapsed >= breakdown["test.fetch.pexels"]
+
+
+async def test_failed_spans_are_still_timed():
+    trace = PipelineTrace()
+
+    async def boom():
+        raise RuntimeError("provider down")
+
+    with pytest.raises(RuntimeError):
+        await trace.timed("test.failing", boom())
+    assert "test.failing" in trace.breakdown()
+
+
+async def test_pipeline_reports_stage_timings_and_processing_time(redis, jobs, client, monkeypatch):
+    async def classify(image_content):
+        await asyncio.sleep(0.02)
+        return [AestheticScore(name="boho", score=0.9)]
+
+    async def keywords(aesthetics):
+        return ["boho dress"], []
+
+    async def fetch(keywords, pinterest_consent=False, trace=None, pages=None):
+        await trace.timed("fetch.pexels", asyncio.sleep(0.01))
+        return [ImageCandidate(id="1", url="https://img/1.jpg", source_api="pexels")]
+
+    async def rerank(image_content, candidates, trace=None):
+        return candidates
+
+    for name, fake in (("_classify_aesthetics", classify), ("_expand_keywords", keywords),
+                       ("_fetch_candidates", fetch), ("_rerank_candidates", rerank)):
+        monkeypatch.setattr(moodboard_service, name, fake)
+    job_id = uuid4()
+    await jobs.create_job(job_id, "hash", b"")
+
+    await moodboard_service._process_moodboard(job_id, b"", image_hash="hash")
+
+    result = await jobs.get_job_result(job_id)
+    timings = (await client.get(f"/api/v1/moodboard/status/{job_id}")).json()["stage_timings"]
+    assert list(timings) == ["classify", "keywords", "fetch.pexels", "fetch", "rerank"]
+    assert timings["classify"] >= 0.02
+    assert result.processing_time >= timings["classify"] + timings["fetch"]
+
+    stages = (await client.get("/api/v1/metrics/pipeline")).json()["stages"]
+    assert stages["classify"]["count"] >= 1 and stages["total"]["count"] >= 1
@@ -0,0 +1,87 @@
+"""Waitlist signup route, bulk import and launch notifier (services/waitlist_service.py)."""
+
+import pytest
+from sqlalchemy import select
+
+from database import AsyncSessionLocal, WaitlistUser
+from services.waitlist_service import LogMailer, WaitlistNotifier, bulk_import, get_mailer
+
+pytestmark = pytest.mark.anyio
+
+
+class FlakyMailer(LogMailer):
+    """Fails every send to the given addresses."""
+
+    def __init__(self, failing):
+        super().__init__()
+        self.failing = set(failing)
+
+    async def send(self, message) -> None:
+        if message["To"] in self.failing:
+            raise ConnectionError("relay refused")
+        await super().send(message)
+
+
+async def _notified():
+    async with AsyncSessionLocal() as db_session:
+        return dict((await db_session.execute(select(WaitlistUser.email, WaitlistUser.notified))).all())
+
+
+async def test_subscribe_rejects_duplicate_emails(db, client):
+    response = await client.post("/api/v1/waitlist/subscribe", json={"email": "ada@example.com", "name": "Ada"})
+    assert response.status_code == 200 and response.json()["success"]
+
+    response = await client.post("/api/v1/waitlist/subscribe", json={"email": "ada@example.com"})
+    assert response.status_code == 400
+    assert "already on the waitlist" in response.json()["detail"]
+
+    response = await client.post("/api/v1/waitlist/subscribe", json={"email": "not-an-email"})
+    assert response.status_code == 422
+
+
+async def test_bulk_import_counts(db, monkeypatch):
+    monkeypatch.setattr("services.waitlist_service.IMPORT_CHUNK_SIZE", 2)  # Several INSERT statements
+    first = await bulk_import([("ada@example.com", "Ada"), ("grace@example.com", None), ("nope", "x")])
+    assert first == {"added": 2, "already_listed": 0, "invalid": 1}
+
+    second = await bulk_import([
+        (" ada@example.com ", "Ada again"),  # Already listed (after normalization)
+        ("linus@example.com", ""),
+        ("linus@example.com", "Duplicate within the file"),
+        ("margaret@example.com", "Margaret"),
+        (None, None),
+    ])
+    assert second == {"added": 2, "already_listed": 1, "invalid": 1}
+
+    async with AsyncSessionLocal() as db_session:
+        names = dict((await db_session.execute(select(WaitlistUser.email, WaitlistUser.name))).all())
+    assert names == {"ada@example.com": "Ada", "grace@example.com": None,
+                     "linus@example.com": None, "margaret@example.com": "Margaret"}
+
+
+async def test_notifier_retries_only_failed_sends(db):
+    emails = [f"user{i}@example.com" for i in range(7)]
+    await bulk_import([(email, None) for email in emails])
+
+    flaky = FlakyMailer(failing={"user1@example.com", "user5@example.com"})
+    notifier = WaitlistNotifier(flaky, batch_size=3, concurrency=2)
+    assert await notifier.pending() == 7
+    assert await notifier.run() == {"sent": 5, "failed": 2}
+    assert sorted(flaky.sent) == sorted(set(emails) - flaky.failing)
+    assert await notifier.pending() == 2
+    assert sorted(email for email, notified in (await _notified()).items() if not notified) == [
+        "user1@example.com", "user5@example.com"]
+
+    retry = LogMailer()
+    assert await WaitlistNotifier(retry, batch_size=3).run() == {"sent": 2, "failed": 0}
+    assert sorted(retry.sent) == ["user1@example.com", "user5@example.com"]
+    assert await WaitlistNotifier(LogMailer()).run() == {"sent": 0, "failed": 0}
+
+
+def test_get_mailer(monkeypatch):
+    assert isinstance(get_mailer("log"), LogMailer)
+    monkeypatch.setattr("services.waitlist_service.settings.smtp_host", None)
+    with pytest.raises(ValueError):
+        get_mailer("smtp")
+    with pytest.raises(ValueError):
+        get_mailer("carrier-pigeon")
@@ -5,7 +5,7 @@ import MoodboardDisplay from '../components/MoodboardDisplay';
 import AuthModal from '../components/AuthModal';
 import UserMenu from '../components/UserMenu';
 import SaveMoodboard from '../components/SaveMoodboard';
-import { uploadImage, getJobStatus, getMoodboardResult } from '../utils/api';
+import { uploadImage, getJobStatus, getMoodboardResult, cancelJob } from '../utils/api';
 import { JobStatus, MoodboardState } from '../types';
 import { useAuth } from '../contexts/AuthContext';
 import PinterestLoginButton from '../components/PinterestLoginButton';
@@ -32,6 +32,7 @@ const Home: React.FC = () => {
       
       setMoodboardState({
         jobId: response.job_id,
+        clientId: response.client_id,
         status: response.status as JobStatus
       });
 
@@ -79,13 +80,13 @@ const Home: React.FC = () => {
             ...prev,
             result
           }));
-        } else if (statusResponse.status === JobStatus.FAILED) {
+        } else if (statusResponse.status === JobStatus.FAILED || statusResponse.status === JobStatus.CANCELLED) {
           setMoodboardState(prev => ({
             ...prev,
             error: statusResponse.error_message || 'Processing failed'
           }));
-        } else if (statusResponse.status === JobStatus.PROCESSING && attempts < maxAttempts) {
-          // Continue polling
+        } else if ((statusResponse.status === JobStatus.PENDING || statusResponse.status === JobStatus.PROCESSING) && attempts < maxAttempts) {
+          // Continue polling (the backend cancels jobs nobody polls)
           setTimeout(poll, 5000); // Poll every 5 seconds
         } else if (attempts >= maxAttempts) {
           setMoodboardState(prev => ({
@@ -113,6 +114,10 @@ const Home: React.FC = () => {
   };
 
   const handleNewSession = () => {
+    // Free the backend worker if the previous moodboard is still generating
+    if (moodboardState.jobId && moodboardState.clientId && (moodboardState.status === JobStatus.PENDING || moodboardState.status === JobStatus.PROCESSING)) {
+      cancelJob(moodboardState.jobId, moodboardState.clientId).catch(() => {});
+    }
     setMoodboardState({ status: JobStatus.PENDING });
     setUploadedFile(null); // Clear the uploaded file for new session
   };
@@ -245,7 +250,7 @@ const Home: React.FC = () => {
           )}
 
           {/* Failed State */}
-          {moodboardState.status === JobStatus.FAILED && (
+          {(moodboardState.status === JobStatus.FAILED || moodboardState.status === JobStatus.CANCELLED) && (
             <div className="text-center py-12 animate-fade-in">
               <span className="text-4xl mb-4 block">😞</span>
               <h2 className="text-xl font-semibold text-gray-900 mb-3">
@@ -2,12 +2,14 @@ import React, { useState, useEffect } from 'react';
 import { Link } from 'react-router-dom';
 import { useAuth } from '../contexts/AuthContext';
 import { getUserMoodboards } from '../utils/api';
-import { SavedMoodboard } from '../types';
+import { SavedMoodboardSummary } from '../types';
 
 const SavedMoodboards: React.FC = () => {
   const { token, isAuthenticated } = useAuth();
-  const [moodboards, setMoodboards] = useState<SavedMoodboard[]>([]);
+  const [moodboards, setMoodboards] = useState<SavedMoodboardSummary[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [isLoading, setIsLoading] = useState(true);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
   const [error, setError] = useState<string | null>(null);
 
   useEffect(() => {
@@ -20,8 +22,9 @@ const SavedMoodboards: React.FC = () => {
       try {
         setIsLoading(true);
         setError(null);
-        const savedMoodboards = await getUserMoodboards(token);
-        setMoodboards(savedMoodboards);
+        const page = await getUserMoodboards(token);
+        setMoodboards(page.items);
+        setNextCursor(page.next_cursor ?? null);
       } catch (err: any) {
         console.error('Failed to fetch saved moodboards:', err);
         setError(err.response?.data?.detail || 'Failed to load saved moodboards.');
@@ -33,6 +36,21 @@ const SavedMoodboards: React.FC = () => {
     fetchMoodboards();
   }, [isAuthenticated, token]);
 
+  const loadMore = async () => {
+    if (!token || !nextCursor) return;
+    try {
+      setIsLoadingMore(true);
+      const page = await getUserMoodboards(token, nextCursor);
+      setMoodboards((current) => [...current, ...page.items]);
+      setNextCursor(page.next_cursor ?? null);
+    } catch (err: any) {
+      console.error('Failed to load more moodboards:', err);
+      setError(err.response?.data?.detail || 'Failed to load saved moodboards.');
+    } finally {
+      setIsLoadingMore(false);
+    }
+  };
+
   if (!isAuthenticated) {
     return (
       <div className="min-h-screen gradient-bg p-4 md:p-8">
@@ -91,7 +109,7 @@ const SavedMoodboards: React.FC = () => {
           <p className="text-lg md:text-xl text-white font-medium">
             {moodboards.length === 0 
               ? "No saved moodboards yet" 
-              : `You have ${moodboards.length} saved moodboard${moodboards.length === 1 ? '' : 's'}`
+              : `You have ${moodboards.length}${nextCursor ? '+' : ''} saved moodboard${moodboards.length === 1 ? '' : 's'}`
             }
           </p>
         </div>
@@ -118,94 +136,31 @@ const SavedMoodboards: React.FC = () => {
           <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6">
             {moodboards.map((moodboard) => (
               <div key={moodboard.id} className="card hover:shadow-xl transition-all duration-200">
-                {/* Moodboard Preview */}
+                {/* Moodboard Preview - cover image (the original upload) */}
                 <div className="mb-4">
-                  <div className="grid grid-cols-3 gap-1 rounded-lg overflow-hidden">
-                    {/* Top row: images 1-3 */}
-                    {moodboard.images.slice(1, 4).map((image, index) => {
-                      const imgAny: any = image as any;
-                      const srcApi = imgAny.source_api || imgAny.source || '';
-                      const isPinterest = typeof srcApi === 'string' && srcApi.toLowerCase().includes('pinterest');
-                      const linkUrl = imgAny.pinterest_url || imgAny.source_url || (isPinterest ? imgAny.url : null);
-                      const ImgEl = (
-                        <img
-                          src={image.url}
-                          alt={`${moodboard.title} preview ${index + 1}`}
-                          className="w-full h-full object-cover"
-                          loading="lazy"
-                        />
-                      );
-
-                      return (
-                        <div key={index} className="aspect-square bg-gray-100">
-                          {linkUrl ? (
-                            <a href={linkUrl} target="_blank" rel="noopener noreferrer" title="View on Pinterest">
-                              {ImgEl}
-                            </a>
-                          ) : (
-                            ImgEl
-                          )}
-                        </div>
-                      );
-                    })}
-                    {/* Center position - show original uploaded image */}
-                    <div className="aspect-square bg-gray-100 relative">
-                      {moodboard.images.length > 0 && (
-                        (() => {
-                          const img: any = moodboard.images[0] as any;
-                          const srcApi = img.source_api || img.source || '';
-                          const isPinterest = typeof srcApi === 'string' && srcApi.toLowerCase().includes('pinterest');
-                          const linkUrl = img.pinterest_url || img.source_url || (isPinterest ? img.url : null);
-                          const ImgEl = (
-                            <img
-                              src={img.url}
-                              alt={`${moodboard.title} original`}
-                              className="w-full h-full object-cover"
-                              loading="lazy"
-                            />
-                          );
-
-                          return linkUrl ? (
-                            <a href={linkUrl} target="_blank" rel="noopener noreferrer" title="View on Pinterest">
-                              {ImgEl}
-                            </a>
-                          ) : (
-                            ImgEl
-                          );
-                        })()
-                      )}
-                      {/* Add a subtle indicator that this is the original */}
-                      <div className="absolute top-1 right-1 bg-white/80 rounded-full p-1">
-                        <span className="text-xs">📸</span>
-                      </div>
-                    </div>
-                    {/* Bottom row: images 4-6 */}
-                    {moodboard.images.slice(4, 7).map((image, index) => {
-                      const imgAny: any = image as any;
-                      const srcApi = imgAny.source_api || imgAny.source || '';
-                      const isPinterest = typeof srcApi === 'string' && srcApi.toLowerCase().includes('pinterest');
-                      const linkUrl = imgAny.pinterest_url || imgAny.source_url || (isPinterest ? imgAny.url : null);
-                      const ImgEl = (
-                        <img
-                          src={image.url}
-                          alt={`${moodboard.title} preview ${index + 4}`}
-                          className="w-full h-full object-cover"
-                          loading="lazy"
-                        />
-                      );
-
-                      return (
-                        <div key={index + 4} className="aspect-square bg-gray-100">
-                          {linkUrl ? (
-                            <a href={linkUrl} target="_blank" rel="noopener noreferrer" title="View on Pinterest">
-                              {ImgEl}
-                            </a>
-                          ) : (
-                            ImgEl
-                          )}
-                        </div>
-                      );
-                    })}
+                  <div className="aspect-square bg-gray-100 rounded-lg overflow-hidden relative">
+                    {moodboard.cover_image_url && (
+                      (() => {
+                        const isPinterest = (moodboard.cover_source || '').toLowerCase().includes('pinterest');
+                        const linkUrl = moodboard.cover_link_url || (isPinterest ? moodboard.cover_image_url : null);
+                        const ImgEl = (
+                          <img
+                            src={moodboard.cover_image_url}
+                            alt={`${moodboard.title} cover`}
+                            className="w-full h-full object-cover"
+                            loading="lazy"
+                          />
+                        );
+
+                        return linkUrl ? (
+                          <a href={linkUrl} target="_blank" rel="noopener noreferrer" title="View on Pinterest">
+                            {ImgEl}
+                          </a>
+                        ) : (
+                          ImgEl
+                        );
+                      })()
+                    )}
                   </div>
                 </div>
 
@@ -221,13 +176,10 @@ const SavedMoodboards: React.FC = () => {
                     </p>
                   )}
 
-                  {/* Attribution note when Pinterest images are present */}
-                  {moodboard.images && moodboard.images.some((img: any) => {
-                    const srcApi = (img as any).source_api || (img as any).source || '';
-                    return typeof srcApi === 'string' && srcApi.toLowerCase().includes('pinterest');
-                  }) && (
+                  {/* Attribution note when the cover comes from Pinterest */}
+                  {(moodboard.cover_source || '').toLowerCase().includes('pinterest') && (
                     <p className="text-xs text-gray-500 mt-1">
-                      Some images are sourced from Pinterest — click images to view the original Pin on Pinterest.
+                      The cover image is sourced from Pinterest — click it to view the original Pin on Pinterest.
                     </p>
                   )}
 
@@ -242,7 +194,7 @@ const SavedMoodboards: React.FC = () => {
 
                   <div className="pt-2 border-t border-gray-200">
                     <div className="flex justify-between items-center text-sm text-gray-600">
-                      <span>{moodboard.images.length} images</span>
+                      <span>{moodboard.image_count} images</span>
                       <button className="text-purple-600 hover:text-purple-800 font-medium">
                         View Full Moodboard
                       </button>
@@ -254,6 +206,18 @@ const SavedMoodboards: React.FC = () => {
           </div>
         )}
 
+        {nextCursor && (
+          <div className="text-center mt-8">
+            <button
+              onClick={loadMore}
+              disabled={isLoadingMore}
+              className="btn-primary inline-flex items-center gap-2"
+            >
+              {isLoadingMore ? 'Loading...' : 'Load more'}
+            </button>
+          </div>
+        )}
+
         {/* Back to Home Link */}
         <div className="text-center mt-8">
           <Link 
@@ -23,13 +23,15 @@ export enum JobStatus {
   PENDING = "pending",
   PROCESSING = "processing", 
   COMPLETED = "completed",
-  FAILED = "failed"
+  FAILED = "failed",
+  CANCELLED = "cancelled"
 }
 
 export interface MoodboardResponse {
   job_id: string;
   status: JobStatus;
   message: string;
+  client_id?: string;
 }
 
 export interface JobStatusResponse {
@@ -39,6 +41,7 @@ export interface JobStatusResponse {
   created_at: string;
   completed_at?: string;
   error_message?: string;
+  stage_timings?: Record<string, number>;
 }
 
 export interface MoodboardResult {
@@ -59,6 +62,7 @@ export interface UploadState {
 
 export interface MoodboardState {
   jobId?: string;
+  clientId?: string;
   status: JobStatus;
   progress?: number;
   result?: MoodboardResult;
@@ -109,4 +113,23 @@ export interface SavedMoodboard {
   user_id: number;
   created_at: string;
   updated_at: string;
-}
\ No newline at end of file
+}
+
+// Listing entry for a saved moodboard (no images; fetch the moodboard by id for those)
+export interface SavedMoodboardSummary {
+  id: number;
+  title: string;
+  description?: string;
+  aesthetic: string;
+  cover_image_url?: string;
+  cover_source?: string;
+  cover_link_url?: string;
+  image_count: number;
+  created_at: string;
+  updated_at: string;
+}
+
+export interface SavedMoodboardPage {
+  items: SavedMoodboardSummary[];
+  next_cursor?: string | null;
+}
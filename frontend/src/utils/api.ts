@@ -7,7 +7,8 @@ import {
   LoginCredentials, 
   RegisterCredentials, 
   AuthResponse, 
-  SavedMoodboard 
+  SavedMoodboard,
+  SavedMoodboardPage
 } from '../types';
 
 // API_BASE should be the full base URL (e.g., https://railway-url.railway.app/api/v1)
@@ -91,6 +92,10 @@ export const getJobStatus = async (jobId: string): Promise<JobStatusResponse> =>
   return response.data;
 };
 
+export const cancelJob = async (jobId: string, clientId: string): Promise<void> => {
+  await apiClient.delete(`/moodboard/${jobId}`, { params: { client_id: clientId } });
+};
+
 export const getMoodboardResult = async (jobId: string): Promise<MoodboardResult> => {
   const response = await apiClient.get<MoodboardResult>(
     `/moodboard/result/${jobId}`
@@ -153,8 +158,9 @@ export const saveMoodboard = async (moodboard: {
   return response.data;
 };
 
-export const getUserMoodboards = async (token: string): Promise<SavedMoodboard[]> => {
-  const response = await apiClient.get<SavedMoodboard[]>('/moodboards/', {
+export const getUserMoodboards = async (token: string, cursor?: string | null): Promise<SavedMoodboardPage> => {
+  const response = await apiClient.get<SavedMoodboardPage>('/moodboards/', {
+    params: cursor ? { cursor } : undefined,
     headers: {
       'Authorization': `Bearer ${token}`,
     },